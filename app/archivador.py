@@ -0,0 +1,121 @@
+# Archivo: app/archivador.py
+# Archivador en segundo plano de las reservas antiguas.
+# Cada 'intervalo_s' mueve al archivo histórico (app/services/archivo_service.py) las reservas completadas
+# y canceladas de hace más de 'dias' días, para que la tabla 'reservas' que consultan la disponibilidad,
+# las altas y los listados del día a día se quede pequeña y quepa en la caché de páginas.
+# La copia al archivo usa una conexión del pool; el borrado de 'reservas' pasa por el escritor,
+# como el resto de escrituras, y no compite con él por el bloqueo.
+import logging
+import threading
+from datetime import datetime
+from time import perf_counter
+from app.database import pool, ARCHIVO_DIAS, ARCHIVO_INTERVALO_S, ARCHIVO_LOTE
+from app.escritor import EscritorBD, escritor
+from app.pool import PoolConexiones
+from app.services import archivo_service
+
+logger = logging.getLogger("app.archivador")
+
+
+class ArchivadorReservas:
+    """
+    Hilo que archiva por lotes de 'lote' reservas cada 'intervalo_s' segundos.
+    Con 'dias' a 0 no arranca; archivar() se puede llamar también a mano.
+    """
+
+    def __init__(self, pool: PoolConexiones, escritor: EscritorBD, dias: int = 90,
+                 intervalo_s: float = 3600, lote: int = 5000):
+        self.pool = pool
+        self.escritor = escritor
+        self.dias = dias
+        self.intervalo_s = intervalo_s
+        self.lote = lote
+        self._hilo = None
+        self._parar = threading.Event()
+        # Una sola pasada a la vez aunque se pida a mano mientras corre la periódica
+        self._pasada = threading.Lock()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._pasadas = 0
+        self._pasadas_fallidas = 0
+        self._archivadas = 0
+        self._ultima_archivadas = 0
+        self._ultima_duracion = 0.0
+        self._ultima_pasada = None
+
+    def arrancar(self):
+        if self.dias <= 0 or self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="archivador", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        # La primera pasada se hace al arrancar y después una cada intervalo
+        while not self._parar.is_set():
+            try:
+                self.archivar()
+            except Exception:
+                logger.exception("Error archivando reservas")
+            self._parar.wait(self.intervalo_s)
+
+    # Metodo para mover al archivo todo lo pendiente, lote a lote. Devuelve el resumen de la pasada
+    def archivar(self):
+        if self.dias <= 0:
+            raise ValueError("El archivo histórico está desactivado (ARCHIVO_DIAS=0)")
+        with self._pasada:
+            inicio = perf_counter()
+            limite = archivo_service.limite_archivo(self.dias)
+            archivadas = lotes = 0
+            try:
+                while not self._parar.is_set():
+                    with self.pool.conexion() as conn:
+                        ids = archivo_service.copiar_lote(conn, limite, self.lote)
+                    if not ids:
+                        break
+                    borradas = self.escritor.ejecutar(archivo_service.borrar_lote, ids)
+                    archivadas += borradas
+                    lotes += 1
+                    # Si no se ha podido borrar nada es que otro worker está archivando las mismas reservas
+                    if len(ids) < self.lote or not borradas:
+                        break
+            except Exception:
+                with self._lock:
+                    self._pasadas_fallidas += 1
+                raise
+            finally:
+                duracion = perf_counter() - inicio
+                with self._lock:
+                    self._pasadas += 1
+                    self._archivadas += archivadas
+                    self._ultima_archivadas = archivadas
+                    self._ultima_duracion = duracion
+                    self._ultima_pasada = datetime.now().isoformat(timespec="seconds")
+        return {"archivadas": archivadas, "lotes": lotes, "duracion_ms": round(duracion * 1000, 3)}
+
+    # Metodo para parar el hilo; la pasada en curso termina tras su lote actual
+    def cerrar(self):
+        hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._parar.set()
+            hilo.join()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "activo": self._hilo is not None,
+                "dias": self.dias,
+                "intervalo_s": self.intervalo_s,
+                "lote": self.lote,
+                "pasadas": self._pasadas,
+                "pasadas_fallidas": self._pasadas_fallidas,
+                "reservas_archivadas": self._archivadas,
+                "ultima_pasada": self._ultima_pasada,
+                "ultima_pasada_archivadas": self._ultima_archivadas,
+                "ultima_pasada_ms": round(self._ultima_duracion * 1000, 3),
+            }
+
+
+# Archivador del proceso; cada worker de uvicorn tiene el suyo y las pasadas simultáneas no chocan
+archivador = ArchivadorReservas(pool, escritor, dias=ARCHIVO_DIAS, intervalo_s=ARCHIVO_INTERVALO_S, lote=ARCHIVO_LOTE)
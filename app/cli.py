@@ -0,0 +1,128 @@
+# Archivo: app/cli.py
+# Comandos de mantenimiento que se ejecutan sin arrancar el servidor.
+#
+# Uso: python -m app.cli migrar
+#      python -m app.cli reconstruir-estadisticas [--db data/restaurante.db]
+#      python -m app.cli revisar-consultas [--reservas 50000] [--clientes 5000] [--todas]
+#      python -m app.cli generar-datos [--clientes 1000000] [--reservas 10000000] [--mesas 400] [--semilla 1]
+#      python -m app.cli archivar [--dias 90] [--lote 5000]
+#
+# El archivo histórico de reservas se adjunta desde --archivo; por defecto DB_ARCHIVO o <db>_archivo.db
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+from app.database import ARCHIVO_DIAS, ARCHIVO_LOTE, DB_ARCHIVO, DB_NAME, MIGRACIONES, adjuntar_archivo, init_db
+from app.generador_datos import cargar
+from app.services import archivo_service, estadisticas_service
+from app.revision_consultas import revisar_servicios
+
+
+def _conectar(args):
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    archivo = args.archivo
+    if archivo is None:
+        archivo = DB_ARCHIVO if args.db == DB_NAME else os.path.splitext(args.db)[0] + "_archivo.db"
+    adjuntar_archivo(conn, archivo)
+    return conn
+
+
+def migrar(args):
+    init_db(args.db)
+    print(f"Base de datos {args.db} en la versión {len(MIGRACIONES)}")
+
+
+def reconstruir_estadisticas(args):
+    init_db(args.db)
+    conn = _conectar(args)
+    try:
+        print(json.dumps(estadisticas_service.reconstruir(conn), indent=2, ensure_ascii=False))
+    finally:
+        conn.close()
+
+
+# Metodo para comprobar que las consultas de los servicios usan índices sobre una BD sintética grande.
+# Termina con código 1 si alguna recorre entera una tabla grande
+def revisar_consultas(args):
+    resultados, errores = revisar_servicios(clientes=args.clientes, reservas=args.reservas)
+    sin_indice = [r for r in resultados if r["sin_indice"]]
+    for resultado in sorted(resultados, key=lambda r: (not r["sin_indice"], r["escenarios"][0])):
+        if not (args.todas or resultado["sin_indice"]):
+            continue
+        marca = "SIN ÍNDICE" if resultado["sin_indice"] else "ok"
+        print(f"[{marca}] {resultado['sentencia']}")
+        print(f"    escenarios: {', '.join(resultado['escenarios'])}")
+        for linea in resultado["plan"]:
+            print(f"    plan: {linea}")
+    for nombre, error in errores.items():
+        print(f"[aviso] {nombre} terminó con {error}")
+    print(f"{len(resultados)} sentencias revisadas, {len(sin_indice)} sin índice sobre tablas grandes")
+    return 1 if sin_indice else 0
+
+
+# Metodo para rellenar una BD vacía con datos sintéticos realistas (con el servidor parado)
+def generar_datos(args):
+    init_db(args.db)
+    conn = _conectar(args)
+    try:
+        resumen = cargar(conn, clientes=args.clientes, reservas=args.reservas, mesas=args.mesas, semilla=args.semilla)
+    except ValueError as e:
+        print(e)
+        return 1
+    finally:
+        conn.close()
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+
+# Metodo para mover de una vez al archivo histórico las reservas completadas y canceladas antiguas
+def archivar(args):
+    init_db(args.db)
+    conn = _conectar(args)
+    try:
+        archivadas = archivo_service.archivar(conn, args.dias, args.lote)
+        resumen = {"archivadas": archivadas, **archivo_service.estado(conn, args.dias)}
+    finally:
+        conn.close()
+    print(json.dumps(resumen, indent=2, ensure_ascii=False, default=str))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos del restaurante")
+    parser.add_argument("--db", default=DB_NAME, help="Ruta del fichero SQLite")
+    parser.add_argument("--archivo", help="Ruta del archivo histórico de reservas")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("migrar", help="Aplica las migraciones pendientes").set_defaults(funcion=migrar)
+    comandos.add_parser(
+        "reconstruir-estadisticas", help="Recalcula las tablas de resumen de /estadisticas"
+    ).set_defaults(funcion=reconstruir_estadisticas)
+    revision = comandos.add_parser(
+        "revisar-consultas", help="Comprueba con EXPLAIN QUERY PLAN que las consultas de los servicios usan índices"
+    )
+    revision.add_argument("--reservas", type=int, default=50000, help="Reservas de la BD sintética")
+    revision.add_argument("--clientes", type=int, default=5000, help="Clientes de la BD sintética")
+    revision.add_argument("--todas", action="store_true", help="Muestra también las sentencias correctas")
+    revision.set_defaults(funcion=revisar_consultas)
+    generador = comandos.add_parser(
+        "generar-datos", help="Carga clientes, mesas y reservas sintéticas en una BD vacía"
+    )
+    generador.add_argument("--clientes", type=int, default=100000)
+    generador.add_argument("--reservas", type=int, default=1000000)
+    generador.add_argument("--mesas", type=int, default=40)
+    generador.add_argument("--semilla", type=int, default=1)
+    generador.set_defaults(funcion=generar_datos)
+    archivo = comandos.add_parser(
+        "archivar", help="Mueve al archivo histórico las reservas completadas y canceladas antiguas"
+    )
+    archivo.add_argument("--dias", type=int, default=ARCHIVO_DIAS, help="Antigüedad mínima en días")
+    archivo.add_argument("--lote", type=int, default=ARCHIVO_LOTE, help="Reservas movidas por transacción")
+    archivo.set_defaults(funcion=archivar)
+
+    args = parser.parse_args(argv)
+    return args.funcion(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# Archivo: app/consultas_lentas.py
+# Registro de consultas lentas. Cuando una sentencia de las conexiones del pool tarda más de SQL_LENTA_MS
+# se escribe en el log 'app.consultas_lentas' con sus parámetros, su duración y su EXPLAIN QUERY PLAN,
+# marcando las tablas que se recorren enteras (SCAN sin índice) y los rangos de índice sin cota inferior.
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+# Milisegundos a partir de los que una sentencia se considera lenta (0 lo desactiva)
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "100"))
+
+logger = logging.getLogger("app.consultas_lentas")
+
+# Solo estas sentencias tienen plan; BEGIN, COMMIT, PRAGMA, SAVEPOINT... no
+_EXPLICABLES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+# Tablas y alias de las cláusulas FROM/JOIN: el plan nombra las tablas por su alias ('SCAN r')
+_TABLAS = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NO_ALIAS = {
+    "where", "join", "left", "right", "inner", "outer", "cross", "natural", "on", "using", "group", "order",
+    "limit", "having", "union", "except", "intersect", "set", "values", "select", "default", "returning",
+}
+# Las tablas de una vista o de una BD adjunta salen con su esquema ('SCAN archivo.reservas')
+_ESCANEO = re.compile(r"^SCAN (?:(\w+)\.)?(\w+)$")
+# Búsqueda por índice con sus condiciones ('SEARCH r USING INDEX idx_reservas_inicio (inicio>? AND inicio<?)')
+_BUSQUEDA = re.compile(r"^SEARCH (?:(\w+)\.)?(\w+) USING (?:COVERING INDEX \w+|INDEX \w+|INTEGER PRIMARY KEY) \((.*)\)$")
+_CONDICION = re.compile(r"^(\w+)(=|>=|<=|>|<)\?$")
+
+# Plan de cada sentencia ya registrada: con parámetros enlazados SQLite elige el mismo plan
+# sea cual sea su valor, así que el EXPLAIN solo se ejecuta la primera vez
+MAX_PLANES = 500
+_planes = {}
+_lock = threading.Lock()
+
+
+def explicable(sql: str):
+    return sql.lstrip().upper().startswith(_EXPLICABLES)
+
+
+# Metodo para obtener las líneas del EXPLAIN QUERY PLAN de una sentencia
+def plan_consulta(conn: sqlite3.Connection, sql: str, parametros=()):
+    # Se llama al execute de sqlite3.Connection para que el propio EXPLAIN no se mida ni se registre
+    filas = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parametros).fetchall()
+    return [fila[3] for fila in filas]
+
+
+def _alias(sql: str):
+    alias = {}
+    for tabla, nombre in _TABLAS.findall(sql):
+        alias[tabla.lower()] = tabla
+        if nombre and nombre.lower() not in _NO_ALIAS:
+            alias[nombre.lower()] = tabla
+    return alias
+
+
+# Metodo para obtener las tablas que el plan recorre enteras, sin usar ningún índice
+def escaneos(sql: str, plan: list):
+    alias = _alias(sql)
+    tablas = []
+    for detalle in plan:
+        escaneo = _ESCANEO.match(detalle)
+        if not escaneo:
+            continue
+        esquema, nombre = escaneo.groups()
+        if esquema:
+            tablas.append(nombre)
+        # 'SCAN CONSTANT ROW' o las subconsultas no son tablas
+        elif nombre.lower() in alias:
+            tablas.append(alias[nombre.lower()])
+    return tablas
+
+
+# Metodo para obtener las tablas que el plan busca por un rango de índice con solo cota superior
+# ('inicio<?' sin 'inicio>?'): usan índice, pero recorren todo lo anterior a la cota, es decir, el histórico
+def rangos_abiertos(sql: str, plan: list):
+    alias = _alias(sql)
+    tablas = []
+    for detalle in plan:
+        busqueda = _BUSQUEDA.match(detalle)
+        if not busqueda:
+            continue
+        esquema, nombre, condiciones = busqueda.groups()
+        superiores, inferiores = set(), set()
+        for condicion in condiciones.split(" AND "):
+            partes = _CONDICION.match(condicion)
+            if not partes:
+                continue
+            columna, operador = partes.groups()
+            if operador.startswith("<"):
+                superiores.add(columna)
+            elif operador.startswith(">"):
+                inferiores.add(columna)
+        if superiores - inferiores:
+            tablas.append(nombre if esquema else alias.get(nombre.lower(), nombre))
+    return tablas
+
+
+# Metodo para registrar una sentencia que ha superado SQL_LENTA_MS
+def registrar(conn: sqlite3.Connection, sql: str, parametros, duracion: float, operacion: str = None):
+    plan = None
+    if explicable(sql):
+        plan = _planes.get(sql)
+        if plan is None:
+            try:
+                plan = plan_consulta(conn, sql, parametros)
+            except sqlite3.Error as e:
+                plan = [f"(sin plan: {e})"]
+            with _lock:
+                if len(_planes) < MAX_PLANES:
+                    _planes[sql] = plan
+
+    mensaje = ["Consulta lenta en %s (%.1f ms): %s", operacion or "?", duracion * 1000, " ".join(sql.split())]
+    if parametros:
+        mensaje[0] += "\n  parámetros: %r"
+        mensaje.append(parametros)
+    if plan:
+        tablas = escaneos(sql, plan)
+        abiertos = rangos_abiertos(sql, plan)
+        mensaje[0] += "\n  plan: %s"
+        mensaje.append(" | ".join(plan))
+        if tablas:
+            mensaje[0] += "\n  RECORRIDO COMPLETO de %s"
+            mensaje.append(", ".join(tablas))
+        if abiertos:
+            mensaje[0] += "\n  RANGO SIN COTA INFERIOR en %s"
+            mensaje.append(", ".join(abiertos))
+    logger.warning(*mensaje)
@@ -1,27 +1,203 @@
 # Archivo: app/database.py
+import os
+import calendar
+import itertools
 import sqlite3
+from datetime import datetime, timedelta
+from contextlib import contextmanager
 from sqlite3 import Connection
+from app.ejecutor import EjecutorBD
+from app.pool import PoolConexiones
 
 # Definimos la ruta donde se creará el archivo .db asumiendo que ejecutas el comando uvicorn desde la raíz del proyecto
-DB_NAME = "data/restaurante.db"
+# (se puede cambiar con la variable de entorno DB_NAME, por ejemplo para los benchmarks)
+DB_NAME = os.getenv("DB_NAME", "data/restaurante.db")
+
+# Configuración del pool de conexiones (se puede ajustar por variables de entorno)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Hilos que ejecutan las operaciones de los endpoints async (uno por conexión del pool por defecto)
+# y máximo de operaciones en cola antes de responder 503
+DB_EJECUTOR_HILOS = int(os.getenv("DB_EJECUTOR_HILOS", str(DB_POOL_SIZE)))
+DB_MAX_PENDIENTES = int(os.getenv("DB_MAX_PENDIENTES", "1000"))
+
+# Escritor con commit agrupado (app/escritor.py): máximo de operaciones por transacción
+# y milisegundos que espera a que lleguen más desde la primera del lote
+DB_ESCRITOR_LOTE = int(os.getenv("DB_ESCRITOR_LOTE", "64"))
+DB_ESCRITOR_ESPERA_MS = float(os.getenv("DB_ESCRITOR_ESPERA_MS", "1"))
+
+# Archivador (app/archivador.py): días tras los que una reserva completada o cancelada pasa al archivo
+# histórico (0 lo desactiva), segundos entre pasadas y reservas movidas por lote
+ARCHIVO_DIAS = int(os.getenv("ARCHIVO_DIAS", "90"))
+ARCHIVO_INTERVALO_S = float(os.getenv("ARCHIVO_INTERVALO_S", "3600"))
+ARCHIVO_LOTE = int(os.getenv("ARCHIVO_LOTE", "5000"))
+
+# Planificador de tareas (app/planificador.py): si arranca con la app, segundos entre ejecuciones de cada tarea
+# y segundos que dura el cerrojo del worker que las ejecuta si deja de renovarlo (porque se ha caído)
+PLANIFICADOR_ACTIVO = os.getenv("PLANIFICADOR_ACTIVO", "1") == "1"
+PLANIFICADOR_INTERVALO_S = float(os.getenv("PLANIFICADOR_INTERVALO_S", "60"))
+PLANIFICADOR_CERROJO_S = float(os.getenv("PLANIFICADOR_CERROJO_S", "180"))
+
+# Difusor de cambios de disponibilidad por SSE (app/difusor.py): eventos pendientes por cliente antes de
+# descartarlos, máximo de clientes conectados por worker y segundos entre lecturas de los cambios de otros workers
+DIFUSION_COLA = int(os.getenv("DIFUSION_COLA", "256"))
+DIFUSION_MAX_CLIENTES = int(os.getenv("DIFUSION_MAX_CLIENTES", "10000"))
+DIFUSION_INTERVALO_S = float(os.getenv("DIFUSION_INTERVALO_S", "0.5"))
+
+# Archivo histórico (app/archivador.py): otro fichero SQLite al que se mueven las reservas completadas
+# y canceladas antiguas para que la tabla 'reservas' se quede con las recientes y las futuras
+DB_ARCHIVO = os.getenv("DB_ARCHIVO", os.path.splitext(DB_NAME)[0] + "_archivo.db")
+
+# Columnas de reservas en el orden de la tabla (las dos últimas son las generadas 'inicio' y 'fin')
+COLUMNAS_RESERVA = (
+    "id", "cliente_id", "mesa_id", "fecha_hora_inicio", "fecha_hora_fin",
+    "num_comensales", "estado", "notas", "fecha_creacion", "inicio", "fin"
+)
+
+# Vista con las reservas de las dos BD, para las consultas históricas
+RESERVAS_HISTORICO = "reservas_todas"
+
+
+# Metodo para adjuntar el archivo histórico a una conexión como 'archivo' y crear la vista que lo une a 'reservas'.
+# Si el archivador ya ha copiado una reserva pero aún no la ha borrado de 'reservas', la vista se queda con la de 'reservas'
+def adjuntar_archivo(conn: Connection, ruta: str = DB_ARCHIVO):
+    conn.execute("ATTACH DATABASE ? AS archivo", (ruta,))
+    if conn.execute("PRAGMA archivo.journal_mode").fetchone()[0] != "wal":
+        conn.execute("PRAGMA archivo.journal_mode = WAL")
+    # Mismas columnas que reservas, pero 'inicio' y 'fin' son normales: se copian ya calculadas
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archivo.reservas (
+        id INTEGER PRIMARY KEY,
+        cliente_id INTEGER NOT NULL,
+        mesa_id INTEGER NOT NULL,
+        fecha_hora_inicio TIMESTAMP NOT NULL,
+        fecha_hora_fin TIMESTAMP NOT NULL,
+        num_comensales INTEGER NOT NULL,
+        estado TEXT NOT NULL,
+        notas TEXT,
+        fecha_creacion TIMESTAMP,
+        inicio INTEGER NOT NULL,
+        fin INTEGER NOT NULL
+    );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS archivo.idx_archivo_reservas_inicio ON reservas (inicio);")
+    conn.execute("CREATE INDEX IF NOT EXISTS archivo.idx_archivo_reservas_cliente_inicio ON reservas (cliente_id, inicio);")
+    crear_vista_historico(conn)
+    return conn
+
+
+# Metodo para crear la vista temporal (solo de esta conexión) que une 'reservas' y el archivo.
+# Los filtros se aplican en cada tabla con sus índices y un ORDER BY por columnas indexadas
+# mezcla las dos partes sin ordenar de nuevo. Cambiar PRAGMA temp_store borra la vista
+def crear_vista_historico(conn: Connection):
+    columnas = ", ".join(COLUMNAS_RESERVA)
+    conn.execute(f"""
+    CREATE TEMP VIEW IF NOT EXISTS {RESERVAS_HISTORICO} AS
+    SELECT {columnas} FROM main.reservas
+    UNION ALL
+    SELECT {columnas} FROM archivo.reservas
+    WHERE NOT EXISTS (SELECT 1 FROM main.reservas h WHERE h.id = archivo.reservas.id);
+    """)
+
+
+# Pool compartido por toda la aplicación. Cada conexión lleva adjunto el archivo histórico
+pool = PoolConexiones(DB_NAME, tamano=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+                      al_conectar=adjuntar_archivo)
+
+# Ejecutor de BD para los endpoints async: 'await ejecutor.ejecutar(servicio, *args)' llama a servicio(conn, *args)
+ejecutor = EjecutorBD(pool, hilos=DB_EJECUTOR_HILOS, max_pendientes=DB_MAX_PENDIENTES)
 
 
 #  Metodo para obtener la conexion de la base de datos, esta función se usará en los Routers
 def get_db():
-    conn = sqlite3.connect(DB_NAME)
-    # Esto permite acceder a las columnas por nombre
-    conn.row_factory = sqlite3.Row
-    try:
+    # La conexión sale del pool ya configurada y vuelve a él al terminar la petición
+    with pool.conexion() as conn:
         yield conn
+
+# Letras acentuadas que se pliegan a su letra base para las búsquedas de texto.
+# La misma tabla se usa en SQL (triggers del índice FTS) y en Python (texto buscado)
+# (español y catalán; cada letra es un replace() anidado, así que la lista se mantiene corta)
+ACENTOS = {
+    "a": "áà", "e": "éè", "i": "íï", "o": "óò", "u": "úü", "n": "ñ", "c": "ç",
+    "A": "ÁÀ", "E": "ÉÈ", "I": "ÍÏ", "O": "ÓÒ", "U": "ÚÜ", "N": "Ñ", "C": "Ç",
+}
+TABLA_ACENTOS = str.maketrans({acentuada: base for base, letras in ACENTOS.items() for acentuada in letras})
+
+# Metodo para generar la expresión SQL que quita los acentos de una columna
+def sql_sin_acentos(expresion: str):
+    for base, letras in ACENTOS.items():
+        for acentuada in letras:
+            expresion = f"replace({expresion}, '{acentuada}', '{base}')"
+    return expresion
+
+# Contador para dar nombres únicos a los savepoints anidados
+_savepoints = itertools.count(1)
+
+# Acciones que esperan al COMMIT, por conexión: una lista por cada transaccion() abierta en ella
+_al_confirmar = {}
+
+# Metodo para ejecutar funcion(*args) cuando se confirme la transacción abierta en conn (métricas y
+# demás efectos que no deben verse si al final se deshace). Sin transacción abierta se ejecuta ya
+def al_confirmar(conn: Connection, funcion, *args, **kwargs):
+    niveles = _al_confirmar.get(id(conn))
+    if niveles:
+        niveles[-1].append((funcion, args, kwargs))
+    else:
+        funcion(*args, **kwargs)
+
+# Metodo para cerrar un nivel de transaccion(): si se ha confirmado, sus acciones pasan al nivel
+# de fuera o, si era el último, se ejecutan; si se ha deshecho, se descartan
+def _cerrar_nivel(conn: Connection, confirmado: bool):
+    niveles = _al_confirmar[id(conn)]
+    pendientes = niveles.pop()
+    if not niveles:
+        del _al_confirmar[id(conn)]
+    if confirmado:
+        for funcion, args, kwargs in pendientes:
+            al_confirmar(conn, funcion, *args, **kwargs)
+
+@contextmanager
+def transaccion(conn: Connection):
+    """
+    Ejecuta el bloque dentro de una transacción de escritura.
+    Usa BEGIN IMMEDIATE para tomar el bloqueo de escritura antes de leer, de modo que
+    las validaciones y el INSERT posterior son atómicos frente a otros escritores.
+    Si ya hay una transacción abierta, se anida con un SAVEPOINT.
+    Lo registrado con al_confirmar() dentro del bloque solo se ejecuta tras el COMMIT.
+    """
+    _al_confirmar.setdefault(id(conn), []).append([])
+    confirmado = False
+    try:
+        if conn.in_transaction:
+            nombre = f"sp_{next(_savepoints)}"
+            conn.execute(f"SAVEPOINT {nombre}")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {nombre}")
+                conn.execute(f"RELEASE {nombre}")
+                raise
+            conn.execute(f"RELEASE {nombre}")
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        confirmado = True
     finally:
-        conn.close()
+        _cerrar_nivel(conn, confirmado)
 
-# Metodo para crear las tablas al ejecutar
-def init_db():
-    """Crear tablas usando SQL al arrancar"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
+# Migraciones del esquema.
+# Cada función lleva la BD de la versión N-1 a la N; la versión aplicada se guarda en PRAGMA user_version.
+# Una migración ya publicada no se modifica nunca: los cambios van en una migración nueva al final de la lista.
+
+def _migracion_1_esquema_inicial(cursor):
+    """Tablas, índices y triggers originales (las BD anteriores a las migraciones ya los tienen)"""
     # Tabla de clientes
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS clientes (
@@ -66,6 +242,492 @@ def init_db():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservas_fecha ON reservas (fecha_hora_inicio);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservas_mesa ON reservas (mesa_id);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservas_cliente ON reservas (cliente_id);")
+
+    # Restricción de no solapamiento a nivel de base de datos.
+    # Protege frente a escritores concurrentes (varios workers de uvicorn) aunque se salten la validación del servicio.
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reservas_solape_insert
+    BEFORE INSERT ON reservas
+    WHEN NEW.estado != 'cancelada'
+    BEGIN
+        SELECT RAISE(ABORT, 'reserva_solapada')
+        WHERE EXISTS (
+            SELECT 1 FROM reservas
+            WHERE mesa_id = NEW.mesa_id
+            AND estado != 'cancelada'
+            AND fecha_hora_inicio < NEW.fecha_hora_fin
+            AND fecha_hora_fin > NEW.fecha_hora_inicio
+        );
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reservas_solape_update
+    BEFORE UPDATE OF mesa_id, fecha_hora_inicio, fecha_hora_fin, estado ON reservas
+    WHEN NEW.estado != 'cancelada'
+    AND (
+        OLD.estado = 'cancelada'
+        OR NEW.mesa_id != OLD.mesa_id
+        OR NEW.fecha_hora_inicio != OLD.fecha_hora_inicio
+        OR NEW.fecha_hora_fin != OLD.fecha_hora_fin
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'reserva_solapada')
+        WHERE EXISTS (
+            SELECT 1 FROM reservas
+            WHERE mesa_id = NEW.mesa_id
+            AND id != NEW.id
+            AND estado != 'cancelada'
+            AND fecha_hora_inicio < NEW.fecha_hora_fin
+            AND fecha_hora_fin > NEW.fecha_hora_inicio
+        );
+    END;
+    """)
     
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    # Índice de texto completo de clientes (trigramas), sin acentos para las búsquedas en español
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'clientes_fts'")
+    crear_fts = cursor.fetchone() is None
+    if crear_fts:
+        cursor.execute("""
+        CREATE VIRTUAL TABLE clientes_fts USING fts5(nombre, email, telefono, tokenize = 'trigram');
+        """)
+        # Ranking bm25 dando más peso al nombre que al email y al teléfono
+        cursor.execute("INSERT INTO clientes_fts (clientes_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')")
+        cursor.execute(f"""
+        INSERT INTO clientes_fts (rowid, nombre, email, telefono)
+        SELECT id, {sql_sin_acentos("nombre")}, {sql_sin_acentos("email")}, telefono FROM clientes;
+        """)
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_insert
+    AFTER INSERT ON clientes
+    BEGIN
+        INSERT INTO clientes_fts (rowid, nombre, email, telefono)
+        VALUES (NEW.id, {sql_sin_acentos("NEW.nombre")}, {sql_sin_acentos("NEW.email")}, NEW.telefono);
+    END;
+    """)
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_update
+    AFTER UPDATE OF nombre, email, telefono ON clientes
+    BEGIN
+        DELETE FROM clientes_fts WHERE rowid = OLD.id;
+        INSERT INTO clientes_fts (rowid, nombre, email, telefono)
+        VALUES (NEW.id, {sql_sin_acentos("NEW.nombre")}, {sql_sin_acentos("NEW.email")}, NEW.telefono);
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_delete
+    AFTER DELETE ON clientes
+    BEGIN
+        DELETE FROM clientes_fts WHERE rowid = OLD.id;
+    END;
+    """)
+
+    # Registro de cambios de reservas, lo rellenan los triggers y lo leen los índices en memoria
+    # de cada proceso para mantenerse al día (incluidos los cambios de otros workers)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS reservas_cambios (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        reserva_id INTEGER NOT NULL,
+        mesa_id INTEGER,
+        fecha_hora_inicio TIMESTAMP,
+        fecha_hora_fin TIMESTAMP,
+        ocupa INTEGER NOT NULL
+    );
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reservas_cambios_insert
+    AFTER INSERT ON reservas
+    BEGIN
+        INSERT INTO reservas_cambios (reserva_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, ocupa)
+        VALUES (NEW.id, NEW.mesa_id, NEW.fecha_hora_inicio, NEW.fecha_hora_fin, NEW.estado != 'cancelada');
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reservas_cambios_update
+    AFTER UPDATE OF mesa_id, fecha_hora_inicio, fecha_hora_fin, estado ON reservas
+    BEGIN
+        INSERT INTO reservas_cambios (reserva_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, ocupa)
+        VALUES (NEW.id, NEW.mesa_id, NEW.fecha_hora_inicio, NEW.fecha_hora_fin, NEW.estado != 'cancelada');
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reservas_cambios_delete
+    AFTER DELETE ON reservas
+    BEGIN
+        INSERT INTO reservas_cambios (reserva_id, ocupa) VALUES (OLD.id, 0);
+    END;
+    """)
+
+    # Poda: cada 1000 cambios se borran los que tienen más de 10000 de antigüedad
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reservas_cambios_poda
+    AFTER INSERT ON reservas_cambios
+    WHEN NEW.seq % 1000 = 0
+    BEGIN
+        DELETE FROM reservas_cambios WHERE seq <= NEW.seq - 10000;
+    END;
+    """)
+
+
+def _migracion_2_fechas_epoch(cursor):
+    """
+    Guarda inicio y fin de cada reserva como enteros epoch (columnas generadas STORED a partir de
+    fecha_hora_inicio/fecha_hora_fin, así cualquier escritor las mantiene) y sustituye los índices
+    de una columna por índices compuestos que cubren los accesos reales.
+    """
+    # SQLite no permite añadir columnas STORED con ALTER TABLE: reconstruimos la tabla
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'reservas'")
+    fila_seq = cursor.fetchone()
+
+    cursor.execute("""
+    CREATE TABLE reservas_nueva (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cliente_id INTEGER NOT NULL,
+        mesa_id INTEGER NOT NULL,
+        fecha_hora_inicio TIMESTAMP NOT NULL,
+        fecha_hora_fin TIMESTAMP NOT NULL,
+        num_comensales INTEGER NOT NULL,
+        estado TEXT DEFAULT 'pendiente' CHECK (estado IN ('pendiente', 'confirmada', 'completada', 'cancelada')),
+        notas TEXT,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        inicio INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', fecha_hora_inicio) AS INTEGER)) STORED,
+        fin INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', fecha_hora_fin) AS INTEGER)) STORED,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+        FOREIGN KEY (mesa_id) REFERENCES mesas (id)
+    );
+    """)
+    cursor.execute("""
+    INSERT INTO reservas_nueva (id, cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado, notas, fecha_creacion)
+    SELECT id, cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado, notas, fecha_creacion
+    FROM reservas;
+    """)
+    # Al borrar la tabla antigua desaparecen también sus índices y triggers
+    cursor.execute("DROP TABLE reservas;")
+    cursor.execute("ALTER TABLE reservas_nueva RENAME TO reservas;")
+    if fila_seq:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'reservas'", (fila_seq[0],))
+
+    # Índices compuestos según los accesos reales:
+    # solapamiento/disponibilidad por mesa, reservas de un cliente, y listados/estadísticas por fecha
+    cursor.execute("CREATE INDEX idx_reservas_mesa_estado_inicio_fin ON reservas (mesa_id, estado, inicio, fin);")
+    cursor.execute("CREATE INDEX idx_reservas_cliente_inicio ON reservas (cliente_id, inicio);")
+    cursor.execute("CREATE INDEX idx_reservas_inicio ON reservas (inicio);")
+
+    # Restricción de no solapamiento, ahora sobre las columnas enteras
+    cursor.execute("""
+    CREATE TRIGGER trg_reservas_solape_insert
+    BEFORE INSERT ON reservas
+    WHEN NEW.estado != 'cancelada'
+    BEGIN
+        SELECT RAISE(ABORT, 'reserva_solapada')
+        WHERE EXISTS (
+            SELECT 1 FROM reservas
+            WHERE mesa_id = NEW.mesa_id
+            AND estado IN ('pendiente', 'confirmada', 'completada')
+            AND inicio < NEW.fin
+            AND fin > NEW.inicio
+        );
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER trg_reservas_solape_update
+    BEFORE UPDATE OF mesa_id, fecha_hora_inicio, fecha_hora_fin, estado ON reservas
+    WHEN NEW.estado != 'cancelada'
+    AND (
+        OLD.estado = 'cancelada'
+        OR NEW.mesa_id != OLD.mesa_id
+        OR NEW.fecha_hora_inicio != OLD.fecha_hora_inicio
+        OR NEW.fecha_hora_fin != OLD.fecha_hora_fin
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'reserva_solapada')
+        WHERE EXISTS (
+            SELECT 1 FROM reservas
+            WHERE mesa_id = NEW.mesa_id
+            AND id != NEW.id
+            AND estado IN ('pendiente', 'confirmada', 'completada')
+            AND inicio < NEW.fin
+            AND fin > NEW.inicio
+        );
+    END;
+    """)
+
+    # El registro de cambios también pasa a enteros. Se vacía: los índices en memoria
+    # detectan el salto de secuencia y se reconstruyen
+    cursor.execute("DROP TABLE reservas_cambios;")
+    cursor.execute("""
+    CREATE TABLE reservas_cambios (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        reserva_id INTEGER NOT NULL,
+        mesa_id INTEGER,
+        inicio INTEGER,
+        fin INTEGER,
+        ocupa INTEGER NOT NULL
+    );
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER trg_reservas_cambios_insert
+    AFTER INSERT ON reservas
+    BEGIN
+        INSERT INTO reservas_cambios (reserva_id, mesa_id, inicio, fin, ocupa)
+        VALUES (NEW.id, NEW.mesa_id, NEW.inicio, NEW.fin, NEW.estado != 'cancelada');
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER trg_reservas_cambios_update
+    AFTER UPDATE OF mesa_id, fecha_hora_inicio, fecha_hora_fin, estado ON reservas
+    BEGIN
+        INSERT INTO reservas_cambios (reserva_id, mesa_id, inicio, fin, ocupa)
+        VALUES (NEW.id, NEW.mesa_id, NEW.inicio, NEW.fin, NEW.estado != 'cancelada');
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER trg_reservas_cambios_delete
+    AFTER DELETE ON reservas
+    BEGIN
+        INSERT INTO reservas_cambios (reserva_id, ocupa) VALUES (OLD.id, 0);
+    END;
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER trg_reservas_cambios_poda
+    AFTER INSERT ON reservas_cambios
+    WHEN NEW.seq % 1000 = 0
+    BEGIN
+        DELETE FROM reservas_cambios WHERE seq <= NEW.seq - 10000;
+    END;
+    """)
+
+
+# Expresiones para agrupar una reserva por día (medianoche en epoch) y turno
+SQL_DIA = "({r}.inicio - {r}.inicio % 86400)"
+SQL_TURNO = "(CASE WHEN {r}.inicio % 86400 < 18 * 3600 THEN 'comida' ELSE 'cena' END)"
+
+
+def _migracion_3_estadisticas(cursor):
+    """
+    Tablas de resumen para /estadisticas, mantenidas por triggers en cada escritura:
+    totales por estado, reservas activas por día y turno, reservas por cliente y por mesa,
+    y número de clientes y mesas.
+    """
+    cursor.execute("""
+    CREATE TABLE estadisticas_estado (
+        estado TEXT PRIMARY KEY,
+        total INTEGER NOT NULL
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE estadisticas_turno (
+        dia INTEGER NOT NULL,
+        turno TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (dia, turno)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE estadisticas_cliente (
+        cliente_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE estadisticas_mesa (
+        mesa_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE estadisticas_totales (
+        clave TEXT PRIMARY KEY,
+        total INTEGER NOT NULL
+    );
+    """)
+    # Para sacar el top de clientes y mesas sin recorrer toda la tabla
+    cursor.execute("CREATE INDEX idx_estadisticas_cliente_total ON estadisticas_cliente (total);")
+    cursor.execute("CREATE INDEX idx_estadisticas_mesa_total ON estadisticas_mesa (total);")
+
+    # Cada fila de reservas suma 1 al entrar y resta 1 al salir.
+    # Una actualización se trata como quitar la fila antigua y añadir la nueva
+    sumar = f"""
+        INSERT INTO estadisticas_estado (estado, total) VALUES (NEW.estado, 1)
+        ON CONFLICT (estado) DO UPDATE SET total = total + 1;
+        INSERT INTO estadisticas_cliente (cliente_id, total) VALUES (NEW.cliente_id, 1)
+        ON CONFLICT (cliente_id) DO UPDATE SET total = total + 1;
+        INSERT INTO estadisticas_mesa (mesa_id, total) VALUES (NEW.mesa_id, 1)
+        ON CONFLICT (mesa_id) DO UPDATE SET total = total + 1;
+        INSERT INTO estadisticas_turno (dia, turno, total)
+        SELECT {SQL_DIA.format(r="NEW")}, {SQL_TURNO.format(r="NEW")}, 1 WHERE NEW.estado != 'cancelada'
+        ON CONFLICT (dia, turno) DO UPDATE SET total = total + 1;
+    """
+    restar = f"""
+        UPDATE estadisticas_estado SET total = total - 1 WHERE estado = OLD.estado;
+        UPDATE estadisticas_cliente SET total = total - 1 WHERE cliente_id = OLD.cliente_id;
+        UPDATE estadisticas_mesa SET total = total - 1 WHERE mesa_id = OLD.mesa_id;
+        UPDATE estadisticas_turno SET total = total - 1
+        WHERE OLD.estado != 'cancelada'
+        AND dia = {SQL_DIA.format(r="OLD")} AND turno = {SQL_TURNO.format(r="OLD")};
+    """
+    cursor.execute(f"""
+    CREATE TRIGGER trg_estadisticas_reservas_insert
+    AFTER INSERT ON reservas
+    BEGIN
+        {sumar}
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER trg_estadisticas_reservas_update
+    AFTER UPDATE OF cliente_id, mesa_id, fecha_hora_inicio, estado ON reservas
+    BEGIN
+        {restar}
+        {sumar}
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER trg_estadisticas_reservas_delete
+    AFTER DELETE ON reservas
+    BEGIN
+        {restar}
+    END;
+    """)
+
+    for tabla in ("clientes", "mesas"):
+        cursor.execute(f"""
+        CREATE TRIGGER trg_estadisticas_{tabla}_insert
+        AFTER INSERT ON {tabla}
+        BEGIN
+            INSERT INTO estadisticas_totales (clave, total) VALUES ('{tabla}', 1)
+            ON CONFLICT (clave) DO UPDATE SET total = total + 1;
+        END;
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER trg_estadisticas_{tabla}_delete
+        AFTER DELETE ON {tabla}
+        BEGIN
+            UPDATE estadisticas_totales SET total = total - 1 WHERE clave = '{tabla}';
+        END;
+        """)
+
+    rellenar_estadisticas(cursor)
+
+
+# Metodo para recalcular desde cero las tablas de estadísticas (carga inicial o reparación).
+# 'origen' es RESERVAS_HISTORICO cuando la conexión tiene adjunto el archivo histórico
+def rellenar_estadisticas(cursor, origen: str = "reservas"):
+    for tabla in ("estadisticas_estado", "estadisticas_turno", "estadisticas_cliente",
+                  "estadisticas_mesa", "estadisticas_totales"):
+        cursor.execute(f"DELETE FROM {tabla};")
+
+    cursor.execute(f"INSERT INTO estadisticas_estado (estado, total) SELECT estado, COUNT(*) FROM {origen} GROUP BY estado;")
+    cursor.execute(f"INSERT INTO estadisticas_cliente (cliente_id, total) SELECT cliente_id, COUNT(*) FROM {origen} GROUP BY cliente_id;")
+    cursor.execute(f"INSERT INTO estadisticas_mesa (mesa_id, total) SELECT mesa_id, COUNT(*) FROM {origen} GROUP BY mesa_id;")
+    cursor.execute(f"""
+    INSERT INTO estadisticas_turno (dia, turno, total)
+    SELECT {SQL_DIA.format(r="r")}, {SQL_TURNO.format(r="r")}, COUNT(*)
+    FROM {origen} r
+    WHERE r.estado != 'cancelada'
+    GROUP BY 1, 2;
+    """)
+    cursor.execute("""
+    INSERT INTO estadisticas_totales (clave, total)
+    VALUES ('clientes', (SELECT COUNT(*) FROM clientes)), ('mesas', (SELECT COUNT(*) FROM mesas));
+    """)
+
+
+# Tablas cuyo contenido se cachea y cuya versión se lleva en versiones_tablas
+TABLAS_VERSIONADAS = ("clientes", "mesas", "reservas")
+
+
+def _migracion_4_versiones_tablas(cursor):
+    """
+    Contador de versión por tabla que sube en cada escritura. La caché de respuestas lo consulta
+    antes de servir un valor, así detecta también lo que escriben otros workers.
+    """
+    cursor.execute("""
+    CREATE TABLE versiones_tablas (
+        tabla TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    """)
+    for tabla in TABLAS_VERSIONADAS:
+        cursor.execute("INSERT INTO versiones_tablas (tabla) VALUES (?)", (tabla,))
+        for operacion in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+            CREATE TRIGGER trg_version_{tabla}_{operacion.lower()}
+            AFTER {operacion} ON {tabla}
+            BEGIN
+                UPDATE versiones_tablas SET version = version + 1 WHERE tabla = '{tabla}';
+            END;
+            """)
+
+
+def _migracion_5_tareas_programadas(cursor):
+    """
+    Índices parciales para los cambios de estado automáticos (app/services/transiciones_service.py):
+    solo guardan las reservas abiertas de cada estado, así que las tareas no recorren el histórico.
+    Y la tabla de cerrojos con la que un solo worker ejecuta las tareas programadas.
+    """
+    # Las consultas deben repetir la misma condición literal (estado = '...') para que SQLite use el índice
+    cursor.execute("CREATE INDEX idx_reservas_confirmadas_fin ON reservas (fin) WHERE estado = 'confirmada';")
+    cursor.execute("CREATE INDEX idx_reservas_pendientes_inicio ON reservas (inicio) WHERE estado = 'pendiente';")
+    cursor.execute("""
+    CREATE TABLE cerrojos (
+        nombre TEXT PRIMARY KEY,
+        propietario TEXT NOT NULL,
+        caduca REAL NOT NULL
+    ) WITHOUT ROWID;
+    """)
+
+
+MIGRACIONES = [
+    _migracion_1_esquema_inicial,
+    _migracion_2_fechas_epoch,
+    _migracion_3_estadisticas,
+    _migracion_4_versiones_tablas,
+    _migracion_5_tareas_programadas,
+]
+
+
+# Metodo para aplicar las migraciones pendientes, cada una en su propia transacción.
+# La versión se vuelve a leer con el bloqueo de escritura tomado: si varios workers arrancan a la vez
+# sobre la misma BD, cada migración la aplica solo el primero que llega
+def migrar(conn: Connection):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for numero, migracion in enumerate(MIGRACIONES[version:], start=version + 1):
+        with transaccion(conn):
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= numero:
+                continue
+            migracion(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {numero}")
+    return len(MIGRACIONES)
+
+
+# Metodo para crear o actualizar las tablas al ejecutar
+def init_db(ruta: str = DB_NAME):
+    """Aplicar las migraciones pendientes al arrancar"""
+    conn = sqlite3.connect(ruta)
+    try:
+        migrar(conn)
+        # WAL queda guardado en el fichero; así las conexiones del pool no compiten por activarlo
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+
+# Metodo para convertir una fecha al entero epoch con el que se guardan inicio y fin.
+# Igual que strftime('%s') en SQLite, la hora local se trata como si fuera UTC
+def a_epoch(fecha: datetime):
+    return calendar.timegm(fecha.timetuple())
+
+
+def desde_epoch(segundos: int):
+    return datetime(1970, 1, 1) + timedelta(seconds=segundos)
@@ -0,0 +1,231 @@
+# Archivo: app/difusor.py
+# Difusor de los cambios de disponibilidad a los clientes conectados a GET /mesas/disponibilidad/stream (SSE).
+# En vez de que cada tablet repita la consulta de disponibilidad cada pocos segundos, recibe solo lo que cambia:
+#   - disponibilidad: intervalos de una mesa que se ocupan o se liberan, [{"mesa", "inicio", "fin", "libre"}]
+#   - mesas: mesas creadas, modificadas o eliminadas
+#   - reinicio: no se pueden dar los cambios (índice reconstruido, cliente que no lee a tiempo) y hay que recargar
+# Los cambios de reservas salen del índice de disponibilidad al sincronizarse con reservas_cambios: al momento
+# para lo que confirma el escritor de este worker y, mientras haya clientes, cada 'intervalo_s' segundos para
+# lo que escriben otros workers. Cada mensaje se serializa una vez y se reparte a las colas acotadas de los clientes.
+import asyncio
+import json
+import logging
+from datetime import date, timedelta
+from app.database import ejecutor, desde_epoch, DIFUSION_COLA, DIFUSION_MAX_CLIENTES, DIFUSION_INTERVALO_S
+from app.ejecutor import EjecutorBD
+from app.exceptions import ServicioSobrecargadoError
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import IndiceDisponibilidad, indice
+
+logger = logging.getLogger("app.difusor")
+
+# Milisegundos que espera el navegador antes de reconectar y segundos entre comentarios para mantener la conexión
+REINTENTO_MS = 3000
+PING_S = 15
+
+_PING = ": ping\n\n"
+_REINICIO = "event: reinicio\ndata: {}\n\n"
+# Marca de cierre en la cola de un cliente
+_FIN = object()
+
+
+def _evento(tipo: str, datos, seq: int = None):
+    cabecera = f"id: {seq}\n" if seq is not None else ""
+    return f"{cabecera}event: {tipo}\ndata: {json.dumps(datos, separators=(',', ':'))}\n\n"
+
+
+class _Mensaje:
+    """Un evento ya serializado: para todos los clientes y, si es de disponibilidad, por cada día que toca."""
+    __slots__ = ("todos", "por_fecha")
+
+    def __init__(self, todos: str, por_fecha: dict = None):
+        self.todos = todos
+        self.por_fecha = por_fecha
+
+
+class _Suscriptor:
+    __slots__ = ("cola", "fecha")
+
+    def __init__(self, tamano: int, fecha: date):
+        self.cola = asyncio.Queue(maxsize=tamano)
+        self.fecha = fecha
+
+
+class DifusorDisponibilidad:
+    """
+    Reparte los cambios de disponibilidad a 'max_clientes' suscriptores como mucho, cada uno con una cola
+    de 'tamano_cola' eventos. Si un cliente la llena se vacía y recibe un reinicio.
+    Las suscripciones y el reparto viven en el bucle de asyncio de la app; publicar() se llama desde cualquier hilo.
+    """
+
+    def __init__(self, ejecutor: EjecutorBD, indice: IndiceDisponibilidad, tamano_cola: int = 256,
+                 max_clientes: int = 10000, intervalo_s: float = 0.5):
+        self.ejecutor = ejecutor
+        self.indice = indice
+        self.tamano_cola = tamano_cola
+        self.max_clientes = max_clientes
+        self.intervalo_s = intervalo_s
+        self._suscriptores = set()
+        self._bucle = None
+        self._sondeo = None
+        self._mesas = None  # mesa_id -> datos de la mesa difundidos por última vez
+
+        # Métricas: las cambia el bucle de asyncio, salvo 'eventos' y 'reinicios' (con el lock del índice)
+        # y 'sondeos' (hay un solo sondeo a la vez)
+        self._max_clientes_visto = 0
+        self._eventos = 0
+        self._entregados = 0
+        self._desbordes = 0
+        self._reinicios = 0
+        self._sondeos = 0
+
+    # Metodo para empezar a recibir los cambios del índice. Se llama desde el bucle de la app
+    def arrancar(self):
+        self._bucle = asyncio.get_running_loop()
+        self.indice.escuchar(self.publicar)
+
+    # Metodo que recibe los cambios del índice (con su lock tomado): los serializa y los pasa al bucle
+    def publicar(self, seq: int, cambios: list):
+        if not self._suscriptores or self._bucle is None:
+            return
+        if cambios is None:
+            mensaje = _Mensaje(_REINICIO)
+            self._reinicios += 1
+        else:
+            datos = []
+            por_fecha = {}
+            for mesa_id, inicio, fin, libre in cambios:
+                inicio_dt, fin_dt = desde_epoch(inicio), desde_epoch(fin)
+                cambio = {"mesa": mesa_id, "inicio": inicio_dt.isoformat(), "fin": fin_dt.isoformat(), "libre": libre}
+                datos.append(cambio)
+                # Una reserva de la cena puede terminar pasada la medianoche: cuenta en los dos días
+                dia = inicio_dt.date()
+                while dia <= (fin_dt - timedelta(seconds=1)).date():
+                    por_fecha.setdefault(dia, []).append(cambio)
+                    dia += timedelta(days=1)
+            mensaje = _Mensaje(
+                _evento("disponibilidad", datos, seq),
+                {dia: _evento("disponibilidad", lista, seq) for dia, lista in por_fecha.items()},
+            )
+        self._eventos += 1
+        try:
+            self._bucle.call_soon_threadsafe(self._repartir, mensaje)
+        except RuntimeError:
+            # El bucle ya se ha cerrado (la app se está parando)
+            pass
+
+    def _repartir(self, mensaje: _Mensaje):
+        for suscriptor in self._suscriptores:
+            if mensaje.por_fecha is None or suscriptor.fecha is None:
+                texto = mensaje.todos
+            else:
+                texto = mensaje.por_fecha.get(suscriptor.fecha)
+                if texto is None:
+                    continue
+            self._entregar(suscriptor, texto)
+
+    def _entregar(self, suscriptor: _Suscriptor, texto):
+        try:
+            suscriptor.cola.put_nowait(texto)
+            self._entregados += 1
+        except asyncio.QueueFull:
+            # El cliente no lee al ritmo de los cambios: se descarta lo pendiente y se le pide que recargue
+            while not suscriptor.cola.empty():
+                suscriptor.cola.get_nowait()
+            suscriptor.cola.put_nowait(_REINICIO)
+            self._desbordes += 1
+
+    # Metodo para crear el suscriptor de un cliente, solo con los cambios de 'fecha' si se indica.
+    # Comprueba el límite antes de responder, pero el alta se hace al empezar eventos(): una respuesta
+    # que nunca llega a enviarse no deja un suscriptor registrado para siempre
+    def suscribir(self, fecha: date = None):
+        if len(self._suscriptores) >= self.max_clientes:
+            raise ServicioSobrecargadoError(
+                f"Hay {self.max_clientes} clientes conectados al stream, inténtalo de nuevo en unos segundos"
+            )
+        return _Suscriptor(self.tamano_cola, fecha)
+
+    def _alta(self, suscriptor: _Suscriptor):
+        self._suscriptores.add(suscriptor)
+        self._max_clientes_visto = max(self._max_clientes_visto, len(self._suscriptores))
+        if self._sondeo is None:
+            self._sondeo = asyncio.get_running_loop().create_task(self._sondear(), name="difusor-sondeo")
+
+    def baja(self, suscriptor: _Suscriptor):
+        self._suscriptores.discard(suscriptor)
+
+    # Metodo con el flujo SSE de un cliente: el evento inicial, los cambios y un comentario periódico
+    # para que los proxies no cierren la conexión. Da de alta al cliente y, al desconectarse, de baja
+    async def eventos(self, suscriptor: _Suscriptor):
+        self._alta(suscriptor)
+        try:
+            yield f"retry: {REINTENTO_MS}\n" + _evento("conectado", {"seq": self.indice.estadisticas()["ultimo_cambio"]})
+            while True:
+                try:
+                    texto = await asyncio.wait_for(suscriptor.cola.get(), PING_S)
+                except asyncio.TimeoutError:
+                    texto = _PING
+                if texto is _FIN:
+                    return
+                yield texto
+        finally:
+            self.baja(suscriptor)
+
+    # Mientras haya clientes, lee los cambios de otros workers: reservas a través del índice y mesas del catálogo
+    async def _sondear(self):
+        while self._suscriptores:
+            try:
+                mesas = await self.ejecutor.ejecutar(self._leer_cambios)
+                if mesas:
+                    self._repartir(_Mensaje(_evento("mesas", mesas)))
+            except Exception:
+                logger.exception("Error leyendo los cambios de disponibilidad")
+            await asyncio.sleep(self.intervalo_s)
+        self._sondeo = None
+
+    def _leer_cambios(self, conn):
+        self._sondeos += 1
+        self.indice.sincronizar(conn)
+        foto = catalogo.foto(conn)
+        actuales = {
+            mesa.id: {"mesa": mesa.id, "numero": mesa.numero, "capacidad": mesa.capacidad,
+                      "ubicacion": mesa.ubicacion, "activa": bool(mesa.activa)}
+            for mesa in foto.todas()
+        }
+        anteriores, self._mesas = self._mesas, actuales
+        if anteriores is None:
+            return []
+        cambios = [datos for mesa_id, datos in actuales.items() if anteriores.get(mesa_id) != datos]
+        cambios += [{"mesa": mesa_id, "eliminada": True} for mesa_id in anteriores if mesa_id not in actuales]
+        return cambios
+
+    # Metodo para cerrar los flujos abiertos y dejar de leer cambios
+    def cerrar(self):
+        self.indice.escuchar(None)
+        if self._sondeo is not None:
+            self._sondeo.cancel()
+            self._sondeo = None
+        for suscriptor in list(self._suscriptores):
+            while not suscriptor.cola.empty():
+                suscriptor.cola.get_nowait()
+            suscriptor.cola.put_nowait(_FIN)
+        self._bucle = None
+
+    def estadisticas(self):
+        return {
+            "clientes": len(self._suscriptores),
+            "max_clientes": self.max_clientes,
+            "max_clientes_visto": self._max_clientes_visto,
+            "tamano_cola": self.tamano_cola,
+            "intervalo_s": self.intervalo_s,
+            "eventos": self._eventos,
+            "entregados": self._entregados,
+            "desbordes": self._desbordes,
+            "reinicios": self._reinicios,
+            "sondeos": self._sondeos,
+        }
+
+
+# Difusor del proceso: 'suscriptor = difusor.suscribir(fecha)' y 'difusor.eventos(suscriptor)'
+difusor = DifusorDisponibilidad(ejecutor, indice, tamano_cola=DIFUSION_COLA, max_clientes=DIFUSION_MAX_CLIENTES,
+                                intervalo_s=DIFUSION_INTERVALO_S)
@@ -0,0 +1,91 @@
+# Archivo: app/ejecutor.py
+# Ejecutor de las operaciones de base de datos de los endpoints async.
+# Los endpoints no bloquean el bucle de eventos: cada operación se envía a un grupo propio de hilos
+# (uno por conexión del pool) y se espera con await. La cola está acotada: si ya hay demasiadas
+# operaciones esperando, la petición se rechaza al momento con 503 en vez de acumular latencia.
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from app.exceptions import ServicioSobrecargadoError
+from app.pool import PoolConexiones
+
+
+class EjecutorBD:
+    """
+    Ejecuta funciones de servicio 'funcion(conn, *args)' en hilos dedicados,
+    cada una con una conexión sacada del pool durante su ejecución.
+    """
+
+    def __init__(self, pool: PoolConexiones, hilos: int = 8, max_pendientes: int = 1000):
+        self.pool = pool
+        self.hilos = hilos
+        self.max_pendientes = max_pendientes
+        self._ejecutor = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._pendientes = 0
+        self._max_pendientes_visto = 0
+        self._ejecutadas = 0
+        self._rechazadas = 0
+        self._tiempo_cola_total = 0.0
+        self._tiempo_cola_max = 0.0
+
+    def _hilos(self):
+        # Se crea al primer uso para que cada worker de uvicorn tenga los suyos
+        if self._ejecutor is None:
+            with self._lock:
+                if self._ejecutor is None:
+                    self._ejecutor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="bd")
+        return self._ejecutor
+
+    def _ejecutar_con_conexion(self, encolada, funcion, args, kwargs):
+        espera = perf_counter() - encolada
+        with self._lock:
+            self._tiempo_cola_total += espera
+            if espera > self._tiempo_cola_max:
+                self._tiempo_cola_max = espera
+        with self.pool.conexion() as conn:
+            return funcion(conn, *args, **kwargs)
+
+    # Metodo para ejecutar una función de servicio sin bloquear el bucle de eventos
+    async def ejecutar(self, funcion, *args, **kwargs):
+        with self._lock:
+            if self._pendientes >= self.max_pendientes:
+                self._rechazadas += 1
+                raise ServicioSobrecargadoError(
+                    f"Hay {self._pendientes} operaciones en cola, inténtalo de nuevo en unos segundos"
+                )
+            self._pendientes += 1
+            if self._pendientes > self._max_pendientes_visto:
+                self._max_pendientes_visto = self._pendientes
+        try:
+            bucle = asyncio.get_running_loop()
+            return await bucle.run_in_executor(
+                self._hilos(), self._ejecutar_con_conexion, perf_counter(), funcion, args, kwargs
+            )
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+                self._ejecutadas += 1
+
+    # Metodo para esperar a las operaciones en curso y parar los hilos
+    def cerrar(self):
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=True)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "hilos": self.hilos,
+                "max_pendientes": self.max_pendientes,
+                "pendientes": self._pendientes,
+                "max_pendientes_visto": self._max_pendientes_visto,
+                "ejecutadas": self._ejecutadas,
+                "rechazadas": self._rechazadas,
+                "tiempo_cola_medio_ms": round(self._tiempo_cola_total / self._ejecutadas * 1000, 3) if self._ejecutadas else 0.0,
+                "tiempo_cola_max_ms": round(self._tiempo_cola_max * 1000, 3),
+            }
@@ -0,0 +1,176 @@
+# Archivo: app/escritor.py
+# Escritor único con commit agrupado (group commit).
+# SQLite solo admite un escritor a la vez: si cada petición abre su transacción y hace su commit,
+# en un pico de reservas todas compiten por el bloqueo y cada una paga su propio fsync.
+# Aquí las escrituras se encolan y un solo hilo las aplica por lotes dentro de una transacción;
+# cada operación va en su propio SAVEPOINT, así que el error de una no afecta a las demás
+# y cada llamante recibe su resultado o su excepción de negocio.
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from time import monotonic, perf_counter
+from app.database import pool, transaccion, DB_ESCRITOR_LOTE, DB_ESCRITOR_ESPERA_MS, DB_MAX_PENDIENTES
+from app.exceptions import ServicioSobrecargadoError
+from app.pool import PoolConexiones
+from app.services.cache import cache
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import indice
+
+# Marca de parada en la cola
+_PARAR = object()
+
+
+class EscritorBD:
+    """
+    Aplica funciones de servicio 'funcion(conn, *args)' que escriben en la BD.
+    Agrupa hasta 'max_lote' operaciones, esperando como mucho 'espera_ms' a que lleguen más
+    desde la primera, y las confirma con un único COMMIT.
+    """
+
+    def __init__(self, pool: PoolConexiones, max_lote: int = 64, espera_ms: float = 1.0, max_pendientes: int = 1000):
+        self.pool = pool
+        self.max_lote = max_lote
+        self.espera_ms = espera_ms
+        self.max_pendientes = max_pendientes
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._hilo = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._lotes = 0
+        self._operaciones = 0
+        self._max_lote_visto = 0
+        self._rechazadas = 0
+        self._lotes_fallidos = 0
+        self._tiempo_lote_total = 0.0
+
+    def _arrancar(self):
+        # Se crea al primer uso para que cada worker de uvicorn tenga el suyo
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._bucle, name="escritor-bd", daemon=True)
+                    self._hilo.start()
+
+    def _encolar(self, funcion, args, kwargs):
+        self._arrancar()
+        futuro = Future()
+        try:
+            self._cola.put_nowait((funcion, args, kwargs, futuro))
+        except queue.Full:
+            with self._lock:
+                self._rechazadas += 1
+            raise ServicioSobrecargadoError(
+                f"Hay {self.max_pendientes} escrituras en cola, inténtalo de nuevo en unos segundos"
+            )
+        return futuro
+
+    # Metodo para encolar una escritura desde un endpoint async y esperar su resultado
+    async def escribir(self, funcion, *args, **kwargs):
+        return await asyncio.wrap_future(self._encolar(funcion, args, kwargs))
+
+    # Metodo para encolar una escritura desde código síncrono (scripts, benchmarks) y esperar su resultado
+    def ejecutar(self, funcion, *args, **kwargs):
+        return self._encolar(funcion, args, kwargs).result()
+
+    def _bucle(self):
+        while True:
+            operacion = self._cola.get()
+            if operacion is _PARAR:
+                return
+            lote = [operacion]
+            parar = False
+            limite = monotonic() + self.espera_ms / 1000
+            while len(lote) < self.max_lote:
+                try:
+                    operacion = self._cola.get(timeout=max(0.0, limite - monotonic()))
+                except queue.Empty:
+                    break
+                if operacion is _PARAR:
+                    parar = True
+                    break
+                lote.append(operacion)
+            self._aplicar(lote)
+            if parar:
+                return
+
+    # Metodo para aplicar un lote en una transacción, cada operación dentro de su SAVEPOINT
+    def _aplicar(self, lote: list):
+        inicio = perf_counter()
+        resultados = []
+        try:
+            with self.pool.conexion() as conn:
+                try:
+                    with transaccion(conn):
+                        for funcion, args, kwargs, futuro in lote:
+                            # La petición puede haberse cancelado mientras esperaba en la cola
+                            if not futuro.set_running_or_notify_cancel():
+                                continue
+                            try:
+                                with transaccion(conn):
+                                    resultados.append((futuro, funcion(conn, *args, **kwargs), None))
+                            except Exception as e:
+                                resultados.append((futuro, None, e))
+                except Exception:
+                    # Ha fallado el BEGIN o el COMMIT: ninguna operación del lote ha quedado escrita.
+                    # Las estructuras en memoria pueden haber visto cambios sin confirmar, se rehacen desde la BD
+                    indice.invalidar()
+                    catalogo.invalidar()
+                    cache.vaciar()
+                    raise
+
+                # Los cambios ya están confirmados: el índice puede aplicarlos
+                try:
+                    indice.sincronizar(conn)
+                except Exception:
+                    indice.invalidar()
+        except Exception as e:
+            with self._lock:
+                self._lotes_fallidos += 1
+            for _, _, _, futuro in lote:
+                if futuro.running():
+                    futuro.set_exception(e)
+            return
+
+        # Los resultados se entregan después del COMMIT, nunca antes
+        for futuro, resultado, error in resultados:
+            if error is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(error)
+
+        with self._lock:
+            self._lotes += 1
+            self._operaciones += len(lote)
+            self._tiempo_lote_total += perf_counter() - inicio
+            if len(lote) > self._max_lote_visto:
+                self._max_lote_visto = len(lote)
+
+    # Metodo para aplicar las escrituras que quedan en cola y parar el hilo
+    def cerrar(self):
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._cola.put(_PARAR)
+            hilo.join()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "max_lote": self.max_lote,
+                "espera_ms": self.espera_ms,
+                "max_pendientes": self.max_pendientes,
+                "pendientes": self._cola.qsize(),
+                "lotes": self._lotes,
+                "operaciones": self._operaciones,
+                "tamano_medio_lote": round(self._operaciones / self._lotes, 2) if self._lotes else 0.0,
+                "max_lote_visto": self._max_lote_visto,
+                "lotes_fallidos": self._lotes_fallidos,
+                "rechazadas": self._rechazadas,
+                "tiempo_medio_lote_ms": round(self._tiempo_lote_total / self._lotes * 1000, 3) if self._lotes else 0.0,
+            }
+
+
+# Escritor compartido por todo el proceso: 'await escritor.escribir(servicio, *args)'
+escritor = EscritorBD(pool, max_lote=DB_ESCRITOR_LOTE, espera_ms=DB_ESCRITOR_ESPERA_MS, max_pendientes=DB_MAX_PENDIENTES)
@@ -6,5 +6,8 @@ from .custom_exceptions import (
     ReservaSolapadaError,
     CapacidadExcedidaError,
     FueraDeHorarioError,
-    CancelacionNoPermitidaError
+    CancelacionNoPermitidaError,
+    PoolAgotadoError,
+    ServicioSobrecargadoError,
+    ReservaArchivadaError
 )
\ No newline at end of file
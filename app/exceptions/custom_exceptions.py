@@ -22,4 +22,15 @@ class FueraDeHorarioError(Exception):
 
 class CancelacionNoPermitidaError(Exception):
     """La reserva no puede cancelarse (muy tarde o estado inválido)"""
-    pass
\ No newline at end of file
+    pass
+
+class PoolAgotadoError(Exception):
+    """No hay conexiones libres a la base de datos en el tiempo de espera"""
+    pass
+class ServicioSobrecargadoError(Exception):
+    """Hay demasiadas operaciones de base de datos en cola para aceptar más"""
+    pass
+
+class ReservaArchivadaError(Exception):
+    """La reserva está en el archivo histórico y no se puede modificar"""
+    pass
@@ -0,0 +1,376 @@
+# Archivo: app/generador_datos.py
+# Generador de datos sintéticos a escala de producción (millones de clientes y reservas) y carga masiva.
+# Los datos salen de una semilla, así que cada ejecución con los mismos parámetros produce la misma BD.
+#
+# Las reservas respetan las reglas del restaurante: cada mesa tiene como mucho dos pases por turno
+# que no se solapan y empiezan dentro del horario que valida reserva_service, los comensales no superan la capacidad
+# y la ocupación depende del día de la semana, del turno y del pase. Las pasadas están completadas salvo
+# las canceladas y los no presentados, que quedan cancelados con la marca de app/services/transiciones_service.py.
+#
+# La carga quita los triggers e índices de las tablas que se rellenan y, por bloques y en una sola transacción
+# con PRAGMAs de carga masiva, pasa las filas como enteros con executemany a una tabla temporal en memoria
+# y las inserta con un INSERT ... SELECT que pone los textos (nombres, fechas, estados) desde tablas de consulta.
+# Después crea los índices, escribe las estadísticas (acumuladas en NumPy mientras se generan las filas)
+# y vuelve a poner los triggers.
+# Se hace con el servidor parado: durante la carga la BD está bloqueada y sin diario.
+#
+# Uso: python -m app.cli generar-datos --clientes 1000000 --reservas 10000000 --mesas 400 [--semilla 1]
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from time import perf_counter
+
+import numpy as np
+
+from app.database import TABLA_ACENTOS, TABLAS_VERSIONADAS, a_epoch, crear_vista_historico
+from app.services.transiciones_service import MARCA_NO_PRESENTADA
+
+NOMBRES = (
+    "Juan", "María", "Luis", "Ana", "Carlos", "Elena", "Pedro", "Laura", "David", "Sofía", "Javier", "Lucía",
+    "Miguel", "Carmen", "José", "Paula", "Andrés", "Marta", "Álvaro", "Núria", "Jordi", "Irene", "Raúl", "Inés",
+)
+APELLIDOS = (
+    "García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Martín", "Jiménez", "Ruiz", "Hernández",
+    "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero", "Gil", "Vega", "Castro", "Ortiz", "Rubio", "Serra", "Font",
+)
+
+# Mesas: reparto de capacidades y ubicaciones
+CAPACIDADES = ((2, 0.3), (4, 0.4), (6, 0.2), (8, 0.1))
+UBICACIONES = (("interior", 0.6), ("terraza", 0.3), ("privado", 0.1))
+
+# Turnos en medias horas desde medianoche: primera hora de inicio y hora a la que termina la última reserva.
+# Las reservas duran 2 horas y empiezan como tarde a las 15:00 y a las 23:00, dentro del horario
+# de reserva_service (12:00-16:00 y 20:00-00:00). Cada mesa tiene dos pases por turno: el primero
+# empieza en la primera hora del turno y el segundo cuando ha terminado el primero
+TURNOS = (("comida", 24, 34), ("cena", 40, 50))
+MEDIAS_HORAS_RESERVA = 4
+
+# Probabilidad de que una mesa tenga reserva en cada pase (turno, pase) y factor por día de la semana (lunes=0)
+OCUPACION_PASE = {("comida", 0): 0.6, ("comida", 1): 0.3, ("cena", 0): 0.85, ("cena", 1): 0.45}
+FACTOR_DIA = (0.55, 0.6, 0.7, 0.85, 1.0, 1.0, 0.8)
+
+# Reparto de estados: pasadas y futuras
+TASA_CANCELACION_PASADAS = 0.12
+TASA_NO_PRESENTADOS = 0.06
+TASA_CANCELACION_FUTURAS = 0.08
+TASA_CONFIRMADAS_FUTURAS = 0.5
+
+# Días con reservas por delante de hoy y antelación media con la que se reserva
+DIAS_FUTURO = 60
+ANTELACION_MEDIA_DIAS = 7
+ANTELACION_MAX_DIAS = 60
+
+# Filas por bloque de executemany
+FILAS_BLOQUE = 500_000
+
+# Memoria del índice de texto antes de escribir un segmento: durante la carga es grande para que
+# FTS5 escriba pocos segmentos y no tenga que fusionarlos; después vuelve al valor por defecto de FTS5
+FTS_HASHSIZE_CARGA = 256 * 1024 * 1024
+FTS_HASHSIZE = 1024 * 1024
+
+# Ajustes de la conexión durante la carga: sin diario ni esperas al disco, con caché grande
+# y con un hilo más por CPU para ordenar al crear los índices.
+# Si la carga falla a medias la BD queda inservible, por eso solo se hace sobre BD sin datos.
+# Van con 'main.' para no tocar el archivo histórico si la conexión lo tiene adjunto
+PRAGMAS_CARGA = (
+    "PRAGMA main.journal_mode = OFF",
+    "PRAGMA main.synchronous = OFF",
+    "PRAGMA main.locking_mode = EXCLUSIVE",
+    "PRAGMA main.cache_size = -200000",
+    "PRAGMA temp_store = MEMORY",
+    f"PRAGMA threads = {(os.cpu_count() or 1) - 1}",
+)
+PRAGMAS_DESPUES = (
+    "PRAGMA main.locking_mode = NORMAL",
+    "PRAGMA main.synchronous = NORMAL",
+    "PRAGMA threads = 0",
+)
+
+
+def _reservas_por_mesa_y_dia():
+    pases = sum(OCUPACION_PASE.values())
+    return pases * sum(FACTOR_DIA) / len(FACTOR_DIA)
+
+
+def _elegir(rng, opciones, n):
+    valores, pesos = zip(*opciones)
+    return rng.choice(np.array(valores, dtype=object), size=n, p=np.array(pesos) / sum(pesos))
+
+
+def generar_mesas(rng, mesas: int):
+    capacidades = _elegir(rng, CAPACIDADES, mesas)
+    ubicaciones = _elegir(rng, UBICACIONES, mesas)
+    return [(n + 1, n + 1, int(capacidades[n]), ubicaciones[n], 1) for n in range(mesas)]
+
+
+# Metodo para generar los clientes con id en (desde, hasta] como filas de enteros para executemany:
+# id, posiciones en NOMBRES y APELLIDOS y teléfono
+def generar_clientes(rng, desde: int, hasta: int):
+    n = hasta - desde
+    nombres = rng.integers(len(NOMBRES), size=n)
+    apellidos1 = rng.integers(len(APELLIDOS), size=n)
+    apellidos2 = rng.integers(len(APELLIDOS), size=n)
+    telefonos = rng.integers(600_000_000, 800_000_000, size=n)
+    return zip(range(desde + 1, hasta + 1), nombres.tolist(), apellidos1.tolist(), apellidos2.tolist(),
+               telefonos.tolist())
+
+
+# Totales de las tablas de estadísticas, acumulados mientras se generan las reservas.
+# Es lo mismo que calcula rellenar_estadisticas, sin los GROUP BY sobre la tabla ya cargada
+class _Estadisticas:
+    ESTADOS = ("pendiente", "confirmada", "completada", "cancelada")
+
+    def __init__(self, clientes: int, mesas: int, primer_dia: date, dias: int):
+        self.estado = np.zeros(len(self.ESTADOS), dtype=np.int64)
+        self.cliente = np.zeros(clientes + 1, dtype=np.int64)
+        self.mesa = np.zeros(mesas + 1, dtype=np.int64)
+        # Reservas activas por (día, turno): posición 2 * día + (0 comida, 1 cena)
+        self.turno = np.zeros(2 * dias, dtype=np.int64)
+        self.primer_dia = a_epoch(datetime.combine(primer_dia, datetime.min.time()))
+
+    def sumar(self, desplazamiento: int, dia, media_hora, cliente, mesa, estado):
+        self.estado += np.bincount(estado, minlength=len(self.ESTADOS))
+        self.cliente += np.bincount(cliente, minlength=len(self.cliente))
+        self.mesa += np.bincount(mesa, minlength=len(self.mesa))
+        activa = estado != self.ESTADOS.index("cancelada")
+        # Mismo corte que SQL_TURNO: antes de las 18:00 es comida
+        posicion = 2 * (desplazamiento + dia[activa]) + (media_hora[activa] >= 36)
+        self.turno += np.bincount(posicion, minlength=len(self.turno))
+
+    def escribir(self, conn: sqlite3.Connection, clientes: int, mesas: int):
+        for tabla in ("estadisticas_estado", "estadisticas_turno", "estadisticas_cliente",
+                      "estadisticas_mesa", "estadisticas_totales"):
+            conn.execute(f"DELETE FROM {tabla}")
+        conn.executemany("INSERT INTO estadisticas_estado (estado, total) VALUES (?, ?)", [
+            (estado, total) for estado, total in zip(self.ESTADOS, self.estado.tolist()) if total
+        ])
+        for tabla, columna, totales in (("estadisticas_cliente", "cliente_id", self.cliente),
+                                        ("estadisticas_mesa", "mesa_id", self.mesa)):
+            ids = np.nonzero(totales)[0]
+            conn.executemany(f"INSERT INTO {tabla} ({columna}, total) VALUES (?, ?)",
+                             zip(ids.tolist(), totales[ids].tolist()))
+        posiciones = np.nonzero(self.turno)[0]
+        conn.executemany("INSERT INTO estadisticas_turno (dia, turno, total) VALUES (?, ?, ?)", (
+            (self.primer_dia + (p // 2) * 86400, ("comida", "cena")[p % 2], total)
+            for p, total in zip(posiciones.tolist(), self.turno[posiciones].tolist())
+        ))
+        conn.executemany("INSERT INTO estadisticas_totales (clave, total) VALUES (?, ?)",
+                         [("clientes", clientes), ("mesas", mesas)])
+
+
+# Metodo para generar las reservas de los días [primer_dia, primer_dia + dias) como filas de enteros para executemany.
+# 'desplazamiento' es la posición de primer_dia en todo el rango, para acumular las estadísticas y para
+# dar las fechas como posiciones en la tabla de medias horas (que empieza ANTELACION_MAX_DIAS días antes del rango)
+def generar_reservas(rng, primer_dia: date, dias: int, capacidades: np.ndarray, clientes: int, hoy: date,
+                     estadisticas: _Estadisticas, desplazamiento: int):
+    mesas = len(capacidades)
+
+    dias_semana = (np.arange(dias) + primer_dia.weekday()) % 7
+    factor = np.array(FACTOR_DIA)[dias_semana][:, None]
+    columnas = []
+    for turno, apertura, cierre in TURNOS:
+        # Medias horas de inicio de los dos pases de cada (día, mesa)
+        ultimo = cierre - MEDIAS_HORAS_RESERVA
+        primero = apertura + rng.integers(0, ultimo - apertura - MEDIAS_HORAS_RESERVA + 1, size=(dias, mesas))
+        hueco = ultimo - primero - MEDIAS_HORAS_RESERVA + 1
+        segundo = primero + MEDIAS_HORAS_RESERVA + (rng.random((dias, mesas)) * hueco).astype(np.int64)
+        for pase, inicio_pase in enumerate((primero, segundo)):
+            ocupada = rng.random((dias, mesas)) < OCUPACION_PASE[(turno, pase)] * factor
+            dia, mesa = np.nonzero(ocupada)
+            columnas.append((dia, mesa, inicio_pase[dia, mesa]))
+    dia = np.concatenate([c[0] for c in columnas])
+    mesa = np.concatenate([c[1] for c in columnas])
+    media_hora = np.concatenate([c[2] for c in columnas])
+
+    # Orden cronológico, como llegarían a la tabla
+    orden = np.lexsort((mesa, media_hora, dia))
+    dia, mesa, media_hora = dia[orden], mesa[orden], media_hora[orden]
+    n = len(dia)
+
+    # Fechas como posición en la tabla de medias horas; el fin es el inicio más MEDIAS_HORAS_RESERVA
+    antes = desplazamiento + ANTELACION_MAX_DIAS
+    inicios = (dia + antes) * 48 + media_hora
+    # Se reserva con unos días de antelación, y nunca después de hoy
+    antelacion = np.minimum(rng.geometric(1 / ANTELACION_MEDIA_DIAS, size=n), ANTELACION_MAX_DIAS)
+    dia_creacion = np.minimum(dia - antelacion, (hoy - primer_dia).days - 1)
+    creaciones = (dia_creacion + antes) * 48 + rng.integers(18, 46, size=n)
+
+    # Comensales: la mayoría llena o casi llena la mesa
+    capacidad = capacidades[mesa]
+    comensales = np.maximum(1, capacidad - rng.binomial(capacidad // 2, 0.35))
+
+    # Clientes con reparto sesgado: unos pocos clientes habituales acumulan muchas reservas
+    cliente = (clientes * rng.random(n) ** 3).astype(np.int64) + 1
+
+    pasada = dia < (hoy - primer_dia).days
+    tirada = rng.random(n)
+    no_presentada = pasada & (tirada >= TASA_CANCELACION_PASADAS) & (tirada < TASA_CANCELACION_PASADAS + TASA_NO_PRESENTADOS)
+    estado = np.where(
+        pasada,
+        np.where(tirada < TASA_CANCELACION_PASADAS + TASA_NO_PRESENTADOS, 3, 2),
+        np.where(tirada < TASA_CANCELACION_FUTURAS, 3,
+                 np.where(tirada < TASA_CANCELACION_FUTURAS + TASA_CONFIRMADAS_FUTURAS, 1, 0)),
+    )
+    estadisticas.sumar(desplazamiento, dia, media_hora, cliente, mesa + 1, estado)
+
+    return zip(
+        cliente.tolist(), (mesa + 1).tolist(), inicios.tolist(), comensales.tolist(), estado.tolist(),
+        no_presentada.tolist(), creaciones.tolist(),
+    )
+
+
+# Metodo para crear una tabla temporal de consulta posición -> texto (y texto sin acentos, para el índice FTS)
+def _crear_tabla_textos(conn: sqlite3.Connection, nombre: str, textos):
+    conn.execute(f"CREATE TEMP TABLE {nombre} (n INTEGER PRIMARY KEY, texto TEXT, sin_acentos TEXT)")
+    conn.executemany(f"INSERT INTO temp.{nombre} (n, texto, sin_acentos) VALUES (?, ?, ?)",
+                     ((n, texto, texto.translate(TABLA_ACENTOS)) for n, texto in enumerate(textos)))
+
+
+# Filas de clientes a partir de la tabla temporal de carga; {columna} es 'texto' o 'sin_acentos'
+SQL_FILAS_CLIENTES = """
+    SELECT c.id, n.{columna} || ' ' || a1.{columna} || ' ' || a2.{columna}, 'cliente' || c.id || '@example.com',
+           CAST(c.telefono AS TEXT)
+    FROM temp.carga_clientes c
+    JOIN temp.nombres n ON n.n = c.nombre
+    JOIN temp.apellidos a1 ON a1.n = c.apellido1
+    JOIN temp.apellidos a2 ON a2.n = c.apellido2
+    ORDER BY c.id
+"""
+
+
+def _objetos(conn: sqlite3.Connection, tipo: str, tabla: str):
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = ? AND tbl_name = ? AND sql IS NOT NULL", (tipo, tabla)
+    ).fetchall()
+
+
+# Metodo para generar y cargar el conjunto de datos completo en una BD ya migrada y sin datos.
+# Devuelve el resumen de lo cargado y el tiempo de cada fase
+def cargar(conn: sqlite3.Connection, clientes: int = 10000, reservas: int = 100000, mesas: int = 40,
+           semilla: int = 1, hoy: date = None):
+    tablas = ["main.clientes", "main.mesas", "main.reservas"]
+    # Las reservas del archivo histórico también cuentan en las estadísticas que se escriben al final
+    con_archivo = "archivo" in {fila[1] for fila in conn.execute("PRAGMA database_list")}
+    if con_archivo:
+        tablas.append("archivo.reservas")
+    for tabla in tablas:
+        if conn.execute(f"SELECT EXISTS (SELECT 1 FROM {tabla})").fetchone()[0]:
+            raise ValueError(f"La tabla {tabla} ya tiene datos: la carga masiva solo se hace sobre una BD vacía")
+
+    hoy = hoy or date.today()
+    rng = np.random.default_rng(semilla)
+    tiempos = {}
+    inicio = perf_counter()
+
+    def fase(nombre):
+        nonlocal inicio
+        ahora = perf_counter()
+        tiempos[nombre] = round(ahora - inicio, 3)
+        inicio = ahora
+
+    conn.commit()
+    modo_diario = conn.execute("PRAGMA main.journal_mode").fetchone()[0]
+    for pragma in PRAGMAS_CARGA:
+        conn.execute(pragma)
+
+    # Sin triggers ni índices en las tablas que se rellenan: las estadísticas, el índice de texto
+    # y los índices se construyen de una vez al final
+    triggers = [fila for tabla in ("clientes", "mesas", "reservas") for fila in _objetos(conn, "trigger", tabla)]
+    indices = _objetos(conn, "index", "reservas")
+    conn.execute("BEGIN")
+    for nombre, _ in triggers:
+        conn.execute(f"DROP TRIGGER {nombre}")
+    for nombre, _ in indices:
+        conn.execute(f"DROP INDEX {nombre}")
+
+    filas_mesas = generar_mesas(rng, mesas)
+    conn.executemany("INSERT INTO mesas (id, numero, capacidad, ubicacion, activa) VALUES (?, ?, ?, ?, ?)", filas_mesas)
+    capacidades = np.array([fila[2] for fila in filas_mesas])
+
+    # El índice de texto se rellena a la vez con los nombres sin acentos, como hace el trigger
+    _crear_tabla_textos(conn, "nombres", NOMBRES)
+    _crear_tabla_textos(conn, "apellidos", APELLIDOS)
+    conn.execute("CREATE TEMP TABLE carga_clientes (id INTEGER, nombre INTEGER, apellido1 INTEGER, "
+                 "apellido2 INTEGER, telefono INTEGER)")
+    conn.execute("DELETE FROM clientes_fts")
+    conn.execute("INSERT INTO clientes_fts (clientes_fts, rank) VALUES ('hashsize', ?)", (FTS_HASHSIZE_CARGA,))
+    for desde in range(0, clientes, FILAS_BLOQUE):
+        conn.executemany("INSERT INTO temp.carga_clientes VALUES (?, ?, ?, ?, ?)",
+                         generar_clientes(rng, desde, min(clientes, desde + FILAS_BLOQUE)))
+        conn.execute("INSERT INTO clientes (id, nombre, email, telefono) "
+                     + SQL_FILAS_CLIENTES.format(columna="texto"))
+        conn.execute("INSERT INTO clientes_fts (rowid, nombre, email, telefono) "
+                     + SQL_FILAS_CLIENTES.format(columna="sin_acentos"))
+        conn.execute("DELETE FROM temp.carga_clientes")
+    conn.execute("INSERT INTO clientes_fts (clientes_fts, rank) VALUES ('hashsize', ?)", (FTS_HASHSIZE,))
+    fase("clientes")
+
+    # Rango de días: termina DIAS_FUTURO días después de hoy y empieza lo bastante atrás
+    # para que salgan aproximadamente 'reservas' filas
+    dias = max(1, round(reservas / (mesas * _reservas_por_mesa_y_dia())))
+    primer_dia = hoy + timedelta(days=DIAS_FUTURO) - timedelta(days=dias)
+    dias_bloque = max(1, FILAS_BLOQUE // (mesas * len(OCUPACION_PASE)))
+    estadisticas = _Estadisticas(clientes, mesas, primer_dia, dias)
+
+    # Fechas como texto 'YYYY-MM-DD HH:MM:SS' de cada media hora del rango, desde ANTELACION_MAX_DIAS días
+    # antes (fechas de creación) hasta el día siguiente al último (las cenas terminan después de medianoche)
+    origen = a_epoch(datetime.combine(primer_dia - timedelta(days=ANTELACION_MAX_DIAS), datetime.min.time()))
+    conn.execute("CREATE TEMP TABLE medias_horas (n INTEGER PRIMARY KEY, texto TEXT)")
+    conn.execute("""
+        WITH RECURSIVE serie (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM serie WHERE n + 1 < ?)
+        INSERT INTO temp.medias_horas (n, texto) SELECT n, datetime(? + n * 1800, 'unixepoch') FROM serie
+    """, ((dias + ANTELACION_MAX_DIAS + 2) * 48, origen))
+    _crear_tabla_textos(conn, "estados", _Estadisticas.ESTADOS)
+    conn.execute("CREATE TEMP TABLE carga_reservas (cliente_id INTEGER, mesa_id INTEGER, inicio INTEGER, "
+                 "comensales INTEGER, estado INTEGER, no_presentada INTEGER, creacion INTEGER)")
+    for desplazamiento in range(0, dias, dias_bloque):
+        conn.executemany("INSERT INTO temp.carga_reservas VALUES (?, ?, ?, ?, ?, ?, ?)", generar_reservas(
+            rng, primer_dia + timedelta(days=desplazamiento), min(dias_bloque, dias - desplazamiento),
+            capacidades, clientes, hoy, estadisticas, desplazamiento,
+        ))
+        conn.execute("""
+            INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado, notas,
+                                  fecha_creacion)
+            SELECT c.cliente_id, c.mesa_id, i.texto, f.texto, c.comensales, e.texto,
+                   CASE WHEN c.no_presentada THEN ? END, cr.texto
+            FROM temp.carga_reservas c
+            JOIN temp.medias_horas i ON i.n = c.inicio
+            JOIN temp.medias_horas f ON f.n = c.inicio + ?
+            JOIN temp.medias_horas cr ON cr.n = c.creacion
+            JOIN temp.estados e ON e.n = c.estado
+            ORDER BY c.rowid
+        """, (MARCA_NO_PRESENTADA, MEDIAS_HORAS_RESERVA))
+        conn.execute("DELETE FROM temp.carga_reservas")
+    for tabla in ("nombres", "apellidos", "carga_clientes", "medias_horas", "estados", "carga_reservas"):
+        conn.execute(f"DROP TABLE temp.{tabla}")
+    fase("reservas")
+
+    for _, sql in indices:
+        conn.execute(sql)
+    fase("indices")
+
+    estadisticas.escribir(conn, clientes, mesas)
+    # Las cachés de otros procesos tienen que ver que estas tablas han cambiado
+    conn.executemany(
+        "UPDATE versiones_tablas SET version = version + 1 WHERE tabla = ?", [(t,) for t in TABLAS_VERSIONADAS]
+    )
+    for _, sql in triggers:
+        conn.execute(sql)
+    conn.commit()
+    fase("estadisticas")
+
+    for pragma in PRAGMAS_DESPUES:
+        conn.execute(pragma)
+    conn.execute(f"PRAGMA main.journal_mode = {modo_diario}")
+    # PRAGMA temp_store ha borrado la vista temporal del histórico
+    if con_archivo:
+        crear_vista_historico(conn)
+
+    return {
+        "mesas": mesas,
+        "clientes": clientes,
+        "reservas": int(estadisticas.estado.sum()),
+        "desde": primer_dia.isoformat(),
+        "hasta": (hoy + timedelta(days=DIAS_FUTURO)).isoformat(),
+        "segundos": tiempos,
+    }
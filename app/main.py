@@ -1,8 +1,16 @@
 import sqlite3
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from app.database import init_db, DB_NAME
-from app.routers import clientes, mesas, reservas, estadisticas
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.database import init_db, DB_NAME, pool, ejecutor
+from app.escritor import escritor
+from app.archivador import archivador
+from app.planificador import planificador
+from app.difusor import difusor
+from app.metricas import MiddlewareMetricas, registro, RESERVAS_SOLAPADAS
+from app.services.cache import cache
+from app.routers import clientes, mesas, reservas, estadisticas, sistema
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import indice
 # Importamos datos de prueba (desde la carpeta en la raíz)
 from data.restaurante import lista_clientes, lista_mesas
 
@@ -13,7 +21,10 @@ from app.exceptions import (
     ReservaSolapadaError,
     CapacidadExcedidaError,
     FueraDeHorarioError,
-    CancelacionNoPermitidaError
+    CancelacionNoPermitidaError,
+    PoolAgotadoError,
+    ServicioSobrecargadoError,
+    ReservaArchivadaError
 )
 
 # Crear tablas
@@ -22,6 +33,20 @@ init_db()
 # Instancia de la aplicación
 app = FastAPI(title="La Mesa Dorada API", version="1.0.0")
 
+# Métricas de cada petición para /metrics
+app.add_middleware(MiddlewareMetricas)
+
+# Las estadísticas de los componentes en memoria también se publican en /metrics
+registro.colector("restaurante_pool", pool.estadisticas)
+registro.colector("restaurante_ejecutor", ejecutor.estadisticas)
+registro.colector("restaurante_escritor", escritor.estadisticas)
+registro.colector("restaurante_cache", cache.estadisticas)
+registro.colector("restaurante_catalogo", catalogo.estadisticas)
+registro.colector("restaurante_indice", indice.estadisticas)
+registro.colector("restaurante_archivador", archivador.estadisticas)
+registro.colector("restaurante_planificador", planificador.estadisticas)
+registro.colector("restaurante_difusor", difusor.estadisticas)
+
 # Eventos de arranque
 @app.on_event("startup")
 def startup_event():
@@ -33,26 +58,49 @@ def startup_event():
         # Si no hay mesas, las creamos
         cursor.execute("SELECT COUNT(*) FROM mesas")
         if cursor.fetchone()[0] == 0:
-            for mesa in lista_mesas:
-                cursor.execute("""
-                    INSERT INTO mesas (numero, capacidad, ubicacion, activa)
-                    VALUES (?, ?, ?, ?)
-                """, (mesa["numero"], mesa["capacidad"], mesa["ubicacion"], mesa["activa"]))
+            cursor.executemany("""
+                INSERT INTO mesas (numero, capacidad, ubicacion, activa)
+                VALUES (:numero, :capacidad, :ubicacion, :activa)
+            """, lista_mesas)
             conn.commit()
         
         # Si no hay clientes, los creamos
         cursor.execute("SELECT COUNT(*) FROM clientes")
         if cursor.fetchone()[0] == 0:
-            for cliente in lista_clientes:
-                cursor.execute("""
-                    INSERT INTO clientes (nombre, email, telefono, notas)
-                    VALUES (?, ?, ?, ?)
-                """, (cliente["nombre"], cliente["email"], cliente["telefono"], cliente["notas"]))
+            cursor.executemany("""
+                INSERT INTO clientes (nombre, email, telefono, notas)
+                VALUES (:nombre, :email, :telefono, :notas)
+            """, lista_clientes)
             conn.commit()
             
     finally:
         conn.close()
 
+    # Cargamos el catálogo de mesas y el índice de disponibilidad en memoria
+    with pool.conexion() as conn:
+        catalogo.cargar(conn)
+        indice.reconstruir(conn)
+
+    # Las reservas antiguas se van moviendo al archivo histórico en segundo plano
+    archivador.arrancar()
+
+    # Cambios de estado automáticos de las reservas; el arranque se ejecuta en el bucle de asyncio de la app
+    planificador.arrancar()
+
+    # Los cambios que aplica el índice se difunden a los clientes de /mesas/disponibilidad/stream
+    difusor.arrancar()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Aplicamos las escrituras que quedan en cola, esperamos a las operaciones en curso
+    # y cerramos las conexiones del pool. El planificador y el archivador paran antes porque escriben a través del escritor
+    difusor.cerrar()
+    planificador.cerrar()
+    archivador.cerrar()
+    escritor.cerrar()
+    ejecutor.cerrar()
+    pool.cerrar()
+
 # Exceptions handlers
 
 @app.exception_handler(ClienteNoEncontradoError)
@@ -65,6 +113,8 @@ async def mesa_no_disponible_handler(request: Request, exc: MesaNoDisponibleErro
 
 @app.exception_handler(ReservaSolapadaError)
 async def reserva_solapada_handler(request: Request, exc: ReservaSolapadaError):
+    # Se cuenta aquí, una vez por petición rechazada y cuando su lote ya ha terminado
+    RESERVAS_SOLAPADAS.inc()
     return JSONResponse(status_code=409, content={"message": str(exc)}) # 409 Conflict
 
 @app.exception_handler(CapacidadExcedidaError)
@@ -79,13 +129,34 @@ async def fuera_de_horario_handler(request: Request, exc: FueraDeHorarioError):
 async def cancelacion_no_permitida_handler(request: Request, exc: CancelacionNoPermitidaError):
     return JSONResponse(status_code=400, content={"message": str(exc)})
 
+@app.exception_handler(PoolAgotadoError)
+async def pool_agotado_handler(request: Request, exc: PoolAgotadoError):
+    return JSONResponse(status_code=503, content={"message": str(exc)}) # 503 Service Unavailable
+
+@app.exception_handler(ServicioSobrecargadoError)
+async def servicio_sobrecargado_handler(request: Request, exc: ServicioSobrecargadoError):
+    # Retry-After orienta a los clientes para reintentar en vez de insistir en bucle
+    return JSONResponse(status_code=503, content={"message": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(ReservaArchivadaError)
+async def reserva_archivada_handler(request: Request, exc: ReservaArchivadaError):
+    return JSONResponse(status_code=409, content={"message": str(exc)}) # 409 Conflict
+
 # Routers
 
 app.include_router(clientes.router, prefix="/clientes", tags=["Clientes"])
 app.include_router(mesas.router, prefix="/mesas", tags=["Mesas"])
 app.include_router(reservas.router, prefix="/reservas", tags=["Reservas"])
 app.include_router(estadisticas.router, prefix="/estadisticas", tags=["Estadísticas"])
+app.include_router(sistema.router, prefix="/sistema", tags=["Sistema"])
 
 @app.get("/")
 def root():
-    return {"mensaje": "Bienvenido a la API de La Mesa Dorada"}
\ No newline at end of file
+    return {"mensaje": "Bienvenido a la API de La Mesa Dorada"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metricas():
+    """
+    Métricas en formato de texto de Prometheus
+    """
+    return PlainTextResponse(registro.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
\ No newline at end of file
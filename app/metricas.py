@@ -0,0 +1,367 @@
+# Archivo: app/metricas.py
+# Métricas de la aplicación en formato de texto de Prometheus (GET /metrics).
+# Están pensadas para dejarlas siempre activas: cada hilo suma en su propia lista de valores
+# (sin lock al contar) y los histogramas tienen los intervalos fijados de antemano, así que observar
+# un valor es una búsqueda binaria y una suma. Solo al leer /metrics se juntan los valores de todos los hilos.
+import math
+import os
+import sqlite3
+import sys
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from app import consultas_lentas
+from app.consultas_lentas import SQL_LENTA_MS
+
+# Activa la medición de cada sentencia SQL en las conexiones del pool
+METRICAS_SQL = os.getenv("METRICAS_SQL", "1") == "1"
+# Las conexiones del pool miden sus sentencias si hay métricas SQL o registro de consultas lentas
+MEDIR_SQL = METRICAS_SQL or SQL_LENTA_MS > 0
+
+INTERVALOS_HTTP = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INTERVALOS_SQL = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class _PorHilo:
+    """
+    Lista de valores de una serie repartida por hilos. Cada hilo solo escribe en la suya,
+    así que las sumas no necesitan lock; el lock solo se toma al crear la lista de un hilo nuevo y al leer.
+    """
+    __slots__ = ("_tamano", "_local", "_listas", "_lock")
+
+    def __init__(self, tamano: int):
+        self._tamano = tamano
+        self._local = threading.local()
+        self._listas = []
+        self._lock = threading.Lock()
+
+    def propia(self):
+        try:
+            return self._local.valores
+        except AttributeError:
+            valores = [0] * self._tamano
+            with self._lock:
+                self._listas.append(valores)
+            self._local.valores = valores
+            return valores
+
+    def total(self):
+        with self._lock:
+            listas = list(self._listas)
+        return [sum(columna) for columna in zip(*listas)] if listas else [0] * self._tamano
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _tamano(self):
+        return 1
+
+    def _serie(self, valores: tuple):
+        serie = self._series.get(valores)
+        if serie is None:
+            with self._lock:
+                serie = self._series.setdefault(valores, _PorHilo(self._tamano()))
+        return serie
+
+    def _etiquetas(self, valores: tuple, extra: str = ""):
+        partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(self.etiquetas, valores)]
+        if extra:
+            partes.append(extra)
+        return "{" + ",".join(partes) + "}" if partes else ""
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for valores, serie in sorted(list(self._series.items())):
+            lineas.extend(self._lineas(valores, serie.total()))
+        return lineas
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, *valores, cantidad: float = 1):
+        self._serie(valores).propia()[0] += cantidad
+
+    def _lineas(self, valores, total):
+        return [f"{self.nombre}{self._etiquetas(valores)} {_numero(total[0])}"]
+
+
+class Medidor(_Metrica):
+    """Valor que sube y baja (peticiones en curso). Se suma por hilos igual que un contador."""
+    tipo = "gauge"
+
+    def inc(self, *valores, cantidad: float = 1):
+        self._serie(valores).propia()[0] += cantidad
+
+    def dec(self, *valores, cantidad: float = 1):
+        self._serie(valores).propia()[0] -= cantidad
+
+    def _lineas(self, valores, total):
+        return [f"{self.nombre}{self._etiquetas(valores)} {_numero(total[0])}"]
+
+
+class Histograma(_Metrica):
+    """Cuenta por intervalo (no acumulada) y la suma de los valores en la última posición."""
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), intervalos: tuple = INTERVALOS_HTTP):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.intervalos = tuple(intervalos)
+
+    def _tamano(self):
+        # Un hueco por intervalo, otro para +Inf y otro para la suma
+        return len(self.intervalos) + 2
+
+    def observar(self, valor: float, *valores):
+        propia = self._serie(valores).propia()
+        propia[bisect_left(self.intervalos, valor)] += 1
+        propia[-1] += valor
+
+    def _lineas(self, valores, total):
+        lineas = []
+        acumulado = 0
+        for limite, cuenta in zip(self.intervalos + (math.inf,), total):
+            acumulado += cuenta
+            le = "+Inf" if limite == math.inf else repr(limite)
+            etiquetas = self._etiquetas(valores, 'le="' + le + '"')
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+        lineas.append(f"{self.nombre}_sum{self._etiquetas(valores)} {_numero(total[-1])}")
+        lineas.append(f"{self.nombre}_count{self._etiquetas(valores)} {acumulado}")
+        return lineas
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor):
+    return repr(round(valor, 9)) if isinstance(valor, float) else str(valor)
+
+
+class Registro:
+    """Métricas de la aplicación y colectores que convierten las estadísticas ya existentes en medidores."""
+
+    def __init__(self):
+        self._metricas = []
+        self._colectores = []
+
+    def _anadir(self, metrica):
+        # Las métricas sin etiquetas se publican desde el principio, aunque valgan 0
+        if not metrica.etiquetas:
+            metrica._serie(())
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        return self._anadir(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        return self._anadir(Medidor(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: tuple = (), intervalos: tuple = INTERVALOS_HTTP):
+        return self._anadir(Histograma(nombre, ayuda, etiquetas, intervalos))
+
+    # Metodo para publicar los valores numéricos de 'funcion()' (un dict) como medidores 'prefijo_clave'
+    def colector(self, prefijo: str, funcion):
+        self._colectores.append((prefijo, funcion))
+
+    def exponer(self):
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        for prefijo, funcion in self._colectores:
+            for clave, valor in funcion().items():
+                if isinstance(valor, bool):
+                    valor = int(valor)
+                if isinstance(valor, (int, float)):
+                    nombre = f"{prefijo}_{clave}"
+                    lineas.append(f"# TYPE {nombre} gauge")
+                    lineas.append(f"{nombre} {_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+# Registro compartido por todo el proceso
+registro = Registro()
+
+HTTP_PETICIONES = registro.contador(
+    "restaurante_http_peticiones_total", "Peticiones HTTP atendidas", ("metodo", "ruta", "estado")
+)
+HTTP_DURACION = registro.histograma(
+    "restaurante_http_duracion_segundos", "Duración de las peticiones HTTP", ("metodo", "ruta")
+)
+HTTP_EN_CURSO = registro.medidor("restaurante_http_peticiones_en_curso", "Peticiones HTTP en curso")
+
+RESERVAS_CREADAS = registro.contador("restaurante_reservas_creadas_total", "Reservas creadas")
+RESERVAS_SOLAPADAS = registro.contador(
+    "restaurante_reservas_solapadas_total", "Reservas rechazadas por solaparse con otra (ReservaSolapadaError)"
+)
+RESERVAS_CANCELADAS = registro.contador("restaurante_reservas_canceladas_total", "Reservas canceladas")
+
+TAREAS_EJECUCIONES = registro.contador(
+    "restaurante_tareas_ejecuciones_total", "Ejecuciones de las tareas programadas", ("tarea", "resultado")
+)
+TAREAS_FILAS = registro.contador(
+    "restaurante_tareas_filas_total", "Reservas cambiadas por las tareas programadas", ("tarea",)
+)
+TAREAS_DURACION = registro.histograma(
+    "restaurante_tareas_duracion_segundos", "Duración de las tareas programadas", ("tarea",)
+)
+
+SQL_DURACION = registro.histograma(
+    "restaurante_sql_duracion_segundos", "Duración de execute() por operación", ("operacion",), INTERVALOS_SQL
+)
+SQL_LECTURA = registro.contador(
+    "restaurante_sql_lectura_segundos_total", "Tiempo leyendo filas (fetch*) por operación", ("operacion",)
+)
+SQL_LENTAS = registro.contador(
+    "restaurante_sql_lentas_total", "Sentencias SQL que han superado SQL_LENTA_MS por operación", ("operacion",)
+)
+
+# Las sentencias se agrupan por la función que las ejecuta, 'modulo.funcion' ('reserva_service.crear_reserva',
+# 'indice_disponibilidad.sincronizar'): un nombre corto y estable que no depende del texto SQL.
+# El texto completo solo sale en el registro de consultas lentas. Para acotar el número de series,
+# a partir de MAX_OPERACIONES funciones distintas el resto se cuentan juntas
+MAX_OPERACIONES = 50
+_operaciones = {}  # objeto de código de la función -> nombre de la operación
+
+
+def _operacion():
+    # El primer marco fuera de este módulo (CursorMedido y ConexionMedida) es el que ejecuta la sentencia
+    marco = sys._getframe(1)
+    while marco.f_globals.get("__name__") == __name__:
+        marco = marco.f_back
+    codigo = marco.f_code
+    nombre = _operaciones.get(codigo)
+    if nombre is None:
+        if len(_operaciones) >= MAX_OPERACIONES:
+            return "otras"
+        modulo = marco.f_globals.get("__name__", "").rpartition(".")[2]
+        nombre = _operaciones.setdefault(codigo, f"{modulo}.{codigo.co_name}")
+    return nombre
+
+
+class CursorMedido(sqlite3.Cursor):
+    """
+    Cursor que mide cada execute() y el tiempo de leer sus filas, agrupado por la función que lo llama,
+    y pasa las sentencias que superan SQL_LENTA_MS al registro de consultas lentas
+    """
+
+    _clave = None
+    _sql = None
+    _parametros = None
+    _tiempo = 0.0
+
+    def _medida(self, operacion, sql, parametros, duracion):
+        self._clave = operacion
+        if METRICAS_SQL:
+            SQL_DURACION.observar(duracion, self._clave)
+        self._sql, self._parametros = sql, parametros
+        self._tiempo = 0.0
+        self._comprobar_lenta(duracion)
+
+    # Metodo para acumular el tiempo de la sentencia (execute y lectura de filas) y registrarla
+    # una sola vez cuando pasa de SQL_LENTA_MS: en SQLite un SELECT hace casi todo su trabajo en los fetch*
+    def _comprobar_lenta(self, duracion):
+        if not SQL_LENTA_MS or self._sql is None:
+            return
+        self._tiempo += duracion
+        if self._tiempo * 1000 >= SQL_LENTA_MS:
+            SQL_LENTAS.inc(self._clave)
+            consultas_lentas.registrar(self.connection, self._sql, self._parametros, self._tiempo, self._clave)
+            self._sql = None
+
+    def execute(self, sql, parametros=()):
+        inicio = perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._medida(_operacion(), sql, parametros, perf_counter() - inicio)
+
+    def executemany(self, sql, parametros):
+        inicio = perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            # Los parámetros de executemany pueden ser un generador ya consumido: no se registran
+            self._medida(_operacion(), sql, None, perf_counter() - inicio)
+
+    def _leer(self, metodo, *args):
+        inicio = perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            if self._clave is not None:
+                duracion = perf_counter() - inicio
+                if METRICAS_SQL:
+                    SQL_LECTURA.inc(self._clave, cantidad=duracion)
+                self._comprobar_lenta(duracion)
+
+    def fetchone(self):
+        return self._leer(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._leer(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._leer(super().fetchall)
+
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexión cuyos cursores (también los de conn.execute) son CursorMedido"""
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+
+# Metodo para obtener la plantilla de la ruta atendida ('/reservas/{id}'), con el prefijo de su router
+def _plantilla(scope):
+    # Las versiones recientes de FastAPI dejan en scope["route"] la ruta del router incluido, sin su prefijo
+    contexto = scope.get("fastapi", {}).get("effective_route_context")
+    if contexto is not None:
+        return contexto.path
+    ruta = scope.get("route")
+    return ruta.path if ruta is not None else "sin_ruta"
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que cuenta y mide cada petición HTTP por su ruta (la plantilla, no la URL)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        inicio = perf_counter()
+        HTTP_EN_CURSO.inc()
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            HTTP_EN_CURSO.dec()
+            ruta = _plantilla(scope)
+            HTTP_DURACION.observar(perf_counter() - inicio, scope["method"], ruta)
+            HTTP_PETICIONES.inc(scope["method"], ruta, estado)
@@ -2,4 +2,9 @@
 
 from .cliente import ClienteBase, ClienteCreate, ClienteUpdate, ClienteResponse
 from .mesa import MesaBase, MesaCreate, MesaUpdate, MesaResponse
-from .reserva import ReservaBase, ReservaCreate, ReservaUpdate, ReservaResponse
\ No newline at end of file
+from .reserva import (
+    ReservaBase, ReservaCreate, ReservaUpdate, ReservaResponse,
+    ReservaAutoCreate, ReservaAutoLote, ResultadoReservaLote, ReservaLoteResponse,
+    ReservaBulkCreate, ReservaBulkResponse,
+    ReservaEstadoLote, ResultadoEstadoLote, ReservaEstadoLoteResponse
+)
\ No newline at end of file
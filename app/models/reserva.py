@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, field_validator, model_validator
 from datetime import datetime, timedelta
-from typing import Optional, Literal
+from typing import Optional, Literal, List
 
 # Base, Campos input básicos
 class ReservaBase(BaseModel):
@@ -45,4 +45,69 @@ class ReservaResponse(ReservaBase):
 
     model_config = {
         "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+# Asignación automática POST /reservas/auto, el sistema elige la mesa
+class ReservaAutoCreate(BaseModel):
+    cliente_id: int = Field(..., description="ID del cliente existente")
+    fecha_hora_inicio: datetime = Field(..., description="Debe ser futura")
+    num_comensales: int = Field(..., gt=0)
+    notas: Optional[str] = None
+    ubicaciones: Optional[List[Literal["interior", "terraza", "privado"]]] = Field(
+        default=None, description="Ubicaciones preferidas, de más a menos preferida"
+    )
+
+    @field_validator('fecha_hora_inicio')
+    @classmethod
+    def validar_futuro(cls, v):
+        if v < datetime.now():
+            raise ValueError("La fecha de reserva debe ser futura")
+        return v
+
+# Lote de solicitudes para asignar juntas POST /reservas/auto/lote
+class ReservaAutoLote(BaseModel):
+    solicitudes: List[ReservaAutoCreate] = Field(..., min_length=1, max_length=500)
+
+# Resultado de cada solicitud de un lote
+class ResultadoReservaLote(BaseModel):
+    indice: int
+    reserva: Optional[ReservaResponse] = None
+    error: Optional[str] = None
+    mensaje: Optional[str] = None
+
+# Respuesta del lote con el resumen de la asignación
+class ReservaLoteResponse(BaseModel):
+    asignadas: int
+    no_asignadas: int
+    comensales_sentados: int
+    resultados: List[ResultadoReservaLote]
+
+
+# Alta masiva POST /reservas/bulk
+class ReservaBulkCreate(BaseModel):
+    reservas: List[ReservaCreate] = Field(..., min_length=1, max_length=1000)
+
+# Respuesta del alta masiva con el resultado de cada reserva
+class ReservaBulkResponse(BaseModel):
+    creadas: int
+    rechazadas: int
+    resultados: List[ResultadoReservaLote]
+
+# Cambio de estado masivo PATCH /reservas/estado
+class ReservaEstadoLote(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    estado: Literal["confirmada", "completada", "cancelada"]
+
+# Resultado de cada id: el estado en que queda la reserva o el error
+class ResultadoEstadoLote(BaseModel):
+    id: int
+    estado: Optional[str] = None
+    error: Optional[str] = None
+    mensaje: Optional[str] = None
+
+# Respuesta del cambio de estado masivo
+class ReservaEstadoLoteResponse(BaseModel):
+    cambiadas: int
+    sin_cambios: int
+    rechazadas: int
+    resultados: List[ResultadoEstadoLote]
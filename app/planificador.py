@@ -0,0 +1,185 @@
+# Archivo: app/planificador.py
+# Planificador de tareas periódicas sobre el bucle de asyncio de la app.
+# Cada tarea es una función de servicio 'funcion(conn, ahora)' que cambia un conjunto de filas con una
+# sola sentencia y devuelve cuántas; se aplica a través del escritor, como el resto de escrituras.
+# Con varios workers de uvicorn cada uno tiene su planificador, pero solo ejecuta las tareas el que tiene
+# el cerrojo de la tabla 'cerrojos': se toma y se renueva en la misma transacción que cada tarea
+# y, si el worker se cae, caduca a los 'duracion_cerrojo_s' segundos y lo toma otro.
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from time import perf_counter
+from app.database import PLANIFICADOR_ACTIVO, PLANIFICADOR_INTERVALO_S, PLANIFICADOR_CERROJO_S
+from app.escritor import EscritorBD, escritor
+from app.metricas import TAREAS_EJECUCIONES, TAREAS_FILAS, TAREAS_DURACION
+from app.services import transiciones_service
+
+logger = logging.getLogger("app.planificador")
+
+CERROJO = "planificador"
+
+# Se inserta si no existe y se actualiza si es nuestro o ha caducado; si no, no cambia ninguna fila
+TOMAR_CERROJO = """
+    INSERT INTO cerrojos (nombre, propietario, caduca) VALUES (?, ?, ?)
+    ON CONFLICT (nombre) DO UPDATE SET propietario = excluded.propietario, caduca = excluded.caduca
+    WHERE cerrojos.propietario = excluded.propietario OR cerrojos.caduca <= ?
+"""
+SOLTAR_CERROJO = "DELETE FROM cerrojos WHERE nombre = ? AND propietario = ?"
+
+
+class _Tarea:
+    """Tarea registrada y sus métricas (las protege el lock del planificador)."""
+
+    def __init__(self, nombre: str, funcion, intervalo_s: float):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo_s = intervalo_s
+        self.ejecuciones = 0
+        self.omitidas = 0
+        self.errores = 0
+        self.filas = 0
+        self.ultima_ejecucion = None
+        self.ultimas_filas = 0
+        self.ultima_duracion = 0.0
+        self.max_duracion = 0.0
+
+    def estadisticas(self):
+        return {
+            "intervalo_s": self.intervalo_s,
+            "ejecuciones": self.ejecuciones,
+            "omitidas": self.omitidas,
+            "errores": self.errores,
+            "filas": self.filas,
+            "ultima_ejecucion": self.ultima_ejecucion,
+            "ultimas_filas": self.ultimas_filas,
+            "ultima_duracion_ms": round(self.ultima_duracion * 1000, 3),
+            "max_duracion_ms": round(self.max_duracion * 1000, 3),
+        }
+
+
+class Planificador:
+    """
+    Ejecuta cada tarea registrada cada 'intervalo_s' segundos en una tarea de asyncio.
+    arrancar() se llama desde el bucle de la app; ejecutar() se puede llamar también a mano.
+    """
+
+    def __init__(self, escritor: EscritorBD, intervalo_s: float = 60, duracion_cerrojo_s: float = 180,
+                 activo: bool = True):
+        self.escritor = escritor
+        self.intervalo_s = intervalo_s
+        self.duracion_cerrojo_s = duracion_cerrojo_s
+        self.activo = activo
+        # Identifica a este worker en la tabla de cerrojos
+        self.propietario = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.tareas = {}
+        self._asyncio = []
+        self._lider = False
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre: str, funcion, intervalo_s: float = None):
+        self.tareas[nombre] = _Tarea(nombre, funcion, intervalo_s or self.intervalo_s)
+
+    def arrancar(self):
+        if not self.activo or self._asyncio:
+            return
+        bucle = asyncio.get_running_loop()
+        self._asyncio = [bucle.create_task(self._bucle(tarea), name=f"tarea-{tarea.nombre}")
+                         for tarea in self.tareas.values()]
+
+    async def _bucle(self, tarea: _Tarea):
+        # La primera ejecución se hace al arrancar y después una cada intervalo
+        while True:
+            try:
+                await self.ejecutar(tarea.nombre)
+            except Exception:
+                logger.exception("Error en la tarea programada '%s'", tarea.nombre)
+            await asyncio.sleep(tarea.intervalo_s)
+
+    # Metodo para tomar o renovar el cerrojo dentro de la transacción del escritor. Devuelve si lo tenemos
+    def _tomar_cerrojo(self, conn):
+        ahora = time.time()
+        tomado = conn.execute(
+            TOMAR_CERROJO, (CERROJO, self.propietario, ahora + self.duracion_cerrojo_s, ahora)
+        ).rowcount > 0
+        with self._lock:
+            if tomado != self._lider:
+                logger.info("Worker %s %s las tareas programadas", self.propietario,
+                            "ejecuta" if tomado else "deja de ejecutar")
+            self._lider = tomado
+        return tomado
+
+    # Metodo que aplica el escritor: la tarea solo se ejecuta si este worker tiene el cerrojo o se fuerza.
+    # Devuelve las filas cambiadas y lo que ha tardado la sentencia, o None si le toca a otro worker
+    def _aplicar(self, conn, tarea: _Tarea, ahora: datetime, forzar: bool):
+        if not self._tomar_cerrojo(conn) and not forzar:
+            return None
+        inicio = perf_counter()
+        filas = tarea.funcion(conn, ahora)
+        return filas, perf_counter() - inicio
+
+    # Metodo para ejecutar una tarea ya. Con 'forzar' se ejecuta aunque el cerrojo lo tenga otro worker
+    # (las tareas son idempotentes). Devuelve el resumen de la ejecución o None si no se ha ejecutado
+    async def ejecutar(self, nombre: str, forzar: bool = False):
+        tarea = self.tareas[nombre]
+        try:
+            resultado = await self.escritor.escribir(self._aplicar, tarea, datetime.now(), forzar)
+        except Exception:
+            TAREAS_EJECUCIONES.inc(nombre, "error")
+            with self._lock:
+                tarea.errores += 1
+            raise
+
+        if resultado is None:
+            TAREAS_EJECUCIONES.inc(nombre, "omitida")
+            with self._lock:
+                tarea.omitidas += 1
+            return None
+
+        filas, duracion = resultado
+        TAREAS_EJECUCIONES.inc(nombre, "ok")
+        TAREAS_FILAS.inc(nombre, cantidad=filas)
+        TAREAS_DURACION.observar(duracion, nombre)
+        with self._lock:
+            tarea.ejecuciones += 1
+            tarea.filas += filas
+            tarea.ultima_ejecucion = datetime.now().isoformat(timespec="seconds")
+            tarea.ultimas_filas = filas
+            tarea.ultima_duracion = duracion
+            tarea.max_duracion = max(tarea.max_duracion, duracion)
+        return {"tarea": nombre, "filas": filas, "duracion_ms": round(duracion * 1000, 3)}
+
+    # Metodo para parar las tareas y soltar el cerrojo, para que otro worker lo tome sin esperar a que caduque.
+    # Se llama antes de cerrar el escritor
+    def cerrar(self):
+        tareas, self._asyncio = self._asyncio, []
+        for tarea in tareas:
+            tarea.cancel()
+        if self._lider:
+            try:
+                self.escritor.ejecutar(lambda conn: conn.execute(SOLTAR_CERROJO, (CERROJO, self.propietario)))
+            except Exception:
+                logger.exception("No se ha podido soltar el cerrojo del planificador")
+            self._lider = False
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "activo": bool(self._asyncio),
+                "lider": self._lider,
+                "propietario": self.propietario,
+                "intervalo_s": self.intervalo_s,
+                "duracion_cerrojo_s": self.duracion_cerrojo_s,
+                "tareas": {nombre: tarea.estadisticas() for nombre, tarea in self.tareas.items()},
+            }
+
+
+# Planificador del proceso con los cambios de estado automáticos de las reservas
+planificador = Planificador(escritor, intervalo_s=PLANIFICADOR_INTERVALO_S, duracion_cerrojo_s=PLANIFICADOR_CERROJO_S,
+                            activo=PLANIFICADOR_ACTIVO)
+for _nombre, _funcion in transiciones_service.TAREAS.items():
+    planificador.registrar(_nombre, _funcion)
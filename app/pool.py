@@ -0,0 +1,154 @@
+# Archivo: app/pool.py
+# Pool de conexiones SQLite reutilizables, configuradas una sola vez al crearlas
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from app.exceptions import PoolAgotadoError
+from app.metricas import MEDIR_SQL, ConexionMedida
+
+# PRAGMAs que se aplican a cada conexión nueva del pool
+PRAGMAS_CONEXION = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",      # ~20 MB de caché de páginas por conexión
+    "PRAGMA mmap_size = 268435456",    # 256 MB mapeados en memoria
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class PoolConexiones:
+    """
+    Pool de tamaño fijo de conexiones SQLite.
+    Las conexiones se crean bajo demanda hasta 'tamano' y después se reutilizan,
+    conservando su caché de sentencias y de páginas entre peticiones.
+    """
+
+    def __init__(self, ruta: str, tamano: int = 8, timeout: float = 30.0, busy_timeout_ms: int = 5000,
+                 al_conectar=None):
+        self.ruta = ruta
+        # Función que termina de preparar cada conexión nueva (por ejemplo, adjuntar otras BD)
+        self.al_conectar = al_conectar
+        self.tamano = tamano
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+
+        # LIFO para reutilizar primero las conexiones con la caché más caliente
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+
+        # Métricas
+        self._checkouts = 0
+        self._esperas = 0
+        self._timeouts = 0
+        self._tiempo_espera_total = 0.0
+        self._tiempo_espera_max = 0.0
+
+    # Metodo para crear y configurar una conexión nueva
+    def _crear_conexion(self):
+        conn = sqlite3.connect(
+            self.ruta,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,  # La dependencia y el endpoint pueden ejecutarse en hilos distintos
+            cached_statements=256,
+            # Cada sentencia se mide para /metrics y el registro de consultas lentas
+            factory=ConexionMedida if MEDIR_SQL else sqlite3.Connection,
+        )
+        # Esto permite acceder a las columnas por nombre
+        conn.row_factory = sqlite3.Row
+        # El modo WAL queda guardado en el fichero. Solo se cambia si hace falta: pedirlo otra vez
+        # mientras otro proceso escribe puede fallar con 'database is locked' sin esperar al busy_timeout
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+            conn.execute("PRAGMA journal_mode = WAL")
+        for pragma in PRAGMAS_CONEXION:
+            conn.execute(pragma)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if self.al_conectar is not None:
+            self.al_conectar(conn)
+        return conn
+
+    # Metodo para sacar una conexión del pool
+    def obtener(self):
+        inicio = perf_counter()
+        esperado = False
+        try:
+            conn = self._libres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                crear = self._creadas < self.tamano
+                if crear:
+                    self._creadas += 1
+            if crear:
+                try:
+                    conn = self._crear_conexion()
+                except Exception:
+                    with self._lock:
+                        self._creadas -= 1
+                    raise
+            else:
+                esperado = True
+                try:
+                    conn = self._libres.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolAgotadoError(f"No hay conexiones libres tras esperar {self.timeout} s")
+
+        espera = perf_counter() - inicio
+        with self._lock:
+            self._checkouts += 1
+            if esperado:
+                self._esperas += 1
+            self._tiempo_espera_total += espera
+            if espera > self._tiempo_espera_max:
+                self._tiempo_espera_max = espera
+        return conn
+
+    # Metodo para devolver una conexión al pool
+    def devolver(self, conn):
+        try:
+            # Nunca devolvemos una conexión con una transacción a medias
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Conexión rota: la descartamos y dejamos hueco para crear otra
+            conn.close()
+            with self._lock:
+                self._creadas -= 1
+            return
+        self._libres.put(conn)
+
+    @contextmanager
+    def conexion(self):
+        conn = self.obtener()
+        try:
+            yield conn
+        finally:
+            self.devolver(conn)
+
+    # Metodo para cerrar todas las conexiones libres
+    def cerrar(self):
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._creadas -= 1
+
+    def estadisticas(self):
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                "tamano": self.tamano,
+                "conexiones_creadas": self._creadas,
+                "conexiones_libres": self._libres.qsize(),
+                "conexiones_en_uso": self._creadas - self._libres.qsize(),
+                "checkouts": checkouts,
+                "checkouts_con_espera": self._esperas,
+                "timeouts": self._timeouts,
+                "espera_media_ms": round(self._tiempo_espera_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "espera_max_ms": round(self._tiempo_espera_max * 1000, 3),
+            }
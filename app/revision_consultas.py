@@ -0,0 +1,213 @@
+# Archivo: app/revision_consultas.py
+# Revisión de los planes de las consultas de los servicios.
+# Crea una BD temporal con muchos datos sintéticos, ejecuta cada escenario de los servicios capturando
+# todas las sentencias que lanzan (set_trace_callback) y pasa cada una por EXPLAIN QUERY PLAN.
+# Así una consulta que deja de usar índice (como el antiguo filtro date(fecha_hora_inicio)) se ve antes de publicarla.
+#
+# Uso: python -m app.cli revisar-consultas [--reservas 50000] [--clientes 5000]
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import date, datetime, timedelta
+
+from app.consultas_lentas import escaneos, explicable, plan_consulta, rangos_abiertos
+from app.database import ARCHIVO_DIAS, adjuntar_archivo, init_db
+from app.generador_datos import cargar
+from app.models import ClienteCreate, ClienteUpdate, MesaCreate, MesaUpdate, ReservaAutoCreate, ReservaCreate, ReservaUpdate
+from app.services import (
+    archivo_service,
+    asignacion_service,
+    cliente_service,
+    disponibilidad_service,
+    estadisticas_service,
+    mesa_service,
+    ocupacion_service,
+    reserva_service,
+    transiciones_service,
+)
+from app.services.cache import cache
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import DURACION_MAXIMA, indice
+
+# Tablas que crecen con el uso: recorrerlas enteras es un fallo de la revisión.
+# Las demás (mesas, estadísticas, versiones) tienen pocas filas y se informan sin más
+TABLAS_GRANDES = ("reservas", "reservas_cambios", "clientes")
+
+# Recorridos completos de tablas grandes que son así a propósito: escenario -> motivo
+PERMITIDOS = {
+    "cliente_service.obtener_todos": "listado por id con LIMIT, recorre la tabla en orden de rowid",
+    "estadisticas_service.verificar": "recalcula las estadísticas desde cero a propósito",
+    "estadisticas_service.reconstruir": "recalcula las estadísticas desde cero a propósito",
+}
+
+# Rangos de índice sin cota inferior ('inicio<?') que son así a propósito: escenario -> motivo.
+# Cualquier otro recorre todo el histórico anterior a la cota y es un fallo, aunque el plan diga 'USING INDEX'
+RANGOS_PERMITIDOS = {
+    "archivo_service.archivar": "lo anterior al corte es justo lo que queda por archivar, y va por lotes con LIMIT",
+    "archivo_service.estado": "cuenta lo que queda por archivar, que el archivador mantiene acotado",
+    "transiciones_service.completar_terminadas": "índice parcial de confirmadas, que el planificador va vaciando",
+    "transiciones_service.caducar_pendientes": "índice parcial de pendientes, que el planificador va vaciando",
+}
+
+NUM_MESAS = 40
+
+# Para agrupar las sentencias capturadas: los valores literales se sustituyen por '?'
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+# Metodo para construir la lista de escenarios (nombre, funcion(conn)) que cubren las consultas de los servicios.
+# 'reservas' y 'NUM_MESAS' son los datos que ha cargado el generador: las reservas y la mesa que crean
+# los escenarios tienen ids conocidos y los siguientes escenarios trabajan sobre ellas
+def escenarios(reservas: int):
+    hoy = date.today()
+    manana = datetime.combine(hoy + timedelta(days=1), datetime.min.time())
+    pasado = datetime.combine(hoy - timedelta(days=30), datetime.min.time())
+    futura = manana + timedelta(days=400, hours=13)
+    creada, creada_bulk, otra_bulk = reservas + 1, reservas + 2, reservas + 3
+    mesa_nueva = NUM_MESAS + 1
+    return [
+        # Primero se archivan las reservas antiguas: los demás escenarios leen de las dos BD
+        # (lotes pequeños: con la traza activa cada disparo de trigger vuelve a copiar la sentencia con sus ids)
+        ("archivo_service.archivar", lambda conn: archivo_service.archivar(conn, ARCHIVO_DIAS or 90, 500)),
+        ("archivo_service.estado", lambda conn: archivo_service.estado(conn, ARCHIVO_DIAS or 90)),
+        ("transiciones_service.completar_terminadas", transiciones_service.completar_terminadas),
+        ("transiciones_service.caducar_pendientes", transiciones_service.caducar_pendientes),
+        ("reserva_service.obtener_todas", lambda conn: reserva_service.obtener_todas(conn, limit=100)),
+        ("reserva_service.obtener_todas (fecha)", lambda conn: reserva_service.obtener_todas(conn, fecha=hoy, limit=100)),
+        ("reserva_service.obtener_todas (cliente)", lambda conn: reserva_service.obtener_todas(conn, cliente_id=7, limit=100)),
+        ("reserva_service.obtener_todas (cursor)",
+         lambda conn: reserva_service.obtener_todas(conn, fecha=hoy, limit=100, despues_de=(0, 0))),
+        ("reserva_service.bloque_exportacion",
+         lambda conn: reserva_service.bloque_exportacion(conn, desde=pasado, hasta=manana, despues_de=(0, 0))),
+        ("reserva_service.bloque_exportacion (cliente)",
+         lambda conn: reserva_service.bloque_exportacion(conn, cliente_id=7, despues_de=(0, 0))),
+        ("reserva_service.bloque_exportacion (todas)",
+         lambda conn: reserva_service.bloque_exportacion(conn, despues_de=(0, 0))),
+        ("reserva_service.obtener_por_id", lambda conn: reserva_service.obtener_por_id(conn, 10)),
+        ("reserva_service.cambiar_estado (archivada)",
+         lambda conn: reserva_service.cambiar_estado(conn, 10, "confirmada")),
+        ("reserva_service.CONSULTA_SOLAPE",
+         lambda conn: conn.execute(
+             reserva_service.CONSULTA_SOLAPE, (1, 1_000_000_000 - DURACION_MAXIMA, 1_000_007_200, 1_000_000_000)
+         ).fetchall()),
+        ("reserva_service.crear_reserva", lambda conn: reserva_service.crear_reserva(
+            conn, ReservaCreate(cliente_id=1, mesa_id=1, fecha_hora_inicio=futura, num_comensales=2))),
+        ("reserva_service.crear_reservas_bulk", lambda conn: reserva_service.crear_reservas_bulk(conn, [
+            ReservaCreate(cliente_id=2, mesa_id=2, fecha_hora_inicio=futura, num_comensales=2),
+            ReservaCreate(cliente_id=3, mesa_id=3, fecha_hora_inicio=futura, num_comensales=2),
+        ])),
+        ("reserva_service.actualizar_reserva", lambda conn: reserva_service.actualizar_reserva(
+            conn, creada, ReservaUpdate(fecha_hora_inicio=futura + timedelta(hours=1), num_comensales=3))),
+        ("reserva_service.cambiar_estado",
+         lambda conn: reserva_service.cambiar_estado(conn, creada_bulk, "confirmada")),
+        ("reserva_service.cambiar_estados", lambda conn: reserva_service.cambiar_estados(
+            conn, [creada, creada_bulk, otra_bulk, 10, reservas + 100], "confirmada")),
+        ("reserva_service.eliminar_reserva", lambda conn: reserva_service.eliminar_reserva(conn, otra_bulk)),
+        ("mesa_service.buscar_disponibles", lambda conn: mesa_service.buscar_disponibles(conn, futura, 2)),
+        ("mesa_service.buscar_disponibles (pasado)",
+         lambda conn: mesa_service.buscar_disponibles(conn, pasado + timedelta(hours=13), 2)),
+        ("mesa_service.crear_mesa",
+         lambda conn: mesa_service.crear_mesa(conn, MesaCreate(numero=mesa_nueva, capacidad=4, ubicacion="terraza"))),
+        ("mesa_service.actualizar_mesa",
+         lambda conn: mesa_service.actualizar_mesa(conn, mesa_nueva, MesaUpdate(capacidad=6))),
+        ("mesa_service.eliminar_mesa", lambda conn: mesa_service.eliminar_mesa(conn, mesa_nueva)),
+        ("mesa_service.eliminar_mesa (con reservas)", lambda conn: mesa_service.eliminar_mesa(conn, 1)),
+        ("cliente_service.obtener_todos", lambda conn: cliente_service.obtener_todos(conn, limit=100)),
+        ("cliente_service.obtener_todos (cursor)",
+         lambda conn: cliente_service.obtener_todos(conn, limit=100, despues_de_id=1000)),
+        ("cliente_service.obtener_por_id", lambda conn: cliente_service.obtener_por_id(conn, 10)),
+        ("cliente_service.buscar_clientes", lambda conn: cliente_service.buscar_clientes(conn, "garcia")),
+        ("cliente_service.crear_cliente", lambda conn: cliente_service.crear_cliente(
+            conn, ClienteCreate(nombre="Revisión", email="revision@example.com", telefono="699999999"))),
+        ("cliente_service.actualizar_cliente",
+         lambda conn: cliente_service.actualizar_cliente(conn, 10, ClienteUpdate(notas="Revisión"))),
+        ("cliente_service.eliminar_cliente", lambda conn: cliente_service.eliminar_cliente(conn, 10)),
+        ("estadisticas_service.ocupacion_diaria", lambda conn: estadisticas_service.ocupacion_diaria(conn, hoy)),
+        ("estadisticas_service.ocupacion_semanal", lambda conn: estadisticas_service.ocupacion_semanal(conn, hoy)),
+        ("estadisticas_service.resumen", estadisticas_service.resumen),
+        ("estadisticas_service.clientes_frecuentes", estadisticas_service.clientes_frecuentes),
+        ("estadisticas_service.mesas_populares", estadisticas_service.mesas_populares),
+        ("estadisticas_service.verificar", estadisticas_service.verificar),
+        ("ocupacion_service.serie_franjas",
+         lambda conn: ocupacion_service.serie_franjas(conn, hoy - timedelta(days=365), hoy, 30)),
+        ("ocupacion_service.serie_turnos",
+         lambda conn: ocupacion_service.serie_turnos(conn, hoy - timedelta(days=30), hoy)),
+        ("disponibilidad_service.calcular_grid",
+         lambda conn: disponibilidad_service.calcular_grid(conn, pasado, pasado + timedelta(days=7), 30, 2)),
+        ("asignacion_service.crear_reserva_auto", lambda conn: asignacion_service.crear_reserva_auto(
+            conn, ReservaAutoCreate(cliente_id=4, fecha_hora_inicio=futura + timedelta(days=1), num_comensales=4))),
+    ]
+
+
+# Metodo para ejecutar los escenarios y devolver el plan de cada sentencia distinta que lanzan
+def revisar(conn: sqlite3.Connection, lista_escenarios):
+    # El catálogo, el índice y la caché son del proceso: se recargan desde esta BD
+    catalogo.invalidar()
+    indice.invalidar()
+    cache.vaciar()
+
+    resultados = {}
+    errores = {}
+    for nombre, funcion in lista_escenarios:
+        # Diccionario como conjunto ordenado: una sentencia con triggers se vuelve a notificar en cada disparo.
+        # Las sentencias internas de los triggers llegan como comentarios '-- TRIGGER ...'
+        capturadas = {}
+        conn.set_trace_callback(lambda sql: capturadas.setdefault(sql) if not sql.startswith("--") else None)
+        try:
+            funcion(conn)
+        except Exception as e:  # Los errores de negocio también son un camino válido del escenario
+            errores[nombre] = f"{type(e).__name__}: {e}"
+        finally:
+            conn.set_trace_callback(None)
+
+        for sql in capturadas:
+            if not explicable(sql):
+                continue
+            clave = " ".join(_LITERALES.sub("?", sql).split())
+            if clave in resultados:
+                resultados[clave]["escenarios"].add(nombre)
+                continue
+            plan = plan_consulta(conn, sql)
+            recorridos = escaneos(sql, plan)
+            grandes = [tabla for tabla in recorridos if tabla in TABLAS_GRANDES]
+            abiertos = [tabla for tabla in rangos_abiertos(sql, plan) if tabla in TABLAS_GRANDES]
+            resultados[clave] = {
+                "sentencia": clave,
+                "escenarios": {nombre},
+                "plan": plan,
+                "recorridos": recorridos,
+                "recorridos_grandes": grandes,
+                "rangos_abiertos": abiertos,
+            }
+
+    for resultado in resultados.values():
+        escenarios_sentencia = resultado["escenarios"]
+        resultado["escenarios"] = sorted(escenarios_sentencia)
+        # Un recorrido está permitido si todos los escenarios que lanzan la sentencia lo tienen permitido
+        resultado["permitido"] = all(nombre in PERMITIDOS for nombre in escenarios_sentencia)
+        rango_permitido = all(nombre in RANGOS_PERMITIDOS for nombre in escenarios_sentencia)
+        resultado["sin_indice"] = (
+            (bool(resultado["recorridos_grandes"]) and not resultado["permitido"])
+            or (bool(resultado["rangos_abiertos"]) and not rango_permitido)
+        )
+    return list(resultados.values()), errores
+
+
+# Metodo para crear la BD sintética en una carpeta temporal y revisar todos los escenarios
+def revisar_servicios(clientes: int = 5000, reservas: int = 50000):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "revision.db")
+        init_db(ruta)
+        conn = sqlite3.connect(ruta)
+        conn.row_factory = sqlite3.Row
+        adjuntar_archivo(conn, os.path.join(carpeta, "revision_archivo.db"))
+        try:
+            resumen = cargar(conn, clientes=clientes, reservas=reservas, mesas=NUM_MESAS)
+            return revisar(conn, escenarios(resumen["reservas"]))
+        finally:
+            conn.close()
+            # No dejamos el catálogo ni el índice apuntando a la BD temporal
+            catalogo.invalidar()
+            indice.invalidar()
+            cache.vaciar()
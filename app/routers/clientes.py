@@ -1,77 +1,103 @@
-from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi import APIRouter, HTTPException, status, Query, Response
 from typing import List
-from sqlite3 import Connection
-from app.database import get_db
+from app.database import ejecutor
+from app.escritor import escritor
 from app.models import ClienteCreate, ClienteResponse, ClienteUpdate
 from app.services import cliente_service
+from app.services.paginacion import codificar_cursor, decodificar_cursor
+from app.serializacion import RESPUESTAS_RAPIDAS, Serializador
 
 router = APIRouter()
 
+# Listados sin volver a validar con el response_model cuando RESPUESTAS_RAPIDAS=1
+SERIALIZADOR_CLIENTES = Serializador(ClienteResponse)
+
 @router.get("/", response_model=List[ClienteResponse])
-def listar_clientes(
+async def listar_clientes(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    db: Connection = Depends(get_db)
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: str = Query(None, description="Cursor devuelto en la cabecera X-Next-Cursor")
 ):
     """
-    Obtiene el listado de todos los clientes registrados en el sistema.
-    Permite paginación mediante 'skip' y 'limit'.
+    Obtiene el listado de todos los clientes registrados en el sistema, ordenados por ID.
+    Para paginar se recomienda 'cursor': si hay más resultados, la respuesta
+    trae la cabecera X-Next-Cursor con el valor para pedir la página siguiente.
+    'skip' se mantiene por compatibilidad.
     """
-    return cliente_service.obtener_todos(db, skip, limit)
+    despues_de_id = None
+    if cursor:
+        try:
+            despues_de_id = decodificar_cursor(cursor, int)[0]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    clientes = await ejecutor.ejecutar(
+        cliente_service.obtener_todos, skip, limit, despues_de_id, como_filas=RESPUESTAS_RAPIDAS
+    )
+    if len(clientes) == limit:
+        response.headers["X-Next-Cursor"] = codificar_cursor(clientes[-1]["id"])
+    if RESPUESTAS_RAPIDAS:
+        return SERIALIZADOR_CLIENTES.respuesta(clientes, response)
+    return clientes
 
 @router.get("/buscar/", response_model=List[ClienteResponse])
-def buscar_clientes(
+async def buscar_clientes(
     q: str = Query(..., description="Nombre, email o teléfono"),
-    db: Connection = Depends(get_db)
+    limit: int = Query(50, gt=0, le=500)
 ):
     """
     Busca clientes que coincidan con el término proporcionado.
-    La búsqueda se realiza sobre el nombre, email o teléfono de forma insensible a mayúsculas.
+    La búsqueda se realiza sobre el nombre, email o teléfono de forma insensible a mayúsculas y acentos,
+    encuentra el texto en cualquier posición y devuelve primero los resultados más relevantes.
     """
-    return cliente_service.buscar_clientes(db, q)
+    clientes = await ejecutor.ejecutar(cliente_service.buscar_clientes, q, limit, como_filas=RESPUESTAS_RAPIDAS)
+    if RESPUESTAS_RAPIDAS:
+        return SERIALIZADOR_CLIENTES.respuesta(clientes)
+    return clientes
 
 @router.get("/{id}", response_model=ClienteResponse)
-def obtener_cliente(id: int, db: Connection = Depends(get_db)):
+async def obtener_cliente(id: int):
     """
     Obtiene los detalles de un cliente específico buscando por su ID único.
     Si no existe, devuelve un error 404.
     """
-    cliente = cliente_service.obtener_por_id(db, id)
+    cliente = await ejecutor.ejecutar(cliente_service.obtener_por_id, id)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     return cliente
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=ClienteResponse)
-def crear_cliente(cliente: ClienteCreate, db: Connection = Depends(get_db)):
+async def crear_cliente(cliente: ClienteCreate):
     """
     Registra un nuevo cliente en la base de datos.
     El modelo valida automáticamente que el email sea válido y el teléfono tenga 9 dígitos.
     """
     # Si el email ya existe, el propio SQLite lanzará un error de integridad que el servicio maneja.
     try:
-        return cliente_service.crear_cliente(db, cliente)
+        return await escritor.escribir(cliente_service.crear_cliente, cliente)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{id}", response_model=ClienteResponse)
-def actualizar_cliente(id: int, cliente: ClienteUpdate, db: Connection = Depends(get_db)):
+async def actualizar_cliente(id: int, cliente: ClienteUpdate):
     """
     Actualiza la información de un cliente existente.
     Solo se modifican los campos que se envíen con valor, es decir no nulos.
     """
-    resultado = cliente_service.actualizar_cliente(db, id, cliente)
+    resultado = await escritor.escribir(cliente_service.actualizar_cliente, id, cliente)
     if not resultado:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     return resultado
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_cliente(id: int, db: Connection = Depends(get_db)):
+async def eliminar_cliente(id: int):
     """
     Elimina un cliente del sistema.
     Si el cliente tiene reservas activas, podría fallar dependiendo de la configuración de la BD.
     """
     try:
-        exito = cliente_service.eliminar_cliente(db, id)
+        exito = await escritor.escribir(cliente_service.eliminar_cliente, id)
         if not exito:
             raise HTTPException(status_code=404, detail="Cliente no encontrado")
     except ValueError as e:
@@ -1,121 +1,94 @@
-from fastapi import APIRouter, Depends
-from sqlite3 import Connection
-from datetime import date, datetime, timedelta
-from app.database import get_db
+from fastapi import APIRouter, HTTPException, Query
+from datetime import date
+from app.database import ejecutor
+from app.services import estadisticas_service, ocupacion_service
+from app.services.cache import cache
 
 router = APIRouter()
 
+# Todas las estadísticas salen de las tablas de resumen que mantienen los triggers,
+# así que cuestan lo mismo con 100 reservas que con millones. Además se cachean hasta la siguiente escritura
+
 @router.get("/ocupacion/diaria")
-def ocupacion_diaria(fecha: date, db: Connection = Depends(get_db)):
+async def ocupacion_diaria(fecha: date):
     """
     Calcula el porcentaje de ocupación del restaurante para una fecha específica.
-    Basado en el número total de mesas y las reservas activas de ese día.
+    Basado en el número total de mesas y las reservas activas de ese día, con el desglose por turno.
     """
-    # Rango de fecha
-    fecha_inicio_dia = datetime(fecha.year, fecha.month, fecha.day, 0, 0, 0)
-    fecha_fin_dia = datetime(fecha.year, fecha.month, fecha.day, 23, 59, 59)
-
-    cursor = db.cursor()
-    
-    # Contar reservas en ese rango
-    cursor.execute("""
-        SELECT COUNT(*) FROM reservas 
-        WHERE fecha_hora_inicio >= ? AND fecha_hora_inicio <= ? 
-        AND estado != 'cancelada'
-    """, (fecha_inicio_dia, fecha_fin_dia))
-    reservas_count = cursor.fetchone()[0]
-
-    # Contar total mesas
-    cursor.execute("SELECT COUNT(*) FROM mesas")
-    total_mesas = cursor.fetchone()[0]
-    
-    porcentaje = (reservas_count / total_mesas) * 100 if total_mesas > 0 else 0
-
-    return {
-        "fecha": fecha,
-        "reservas_totales": reservas_count,
-        "porcentaje_ocupacion": round(porcentaje, 2)
-    }
+    return await ejecutor.ejecutar(
+        cache.obtener, ("estadisticas.ocupacion_diaria", fecha), ("reservas", "mesas"),
+        estadisticas_service.ocupacion_diaria, fecha
+    )
 
 @router.get("/resumen")
-def resumen_general(db: Connection = Depends(get_db)):
+async def resumen_general():
     """
     Ofrece una visión global del estado del sistema:
     Total de reservas, clientes, mesas y un desglose de reservas por estado.
     """
-    cursor = db.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM reservas")
-    total_reservas = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM clientes")
-    total_clientes = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM mesas")
-    total_mesas = cursor.fetchone()[0]
-
-    # Desglose por estado
-    cursor.execute("SELECT estado, COUNT(*) FROM reservas GROUP BY estado")
-    desglose = cursor.fetchall() # Lista de tuplas (estado, cuenta)
-    desglose_dict = {row[0]: row[1] for row in desglose}
-
-    return {
-        "total_reservas_historico": total_reservas,
-        "desglose_por_estado": desglose_dict,
-        "total_clientes_registrados": total_clientes,
-        "total_mesas_disponibles": total_mesas
-    }
+    return await ejecutor.ejecutar(
+        cache.obtener, ("estadisticas.resumen",), ("reservas", "clientes", "mesas"),
+        estadisticas_service.resumen
+    )
 
 @router.get("/ocupacion/semanal")
-def ocupacion_semanal(fecha_inicio: date, db: Connection = Depends(get_db)):
+async def ocupacion_semanal(fecha_inicio: date):
     """
     Ocupación de la semana, parámetro: fecha inicio
     """
-    start = datetime(fecha_inicio.year, fecha_inicio.month, fecha_inicio.day)
-    end = start + timedelta(days=7)
-    
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT COUNT(*) FROM reservas 
-        WHERE fecha_hora_inicio >= ? AND fecha_hora_inicio < ?
-        AND estado != 'cancelada'
-    """, (start, end))
-    reservas = cursor.fetchone()[0]
-    
-    return {"fecha_inicio": fecha_inicio, "fecha_fin": end.date(), "total_reservas": reservas}
+    return await ejecutor.ejecutar(
+        cache.obtener, ("estadisticas.ocupacion_semanal", fecha_inicio), ("reservas",),
+        estadisticas_service.ocupacion_semanal, fecha_inicio
+    )
 
 @router.get("/clientes-frecuentes")
-def clientes_frecuentes(db: Connection = Depends(get_db)):
+async def clientes_frecuentes():
     """
     Top 10 clientes con más reservas
     """
-    cursor = db.cursor()
-    # SQL JOIN manual
-    cursor.execute("""
-        SELECT c.nombre, COUNT(r.id) as total 
-        FROM clientes c
-        JOIN reservas r ON c.id = r.cliente_id
-        GROUP BY c.id 
-        ORDER BY total DESC 
-        LIMIT 10
-    """)
-    resultado = cursor.fetchall()
-    
-    return [{"cliente": row[0], "reservas": row[1]} for row in resultado]
+    return await ejecutor.ejecutar(
+        cache.obtener, ("estadisticas.clientes_frecuentes",), ("reservas", "clientes"),
+        estadisticas_service.clientes_frecuentes
+    )
 
 @router.get("/mesas-populares")
-def mesas_populares(db: Connection = Depends(get_db)):
+async def mesas_populares():
     """
     Mesas más reservadas
     """
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT m.numero, COUNT(r.id) as total 
-        FROM mesas m
-        JOIN reservas r ON m.id = r.mesa_id
-        GROUP BY m.id 
-        ORDER BY total DESC
-    """)
-    resultado = cursor.fetchall()
-    
-    return [{"mesa_numero": row[0], "reservas": row[1]} for row in resultado]
\ No newline at end of file
+    return await ejecutor.ejecutar(
+        cache.obtener, ("estadisticas.mesas_populares",), ("reservas", "mesas"),
+        estadisticas_service.mesas_populares
+    )
+
+@router.get("/ocupacion/serie")
+async def serie_ocupacion(
+    desde: date,
+    hasta: date,
+    granularidad: int = Query(30, ge=5, le=360, description="Minutos por franja")
+):
+    """
+    Serie de ocupación real por franjas dentro de los turnos de [desde, hasta), en total y por ubicación:
+    porcentaje del tiempo con las mesas ocupadas y porcentaje de los asientos en uso.
+    """
+    try:
+        return await ejecutor.ejecutar(
+            cache.obtener, ("estadisticas.serie_franjas", desde, hasta, granularidad), ("reservas", "mesas"),
+            ocupacion_service.serie_franjas, desde, hasta, granularidad
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/ocupacion/serie/turnos")
+async def serie_ocupacion_turnos(desde: date, hasta: date):
+    """
+    Ocupación real por día y turno de [desde, hasta), con la rotación de las mesas (reservas por mesa)
+    y el desglose por ubicación, más el total de cada turno en el rango.
+    """
+    try:
+        return await ejecutor.ejecutar(
+            cache.obtener, ("estadisticas.serie_turnos", desde, hasta), ("reservas", "mesas"),
+            ocupacion_service.serie_turnos, desde, hasta
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
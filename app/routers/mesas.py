@@ -1,60 +1,94 @@
-from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from typing import List
-from datetime import datetime
-from sqlite3 import Connection
-from app.database import get_db
+from datetime import date, datetime
+from app.database import ejecutor
+from app.difusor import difusor
+from app.escritor import escritor
 from app.models import MesaCreate, MesaResponse, MesaUpdate
-from app.services import mesa_service
+from app.services import mesa_service, disponibilidad_service
+from app.services.cache import cache
 
 router = APIRouter()
 
 @router.get("/", response_model=List[MesaResponse])
-def listar_mesas(db: Connection = Depends(get_db)):
+async def listar_mesas():
     """
     Devuelve un listado completo de todas las mesas del restaurante.
     """
-    return mesa_service.obtener_todas(db)
+    return await ejecutor.ejecutar(cache.obtener, ("mesas.listar",), ("mesas",), mesa_service.obtener_todas)
 
 @router.get("/disponibles/", response_model=List[MesaResponse])
-def buscar_mesas_disponibles(
+async def buscar_mesas_disponibles(
     fecha: datetime,
-    comensales: int = Query(..., gt=0),
-    db: Connection = Depends(get_db)
+    comensales: int = Query(..., gt=0)
 ):
     """
     Busca mesas que estén libres para una fecha y hora específicas,
     filtrando por la capacidad necesaria para los comensales.
     """
-    return mesa_service.buscar_disponibles(db, fecha, comensales)
+    return await ejecutor.ejecutar(mesa_service.buscar_disponibles, fecha, comensales)
+
+@router.get("/disponibilidad/grid")
+async def rejilla_disponibilidad(
+    desde: datetime,
+    hasta: datetime,
+    granularidad: int = Query(15, ge=5, le=240, description="Minutos por franja"),
+    comensales: int = Query(1, gt=0)
+):
+    """
+    Devuelve una rejilla mesas x franjas para el rango indicado.
+    Cada mesa trae una cadena 'ocupacion' con un carácter por franja: '0' libre, '1' ocupada.
+    'abierta' indica con el mismo formato qué franjas están dentro del horario del restaurante.
+    """
+    try:
+        return await ejecutor.ejecutar(disponibilidad_service.calcular_grid, desde, hasta, granularidad, comensales)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/disponibilidad/stream")
+async def stream_disponibilidad(fecha: date = Query(None, description="Solo los cambios de este día")):
+    """
+    Flujo Server-Sent Events con los cambios de disponibilidad, para no repetir la consulta cada pocos segundos.
+    Eventos: 'conectado' al empezar, 'disponibilidad' con los intervalos de cada mesa que se ocupan o se liberan,
+    'mesas' con las mesas creadas, modificadas o eliminadas y 'reinicio' cuando hay que recargar la rejilla.
+    """
+    suscriptor = difusor.suscribir(fecha)
+    return StreamingResponse(
+        difusor.eventos(suscriptor),
+        media_type="text/event-stream",
+        # Sin caché ni buffer en los proxies: cada evento tiene que llegar en cuanto se envía
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{id}", response_model=MesaResponse)
-def obtener_mesa(id: int, db: Connection = Depends(get_db)):
+async def obtener_mesa(id: int):
     """
     Obtiene los datos de una mesa específica por su ID.
     """
-    mesa = mesa_service.obtener_por_id(db, id)
+    mesa = await ejecutor.ejecutar(cache.obtener, ("mesas.obtener", id), ("mesas",), mesa_service.obtener_por_id, id)
     if not mesa:
         raise HTTPException(status_code=404, detail="Mesa no encontrada")
     return mesa
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=MesaResponse)
-def crear_mesa(mesa: MesaCreate, db: Connection = Depends(get_db)):
+async def crear_mesa(mesa: MesaCreate):
     """
     Crea una nueva mesa en el sistema.
     Valida que el número de mesa no esté duplicado.
     """
     try:
-        return mesa_service.crear_mesa(db, mesa)
+        return await escritor.escribir(mesa_service.crear_mesa, mesa)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar_mesa(id: int, db: Connection = Depends(get_db)):
+async def eliminar_mesa(id: int):
     """
     Elimina una mesa específica por su ID.
     """
     try:
-        exito = mesa_service.eliminar_mesa(db, id)
+        exito = await escritor.escribir(mesa_service.eliminar_mesa, id)
         if not exito:
             raise HTTPException(status_code=404, detail="Mesa no encontrada")
     except ValueError as e:
@@ -1,80 +1,172 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from sqlite3 import Connection
-from app.database import get_db
-from app.models import ReservaCreate, ReservaResponse, ReservaUpdate
-from app.services import reserva_service
+from fastapi import APIRouter, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal
+from datetime import date, datetime
+from app.database import ejecutor
+from app.escritor import escritor
+from app.models import (
+    ReservaCreate, ReservaResponse, ReservaUpdate,
+    ReservaAutoCreate, ReservaAutoLote, ReservaLoteResponse,
+    ReservaBulkCreate, ReservaBulkResponse,
+    ReservaEstadoLote, ReservaEstadoLoteResponse
+)
+from app.services import reserva_service, asignacion_service, exportacion_service
+from app.services.cache import cache
+from app.services.paginacion import codificar_cursor, decodificar_cursor
+from app.serializacion import RESPUESTAS_RAPIDAS, Serializador
 
 router = APIRouter()
 
+# Listado sin volver a validar con el response_model cuando RESPUESTAS_RAPIDAS=1
+SERIALIZADOR_RESERVAS = Serializador(ReservaResponse)
+
 @router.get("/", response_model=List[ReservaResponse])
-def listar_reservas(
-    fecha: str = None, 
+async def listar_reservas(
+    response: Response,
+    fecha: date = None, 
     cliente_id: int = None, 
-    db: Connection = Depends(get_db)
+    limit: int = Query(100, gt=0, le=1000),
+    cursor: str = Query(None, description="Cursor devuelto en la cabecera X-Next-Cursor")
 ):
     """
     Listar reservas con filtros fecha YYYY-MM-DD, cliente
+    Ordenadas por fecha de inicio. Si hay más resultados, la cabecera X-Next-Cursor trae el cursor de la página siguiente
     """
-    return reserva_service.obtener_todas(db, fecha, cliente_id)
+    despues_de = None
+    if cursor:
+        try:
+            despues_de = tuple(decodificar_cursor(cursor, int, int))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    reservas = await ejecutor.ejecutar(
+        reserva_service.obtener_todas, fecha, cliente_id, limit, despues_de, como_filas=RESPUESTAS_RAPIDAS
+    )
+    if len(reservas) == limit:
+        ultima = reservas[-1]
+        response.headers["X-Next-Cursor"] = codificar_cursor(ultima["inicio"], ultima["id"])
+    if RESPUESTAS_RAPIDAS:
+        return SERIALIZADOR_RESERVAS.respuesta(reservas, response)
+    return reservas
+
+@router.get("/exportar")
+async def exportar_reservas(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    fecha: date = None,
+    cliente_id: int = None,
+    desde: datetime = None,
+    hasta: datetime = None
+):
+    """
+    Exporta las reservas en streaming como NDJSON (una reserva por línea) o CSV, ordenadas por fecha de inicio.
+    Admite los mismos filtros que el listado más un rango desde/hasta sobre la fecha de inicio
+    """
+    if formato == "csv":
+        contenido = exportacion_service.exportar_csv(fecha, cliente_id, desde, hasta)
+        media_type = "text/csv"
+    else:
+        contenido = exportacion_service.exportar_ndjson(fecha, cliente_id, desde, hasta)
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=reservas.{formato}"}
+    )
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=ReservaResponse)
-def crear_reserva(reserva: ReservaCreate, db: Connection = Depends(get_db)):
+async def crear_reserva(reserva: ReservaCreate):
     """
     Crea una nueva reserva validando:
     Existencia de cliente y mesa
     Disponibilidad de horario (no solapamiento)
     Capacidad de la mesa
     """
-    return reserva_service.crear_reserva(db, reserva)
+    return await escritor.escribir(reserva_service.crear_reserva, reserva)
+
+@router.post("/bulk", response_model=ReservaBulkResponse)
+async def crear_reservas_bulk(lote: ReservaBulkCreate):
+    """
+    Crea muchas reservas en una sola transacción con las mismas validaciones que POST /reservas/.
+    Detecta los solapamientos tanto con reservas existentes como dentro del propio lote
+    y devuelve el resultado de cada reserva por su posición en la lista
+    """
+    resultados = await escritor.escribir(reserva_service.crear_reservas_bulk, lote.reservas)
+    creadas = sum(1 for r in resultados if "reserva" in r)
+    return {"creadas": creadas, "rechazadas": len(resultados) - creadas, "resultados": resultados}
+
+@router.patch("/estado", response_model=ReservaEstadoLoteResponse)
+async def cambiar_estado_lote(lote: ReservaEstadoLote):
+    """
+    Confirma, completa o cancela muchas reservas en una sola transacción.
+    Cancelar sigue las mismas reglas que DELETE /reservas/{id}; las reservas archivadas no se modifican.
+    Devuelve el resultado de cada id: el estado en que queda o el error
+    """
+    return await escritor.escribir(reserva_service.cambiar_estados, lote.ids, lote.estado)
+
+@router.post("/auto", status_code=status.HTTP_201_CREATED, response_model=ReservaResponse)
+async def crear_reserva_auto(solicitud: ReservaAutoCreate):
+    """
+    Crea una reserva eligiendo automáticamente la mesa:
+    la libre más pequeña con capacidad suficiente, respetando las ubicaciones preferidas
+    """
+    return await escritor.escribir(asignacion_service.crear_reserva_auto, solicitud)
+
+@router.post("/auto/lote", response_model=ReservaLoteResponse)
+async def crear_lote_auto(lote: ReservaAutoLote):
+    """
+    Asigna mesa a todas las solicitudes de un servicio a la vez, intentando sentar
+    el máximo de comensales, y crea las reservas en una sola transacción.
+    Devuelve el resultado de cada solicitud por su posición en la lista
+    """
+    return await escritor.escribir(asignacion_service.crear_lote_auto, lote.solicitudes)
 
 @router.get("/{id}", response_model=ReservaResponse)
-def obtener_reserva(id: int, db: Connection = Depends(get_db)):
+async def obtener_reserva(id: int):
     """
     Obtiene el detalle de una reserva por su ID
     """
-    reserva = reserva_service.obtener_por_id(db, id)
+    reserva = await ejecutor.ejecutar(cache.obtener, ("reservas.obtener", id), ("reservas",), reserva_service.obtener_por_id, id)
     if not reserva:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
     return reserva
 
 @router.put("/{id}", response_model=ReservaResponse)
-def modificar_reserva(id: int, reserva: ReservaUpdate, db: Connection = Depends(get_db)):
+async def modificar_reserva(id: int, reserva: ReservaUpdate):
     """
     Modifica una reserva existente fecha, comensales, notas
     Recalcula la hora de fin si se cambia la hora de inicio
     """
-    resultado = reserva_service.actualizar_reserva(db, id, reserva)
+    resultado = await escritor.escribir(reserva_service.actualizar_reserva, id, reserva)
     if not resultado:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
     return resultado
 
 @router.delete("/{id}")
-def cancelar_reserva(id: int, db: Connection = Depends(get_db)):
+async def cancelar_reserva(id: int):
     """
     Cancela una reserva
     Cambia el estado a 'cancelada' si cumple las reglas de negocio
     """
-    if not reserva_service.eliminar_reserva(db, id):
+    if not await escritor.escribir(reserva_service.eliminar_reserva, id):
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
     return {"mensaje": "Reserva cancelada"}
 
 @router.patch("/{id}/confirmar", response_model=ReservaResponse)
-def confirmar_reserva(id: int, db: Connection = Depends(get_db)):
+async def confirmar_reserva(id: int):
     """
     Cambia el estado de una reserva a 'confirmada'
     """
-    reserva = reserva_service.cambiar_estado(db, id, "confirmada")
+    reserva = await escritor.escribir(reserva_service.cambiar_estado, id, "confirmada")
     if not reserva:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
     return reserva
 
 @router.patch("/{id}/completar", response_model=ReservaResponse)
-def completar_reserva(id: int, db: Connection = Depends(get_db)):
+async def completar_reserva(id: int):
     """
     Marca una reserva como 'completada', el cliente asistió
     """
-    reserva = reserva_service.cambiar_estado(db, id, "completada")
+    reserva = await escritor.escribir(reserva_service.cambiar_estado, id, "completada")
     if not reserva:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
     return reserva
\ No newline at end of file
@@ -0,0 +1,140 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlite3 import Connection
+from app.database import get_db, pool, ejecutor
+from app.escritor import escritor
+from app.archivador import archivador
+from app.planificador import planificador
+from app.difusor import difusor
+from app.services import archivo_service, estadisticas_service
+from app.services.cache import cache
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import indice
+
+router = APIRouter()
+
+@router.get("/pool")
+def estado_pool():
+    """
+    Devuelve las métricas del pool de conexiones:
+    conexiones creadas, libres y en uso, número de checkouts y tiempos de espera.
+    """
+    return pool.estadisticas()
+
+@router.get("/ejecutor")
+def estado_ejecutor():
+    """
+    Métricas del ejecutor de BD de los endpoints async:
+    operaciones en cola, ejecutadas, rechazadas con 503 y tiempo de espera en cola.
+    """
+    return ejecutor.estadisticas()
+
+@router.get("/escritor")
+def estado_escritor():
+    """
+    Métricas del escritor con commit agrupado:
+    lotes confirmados, operaciones por lote, escrituras en cola y rechazadas con 503.
+    """
+    return escritor.estadisticas()
+
+@router.get("/indice")
+def estado_indice():
+    """
+    Métricas del índice de disponibilidad en memoria.
+    """
+    return indice.estadisticas()
+
+@router.get("/catalogo")
+def estado_catalogo():
+    """
+    Estado del catálogo de mesas en memoria: versión de la tabla cargada, mesas y recargas.
+    """
+    return catalogo.estadisticas()
+
+@router.get("/indice/verificar")
+def verificar_indice(db: Connection = Depends(get_db)):
+    """
+    Compara el índice en memoria con las reservas de la base de datos
+    y devuelve las diferencias encontradas.
+    """
+    return indice.verificar(db)
+
+@router.post("/indice/reconstruir")
+def reconstruir_indice(db: Connection = Depends(get_db)):
+    """
+    Vuelve a cargar el índice de disponibilidad completo desde la base de datos.
+    """
+    indice.reconstruir(db)
+    return indice.estadisticas()
+
+@router.get("/estadisticas/verificar")
+def verificar_estadisticas(db: Connection = Depends(get_db)):
+    """
+    Compara las tablas de resumen de estadísticas con un recálculo desde las reservas.
+    """
+    return estadisticas_service.verificar(db)
+
+@router.post("/estadisticas/reconstruir")
+def reconstruir_estadisticas(db: Connection = Depends(get_db)):
+    """
+    Recalcula desde cero las tablas de resumen de estadísticas.
+    """
+    return estadisticas_service.reconstruir(db)
+
+@router.get("/archivo")
+def estado_archivo(db: Connection = Depends(get_db)):
+    """
+    Estado del archivo histórico: reservas en la tabla principal y en el archivo,
+    las que ya podrían archivarse y las métricas de las pasadas del archivador.
+    """
+    return {**archivo_service.estado(db, archivador.dias), "archivador": archivador.estadisticas()}
+
+@router.post("/archivo/archivar")
+def archivar_reservas():
+    """
+    Mueve ya al archivo histórico las reservas completadas y canceladas antiguas, sin esperar a la próxima pasada.
+    """
+    try:
+        return archivador.archivar()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/planificador")
+def estado_planificador():
+    """
+    Estado del planificador de tareas: si este worker tiene el cerrojo para ejecutarlas y, por tarea,
+    ejecuciones, reservas cambiadas y duración de la última sentencia.
+    """
+    return planificador.estadisticas()
+
+@router.post("/planificador/{nombre}/ejecutar")
+async def ejecutar_tarea(nombre: str):
+    """
+    Ejecuta ya una tarea programada (completar o caducar), aunque le toque a otro worker.
+    """
+    if nombre not in planificador.tareas:
+        raise HTTPException(status_code=404, detail=f"No existe la tarea '{nombre}'")
+    return await planificador.ejecutar(nombre, forzar=True)
+
+@router.get("/difusor")
+def estado_difusor():
+    """
+    Métricas del stream de disponibilidad: clientes conectados, eventos difundidos y entregados,
+    clientes lentos a los que se ha vaciado la cola y lecturas de los cambios de otros workers.
+    """
+    return difusor.estadisticas()
+
+@router.get("/cache")
+def estado_cache():
+    """
+    Métricas de la caché de respuestas: aciertos, fallos, desalojos LRU,
+    entradas caducadas por TTL, obsoletas por escrituras de otros workers e invalidaciones.
+    """
+    return cache.estadisticas()
+
+@router.post("/cache/vaciar")
+def vaciar_cache():
+    """
+    Descarta todas las entradas de la caché de respuestas.
+    """
+    cache.vaciar()
+    return cache.estadisticas()
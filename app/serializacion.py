@@ -0,0 +1,99 @@
+# Archivo: app/serializacion.py
+# Respuestas rápidas para los listados grandes.
+# Por defecto los servicios convierten cada fila en dict y FastAPI vuelve a validarlas todas contra el
+# response_model (volviendo a interpretar las fechas de texto). Con RESPUESTAS_RAPIDAS=1 los listados
+# devuelven las filas de SQLite tal cual y se pasan directamente a JSON con un serializador precompilado
+# por modelo: los datos salen de nuestra propia BD, que ya garantiza los tipos, así que no se validan otra vez.
+import json
+import os
+import typing
+from datetime import datetime
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el json de la librería estándar
+    orjson = None
+
+RESPUESTAS_RAPIDAS = os.getenv("RESPUESTAS_RAPIDAS", "0") == "1"
+
+
+# SQLite guarda las fechas como 'YYYY-MM-DD HH:MM:SS[.ffffff]' y el JSON de Pydantic usa 'T' como separador
+def _fecha(valor):
+    return valor.replace(" ", "T", 1) if isinstance(valor, str) else valor
+
+
+def _booleano(valor):
+    return None if valor is None else bool(valor)
+
+
+def _tipo_base(anotacion):
+    # Optional[X] -> X
+    argumentos = [a for a in typing.get_args(anotacion) if a is not type(None)]
+    if typing.get_origin(anotacion) is typing.Union and len(argumentos) == 1:
+        return argumentos[0]
+    return anotacion
+
+
+_CONVERSIONES = {datetime: "_fecha", bool: "_booleano"}
+
+
+def _volcar(datos):
+    if orjson is not None:
+        return orjson.dumps(datos)
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class Serializador:
+    """
+    Convierte filas sqlite3.Row al JSON de un modelo de respuesta, con los mismos campos,
+    en el mismo orden y con el mismo formato que produciría FastAPI, pero sin validarlas.
+    Para cada orden de columnas se genera una sola vez una función que construye el dict
+    leyendo cada campo por su posición, con la conversión que necesite su tipo.
+    """
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.campos = tuple(modelo.model_fields)
+        self._conversiones = {
+            campo: _CONVERSIONES[_tipo_base(info.annotation)]
+            for campo, info in modelo.model_fields.items()
+            if _tipo_base(info.annotation) in _CONVERSIONES
+        }
+        self._compiladas = {}
+
+    def _compilar(self, columnas: tuple):
+        posiciones = {columna: i for i, columna in enumerate(columnas)}
+        partes = []
+        for campo in self.campos:
+            valor = f"f[{posiciones[campo]}]"
+            if campo in self._conversiones:
+                valor = f"{self._conversiones[campo]}({valor})"
+            partes.append(f"{campo!r}: {valor}")
+        espacio = {"_fecha": _fecha, "_booleano": _booleano}
+        exec("def convertir(f):\n    return {" + ", ".join(partes) + "}\n", espacio)
+        return espacio["convertir"]
+
+    def _convertidor(self, fila):
+        columnas = tuple(fila.keys())
+        convertir = self._compiladas.get(columnas)
+        if convertir is None:
+            convertir = self._compiladas[columnas] = self._compilar(columnas)
+        return convertir
+
+    def fila(self, fila):
+        return self._convertidor(fila)(fila)
+
+    def lista(self, filas):
+        if not filas:
+            return _volcar([])
+        convertir = self._convertidor(filas[0])
+        return _volcar([convertir(fila) for fila in filas])
+
+    # Metodo para construir la respuesta con las cabeceras ya puestas en el 'response' del endpoint
+    # (FastAPI no las copia cuando el endpoint devuelve un Response)
+    def respuesta(self, filas, response: Response = None):
+        respuesta = Response(content=self.lista(filas), media_type="application/json")
+        if response is not None:
+            respuesta.headers.raw.extend(response.headers.raw)
+        return respuesta
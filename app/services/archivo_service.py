@@ -0,0 +1,139 @@
+# Archivo: app/services/archivo_service.py
+# Traslado de las reservas completadas y canceladas antiguas al archivo histórico (la BD adjunta 'archivo').
+# En modo WAL SQLite no confirma dos BD de forma atómica (cada fichero hace su propio commit), así que
+# cada lote se mueve en dos transacciones, de modo que una caída entre medias nunca pierde una reserva:
+#   1. copiar_lote: copia las reservas a archivo.reservas (solo escribe en el archivo)
+#   2. borrar_lote: las borra de 'reservas' si la copia es idéntica (solo escribe en la BD principal)
+# Mientras tanto la reserva está en las dos BD y la vista reservas_todas muestra la de 'reservas'.
+# Si el proceso cae entre las dos, la siguiente pasada la vuelve a copiar (INSERT OR REPLACE) y la borra.
+import json
+from sqlite3 import Connection
+from datetime import date, datetime, time, timedelta
+from app.database import transaccion, a_epoch, desde_epoch, COLUMNAS_RESERVA, SQL_DIA, SQL_TURNO
+from app.services.cache import cache
+
+# Solo se archivan las reservas que ya no pueden cambiar de estado por el flujo normal
+ESTADOS_ARCHIVABLES = ("completada", "cancelada")
+
+_COLUMNAS = ", ".join(COLUMNAS_RESERVA)
+_ARCHIVABLES = f"estado IN ({', '.join('?' * len(ESTADOS_ARCHIVABLES))})"
+
+# Copia al archivo las reservas archivables que empiezan antes del límite, primero las más antiguas
+COPIAR = f"""
+    INSERT OR REPLACE INTO archivo.reservas ({_COLUMNAS})
+    SELECT {_COLUMNAS} FROM main.reservas
+    WHERE inicio < ? AND {_ARCHIVABLES}
+    ORDER BY inicio
+    LIMIT ?
+    RETURNING id
+"""
+
+# Solo se borra la reserva si su copia es idéntica: si ha cambiado después de copiarla, se queda
+# en 'reservas' y la siguiente pasada copia la versión nueva
+BORRAR = f"""
+    DELETE FROM main.reservas AS r
+    WHERE r.id IN (SELECT value FROM json_each(?))
+    AND EXISTS (
+        SELECT 1 FROM archivo.reservas a
+        WHERE a.id = r.id
+        AND ({", ".join(f"a.{c}" for c in COLUMNAS_RESERVA[1:9])}) IS ({", ".join(f"r.{c}" for c in COLUMNAS_RESERVA[1:9])})
+    )
+    RETURNING id
+"""
+
+# Los triggers de estadísticas restan las reservas borradas de 'reservas'; como siguen contando
+# en el histórico, se vuelven a sumar desde sus copias del archivo
+COMPENSAR_ESTADISTICAS = (
+    """
+    INSERT INTO estadisticas_estado (estado, total)
+    SELECT estado, COUNT(*) FROM archivo.reservas WHERE id IN (SELECT value FROM json_each(?)) GROUP BY estado
+    ON CONFLICT (estado) DO UPDATE SET total = total + excluded.total
+    """,
+    """
+    INSERT INTO estadisticas_cliente (cliente_id, total)
+    SELECT cliente_id, COUNT(*) FROM archivo.reservas WHERE id IN (SELECT value FROM json_each(?)) GROUP BY cliente_id
+    ON CONFLICT (cliente_id) DO UPDATE SET total = total + excluded.total
+    """,
+    """
+    INSERT INTO estadisticas_mesa (mesa_id, total)
+    SELECT mesa_id, COUNT(*) FROM archivo.reservas WHERE id IN (SELECT value FROM json_each(?)) GROUP BY mesa_id
+    ON CONFLICT (mesa_id) DO UPDATE SET total = total + excluded.total
+    """,
+    f"""
+    INSERT INTO estadisticas_turno (dia, turno, total)
+    SELECT {SQL_DIA.format(r="a")}, {SQL_TURNO.format(r="a")}, COUNT(*) FROM archivo.reservas a
+    WHERE a.id IN (SELECT value FROM json_each(?)) AND a.estado != 'cancelada'
+    GROUP BY 1, 2
+    ON CONFLICT (dia, turno) DO UPDATE SET total = total + excluded.total
+    """,
+)
+
+
+# Metodo para calcular el límite de archivo: medianoche de hace 'dias' días, en epoch
+def limite_archivo(dias: int, hoy: date = None):
+    hoy = hoy or date.today()
+    return a_epoch(datetime.combine(hoy - timedelta(days=dias), time()))
+
+
+# Metodo para copiar al archivo hasta 'tamano' reservas archivables que empiezan antes de 'limite'.
+# Es una sola sentencia que solo escribe en el archivo, así que no bloquea a los escritores de 'reservas'.
+# Devuelve los ids copiados
+def copiar_lote(conn: Connection, limite: int, tamano: int):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    ids = [fila[0] for fila in cursor.execute(COPIAR, (limite, *ESTADOS_ARCHIVABLES, tamano)).fetchall()]
+    conn.commit()
+    return ids
+
+
+# Metodo para borrar de 'reservas' las reservas ya copiadas, manteniendo las estadísticas.
+# Devuelve cuántas se han borrado
+def borrar_lote(conn: Connection, ids: list):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    with transaccion(conn):
+        borradas = [fila[0] for fila in cursor.execute(BORRAR, (json.dumps(ids),)).fetchall()]
+        if borradas:
+            lista = json.dumps(borradas)
+            for sentencia in COMPENSAR_ESTADISTICAS:
+                cursor.execute(sentencia, (lista,))
+    if borradas:
+        cache.invalidar("reservas")
+    return len(borradas)
+
+
+# Metodo para archivar de una vez todo lo pendiente con una sola conexión (CLI, scripts).
+# La app lo hace en segundo plano con app/archivador.py, pasando el borrado por el escritor
+def archivar(conn: Connection, dias: int, tamano: int = 5000):
+    limite = limite_archivo(dias)
+    archivadas = 0
+    while True:
+        ids = copiar_lote(conn, limite, tamano)
+        borradas = borrar_lote(conn, ids) if ids else 0
+        archivadas += borradas
+        # Si no se ha podido borrar nada es que otro proceso está archivando las mismas reservas
+        if len(ids) < tamano or not borradas:
+            return archivadas
+
+
+# Metodo para resumir el estado del archivo: reservas en cada BD y las que esperan a archivarse
+def estado(conn: Connection, dias: int):
+    limite = limite_archivo(dias)
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    activas = cursor.execute("SELECT COUNT(*) FROM main.reservas").fetchone()[0]
+    pendientes = cursor.execute(
+        f"SELECT COUNT(*) FROM main.reservas WHERE inicio < ? AND {_ARCHIVABLES}", (limite, *ESTADOS_ARCHIVABLES)
+    ).fetchone()[0]
+    archivadas, primera, ultima = cursor.execute(
+        "SELECT COUNT(*), MIN(inicio), MAX(inicio) FROM archivo.reservas"
+    ).fetchone()
+    return {
+        "dias": dias,
+        "limite": desde_epoch(limite),
+        "reservas_activas": activas,
+        "pendientes_de_archivar": pendientes,
+        "reservas_archivadas": archivadas,
+        "archivo_desde": desde_epoch(primera) if primera is not None else None,
+        "archivo_hasta": desde_epoch(ultima) if ultima is not None else None,
+    }
@@ -0,0 +1,213 @@
+# Archivo: app/services/asignacion_service.py
+# Asignación automática de mesas: una reserva suelta o un lote completo de un servicio
+from sqlite3 import Connection
+from datetime import timedelta
+from app.database import transaccion, al_confirmar, a_epoch
+from app.metricas import RESERVAS_SOLAPADAS
+from app.models import ReservaAutoCreate, ReservaCreate
+from app.services import mesa_service, reserva_service
+from app.services.cache import cache
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import DURACION_MAXIMA, indice
+from app.exceptions import (
+    ClienteNoEncontradoError,
+    MesaNoDisponibleError,
+    ReservaSolapadaError,
+    CapacidadExcedidaError,
+    FueraDeHorarioError
+)
+
+DURACION_RESERVA = timedelta(hours=2)
+
+# Errores de negocio que se devuelven por elemento en vez de abortar el lote
+ERRORES_NEGOCIO = (
+    ClienteNoEncontradoError,
+    MesaNoDisponibleError,
+    ReservaSolapadaError,
+    CapacidadExcedidaError,
+    FueraDeHorarioError
+)
+
+
+# Clave de ordenación: primero la mesa más pequeña que sirve, después la ubicación preferida
+def _clave_mesa(mesa, ubicaciones):
+    preferencias = ubicaciones or []
+    rango = preferencias.index(mesa.ubicacion) if mesa.ubicacion in preferencias else len(preferencias)
+    return (mesa.capacidad, rango, mesa.numero)
+
+
+def _reserva_para_mesa(solicitud: ReservaAutoCreate, mesa_id: int):
+    return ReservaCreate(
+        cliente_id=solicitud.cliente_id,
+        mesa_id=mesa_id,
+        fecha_hora_inicio=solicitud.fecha_hora_inicio,
+        num_comensales=solicitud.num_comensales,
+        notas=solicitud.notas,
+    )
+
+
+# Metodo para crear una reserva eligiendo la mejor mesa libre
+def crear_reserva_auto(conn: Connection, solicitud: ReservaAutoCreate):
+    reserva_service.validar_horario(solicitud.fecha_hora_inicio)
+
+    candidatas = mesa_service.mesas_libres(conn, solicitud.fecha_hora_inicio, solicitud.num_comensales)
+    candidatas.sort(key=lambda m: _clave_mesa(m, solicitud.ubicaciones))
+
+    for mesa in candidatas:
+        try:
+            return reserva_service.crear_reserva(conn, _reserva_para_mesa(solicitud, mesa.id))
+        except ReservaSolapadaError:
+            # Otra petición se la ha llevado entre la búsqueda y el INSERT, probamos la siguiente
+            continue
+
+    if solicitud.num_comensales > catalogo.foto(conn).capacidad_maxima():
+        raise CapacidadExcedidaError(f"Ninguna mesa admite {solicitud.num_comensales} personas")
+    raise MesaNoDisponibleError("No hay mesas libres para ese horario y número de comensales")
+
+
+# Planificador del lote: intervalos ocupados por mesa y asignaciones hechas en este lote
+class _Plan:
+    def __init__(self, mesas, ocupadas):
+        self.mesas = mesas
+        self.ocupadas = ocupadas      # mesa_id -> [(inicio, fin)] ya existentes en la BD
+        self.asignadas = {}           # mesa_id -> {indice_solicitud: (inicio, fin)}
+
+    def conflictos(self, mesa_id, inicio, fin):
+        """Devuelve None si choca con la BD, o los índices del lote con los que choca"""
+        for o_inicio, o_fin in self.ocupadas.get(mesa_id, ()):
+            if o_inicio < fin and o_fin > inicio:
+                return None
+        return [i for i, (a_inicio, a_fin) in self.asignadas.get(mesa_id, {}).items() if a_inicio < fin and a_fin > inicio]
+
+    def libres(self, solicitud, inicio, fin, excluir=None):
+        return [
+            m for m in self.mesas
+            if m.capacidad >= solicitud.num_comensales and m.id != excluir
+            and self.conflictos(m.id, inicio, fin) == []
+        ]
+
+    def asignar(self, i, mesa_id, inicio, fin):
+        self.asignadas.setdefault(mesa_id, {})[i] = (inicio, fin)
+
+    def liberar(self, i, mesa_id):
+        del self.asignadas[mesa_id][i]
+
+
+# Metodo para repartir un lote de solicitudes entre las mesas maximizando los comensales sentados
+def planificar_lote(conn: Connection, solicitudes):
+    cursor = conn.cursor()
+    mesas = catalogo.foto(conn).activas()
+
+    intervalos = [
+        (a_epoch(s.fecha_hora_inicio), a_epoch(s.fecha_hora_inicio + DURACION_RESERVA)) for s in solicitudes
+    ]
+    ocupadas = {}
+    if solicitudes:
+        # Reservas que tocan el rango del lote; la cota inferior de 'inicio' evita recorrer todo el histórico
+        primer_inicio = min(i for i, _ in intervalos)
+        cursor.execute("""
+            SELECT mesa_id, inicio, fin FROM reservas
+            WHERE estado IN ('pendiente', 'confirmada', 'completada')
+            AND inicio >= ?
+            AND inicio < ?
+            AND fin > ?
+        """, (primer_inicio - DURACION_MAXIMA, max(f for _, f in intervalos), primer_inicio))
+        for mesa_id, inicio, fin in cursor.fetchall():
+            ocupadas.setdefault(mesa_id, []).append((inicio, fin))
+
+    plan = _Plan(mesas, ocupadas)
+    mesa_de = {}
+
+    # Best-fit decreasing: primero los grupos grandes, que son los que más cuesta colocar
+    orden = sorted(range(len(solicitudes)), key=lambda i: (-solicitudes[i].num_comensales, intervalos[i][0]))
+    pendientes = []
+    for i in orden:
+        solicitud = solicitudes[i]
+        libres = plan.libres(solicitud, *intervalos[i])
+        if libres:
+            mesa = min(libres, key=lambda m: _clave_mesa(m, solicitud.ubicaciones))
+            plan.asignar(i, mesa.id, *intervalos[i])
+            mesa_de[i] = mesa.id
+        else:
+            pendientes.append(i)
+
+    # Segunda pasada: para cada solicitud sin mesa, intentamos mover a otra mesa
+    # las solicitudes del lote que le bloquean una mesa válida
+    for i in pendientes:
+        solicitud = solicitudes[i]
+        inicio, fin = intervalos[i]
+        candidatas = sorted(
+            (m for m in mesas if m.capacidad >= solicitud.num_comensales),
+            key=lambda m: _clave_mesa(m, solicitud.ubicaciones)
+        )
+        for mesa in candidatas:
+            bloqueantes = plan.conflictos(mesa.id, inicio, fin)
+            if not bloqueantes:
+                continue
+            movimientos = []
+            for j in bloqueantes:
+                plan.liberar(j, mesa.id)
+            for j in bloqueantes:
+                otras = plan.libres(solicitudes[j], *intervalos[j], excluir=mesa.id)
+                if not otras:
+                    break
+                destino = min(otras, key=lambda m: _clave_mesa(m, solicitudes[j].ubicaciones))
+                plan.asignar(j, destino.id, *intervalos[j])
+                movimientos.append((j, destino.id))
+            if len(movimientos) == len(bloqueantes) and plan.conflictos(mesa.id, inicio, fin) == []:
+                for j, destino in movimientos:
+                    mesa_de[j] = destino
+                plan.asignar(i, mesa.id, inicio, fin)
+                mesa_de[i] = mesa.id
+                break
+            # Deshacer el intento
+            for j, destino in movimientos:
+                plan.liberar(j, destino)
+            for j in bloqueantes:
+                plan.asignar(j, mesa.id, *intervalos[j])
+
+    return mesa_de
+
+
+# Metodo para asignar y crear todas las reservas de un lote en una sola transacción
+def crear_lote_auto(conn: Connection, solicitudes):
+    resultados = [None] * len(solicitudes)
+
+    # Las que están fuera de horario no entran en el reparto
+    validas = []
+    for i, solicitud in enumerate(solicitudes):
+        try:
+            reserva_service.validar_horario(solicitud.fecha_hora_inicio)
+            validas.append(i)
+        except FueraDeHorarioError as e:
+            resultados[i] = {"indice": i, "error": type(e).__name__, "mensaje": str(e)}
+
+    with transaccion(conn):
+        plan = planificar_lote(conn, [solicitudes[i] for i in validas])
+        for posicion, i in enumerate(validas):
+            mesa_id = plan.get(posicion)
+            if mesa_id is None:
+                resultados[i] = {
+                    "indice": i,
+                    "error": MesaNoDisponibleError.__name__,
+                    "mensaje": "No hay mesas libres para ese horario y número de comensales",
+                }
+                continue
+            try:
+                reserva = reserva_service.crear_reserva(conn, _reserva_para_mesa(solicitudes[i], mesa_id))
+                resultados[i] = {"indice": i, "reserva": reserva}
+            except ERRORES_NEGOCIO as e:
+                if isinstance(e, ReservaSolapadaError):
+                    al_confirmar(conn, RESERVAS_SOLAPADAS.inc)
+                resultados[i] = {"indice": i, "error": type(e).__name__, "mensaje": str(e)}
+
+    indice.sincronizar(conn)
+    cache.invalidar("reservas")
+
+    asignadas = [r for r in resultados if r.get("reserva")]
+    return {
+        "asignadas": len(asignadas),
+        "no_asignadas": len(resultados) - len(asignadas),
+        "comensales_sentados": sum(r["reserva"]["num_comensales"] for r in asignadas),
+        "resultados": resultados,
+    }
@@ -0,0 +1,102 @@
+# Archivo: app/services/cache.py
+# Caché en memoria de respuestas de lectura, con desalojo LRU y caducidad por TTL.
+# Cada entrada recuerda la versión de las tablas de las que depende (tabla versiones_tablas,
+# que suben los triggers en cada escritura). Antes de servir un valor se comparan con las actuales,
+# así que una escritura de cualquier worker sobre la misma BD deja la entrada obsoleta.
+import os
+import threading
+from collections import OrderedDict
+from sqlite3 import Connection
+from time import monotonic
+
+CACHE_TAMANO = int(os.getenv("CACHE_TAMANO", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+
+
+class CacheRespuestas:
+    """
+    Guarda (caduca, tablas, versiones, valor) por clave en un OrderedDict ordenado por último uso.
+    Las escrituras de este proceso invalidan sus entradas al momento con invalidar();
+    las de otros procesos se detectan por la versión de las tablas.
+    """
+
+    def __init__(self, tamano: int = CACHE_TAMANO, ttl: float = CACHE_TTL):
+        self.tamano = tamano
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.caducadas = 0
+        self.obsoletas = 0
+        self.invalidaciones = 0
+
+    def _versiones(self, conn: Connection, tablas: tuple):
+        actuales = dict(conn.execute("SELECT tabla, version FROM versiones_tablas").fetchall())
+        return tuple(actuales.get(tabla) for tabla in tablas)
+
+    # Metodo para devolver el valor cacheado de 'clave' o calcularlo con calcular(conn, *args) y guardarlo.
+    # 'tablas' son las tablas que lee 'calcular'
+    def obtener(self, conn: Connection, clave: tuple, tablas: tuple, calcular, *args):
+        # Las versiones se leen antes de calcular: si alguien escribe entre medias,
+        # la entrada queda con versiones antiguas y la siguiente lectura la descarta
+        versiones = self._versiones(conn, tablas)
+        ahora = monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                caduca, _, guardadas, valor = entrada
+                if caduca <= ahora:
+                    del self._entradas[clave]
+                    self.caducadas += 1
+                elif guardadas != versiones:
+                    del self._entradas[clave]
+                    self.obsoletas += 1
+                else:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+            self.fallos += 1
+
+        valor = calcular(conn, *args)
+
+        with self._lock:
+            self._entradas[clave] = (ahora + self.ttl, tablas, versiones, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.tamano:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+        return valor
+
+    # Metodo para descartar las entradas que dependen de alguna de las tablas escritas
+    def invalidar(self, *tablas: str):
+        with self._lock:
+            claves = [clave for clave, entrada in self._entradas.items() if set(entrada[1]) & set(tablas)]
+            for clave in claves:
+                del self._entradas[clave]
+            self.invalidaciones += len(claves)
+
+    def vaciar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "tamano_maximo": self.tamano,
+                "ttl_segundos": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+                "desalojos": self.desalojos,
+                "caducadas": self.caducadas,
+                "obsoletas": self.obsoletas,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+# Caché compartida por todo el proceso
+cache = CacheRespuestas()
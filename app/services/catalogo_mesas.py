@@ -0,0 +1,117 @@
+# Archivo: app/services/catalogo_mesas.py
+# Catálogo en memoria de las mesas del restaurante.
+# La tabla mesas tiene pocas filas y casi nunca cambia, así que las reservas y la disponibilidad
+# la consultan aquí en vez de leerla de SQLite en cada petición. El contenido es una foto inmutable
+# que se sustituye entera cuando cambia la versión de la tabla (versiones_tablas).
+import threading
+from bisect import bisect_left
+from sqlite3 import Connection
+
+
+class Mesa:
+    """Registro compacto de una mesa. Se trata como inmutable una vez creado."""
+    __slots__ = ("id", "numero", "capacidad", "ubicacion", "activa")
+
+    def __init__(self, id: int, numero: int, capacidad: int, ubicacion: str, activa: bool):
+        self.id = id
+        self.numero = numero
+        self.capacidad = capacidad
+        self.ubicacion = ubicacion
+        self.activa = activa
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+class FotoCatalogo:
+    """
+    Contenido del catálogo para una versión de la tabla mesas.
+    Indexado por id, y las mesas activas ordenadas por (capacidad, id) y agrupadas por ubicación.
+    """
+    __slots__ = ("version", "por_id", "activas_por_capacidad", "_capacidades", "por_ubicacion")
+
+    def __init__(self, version: int, mesas: list):
+        self.version = version
+        self.por_id = {m.id: m for m in mesas}
+        activas = sorted((m for m in mesas if m.activa), key=lambda m: (m.capacidad, m.id))
+        self.activas_por_capacidad = tuple(activas)
+        self._capacidades = tuple(m.capacidad for m in activas)
+        por_ubicacion = {}
+        for m in activas:
+            por_ubicacion.setdefault(m.ubicacion, []).append(m)
+        self.por_ubicacion = {ubicacion: tuple(lista) for ubicacion, lista in por_ubicacion.items()}
+
+    def obtener(self, mesa_id: int):
+        return self.por_id.get(mesa_id)
+
+    def todas(self):
+        return [self.por_id[mesa_id] for mesa_id in sorted(self.por_id)]
+
+    # Metodo para obtener las mesas activas con capacidad suficiente, de menor a mayor capacidad
+    def activas(self, comensales: int = 1, ubicacion: str = None):
+        if ubicacion is not None:
+            return tuple(m for m in self.por_ubicacion.get(ubicacion, ()) if m.capacidad >= comensales)
+        return self.activas_por_capacidad[bisect_left(self._capacidades, comensales):]
+
+    def capacidad_maxima(self):
+        return self._capacidades[-1] if self._capacidades else 0
+
+
+class CatalogoMesas:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._foto = None
+        self.recargas = 0
+
+    def _version(self, conn: Connection):
+        return conn.execute("SELECT version FROM versiones_tablas WHERE tabla = 'mesas'").fetchone()[0]
+
+    # Metodo para leer la tabla mesas y sustituir la foto del catálogo
+    def cargar(self, conn: Connection):
+        # Versión y filas de la misma foto de la BD
+        abrir = not conn.in_transaction
+        if abrir:
+            conn.execute("BEGIN")
+        try:
+            version = self._version(conn)
+            filas = conn.execute("SELECT id, numero, capacidad, ubicacion, activa FROM mesas").fetchall()
+        finally:
+            if abrir:
+                conn.commit()
+
+        foto = FotoCatalogo(version, [Mesa(*fila) for fila in filas])
+        with self._lock:
+            # Nunca sustituimos una foto por otra más antigua cargada en paralelo
+            if self._foto is None or self._foto.version <= version:
+                self._foto = foto
+            self.recargas += 1
+        return foto
+
+    # Metodo para obtener la foto vigente. Si se pasa la versión ya leída (por ejemplo dentro de la
+    # transacción de una reserva) no se vuelve a consultar; si no coincide, se recarga
+    def foto(self, conn: Connection, version: int = None):
+        if version is None:
+            version = self._version(conn)
+        foto = self._foto
+        if foto is None or foto.version != version:
+            foto = self.cargar(conn)
+        return foto
+
+    def invalidar(self):
+        with self._lock:
+            self._foto = None
+
+    def estadisticas(self):
+        foto = self._foto
+        return {
+            "cargado": foto is not None,
+            "version": foto.version if foto else None,
+            "mesas": len(foto.por_id) if foto else 0,
+            "activas": len(foto.activas_por_capacidad) if foto else 0,
+            "recargas": self.recargas,
+        }
+
+
+# Catálogo compartido por todo el proceso
+catalogo = CatalogoMesas()
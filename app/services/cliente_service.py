@@ -1,12 +1,22 @@
 import sqlite3
 from sqlite3 import Connection
+from app.database import TABLA_ACENTOS, transaccion
 from app.models import ClienteCreate, ClienteUpdate
+from app.services.cache import cache
 
-# Metodo para obtener la lista de todos los clientes
-def obtener_todos(conn: Connection, skip: int = 0, limit: int = 100):
+# Metodo para obtener la lista de todos los clientes.
+# Con 'despues_de_id' pagina por clave (WHERE id > ?), que cuesta lo mismo en cualquier página;
+# 'skip' se mantiene por compatibilidad pero se vuelve más lento cuanto más avanza.
+# Con 'como_filas' devuelve las sqlite3.Row sin convertir (para app/serializacion.py)
+def obtener_todos(conn: Connection, skip: int = 0, limit: int = 100, despues_de_id: int = None, como_filas: bool = False):
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM clientes LIMIT ? OFFSET ?", (limit, skip))
+    if despues_de_id is not None:
+        cursor.execute("SELECT * FROM clientes WHERE id > ? ORDER BY id LIMIT ?", (despues_de_id, limit))
+    else:
+        cursor.execute("SELECT * FROM clientes ORDER BY id LIMIT ? OFFSET ?", (limit, skip))
     filas = cursor.fetchall()
+    if como_filas:
+        return filas
     return [dict(fila) for fila in filas]
 
 # Metodo para obtener un cliente por su id
@@ -16,15 +26,39 @@ def obtener_por_id(conn: Connection, cliente_id: int):
     fila = cursor.fetchone()
     return dict(fila) if fila else None
 
-def buscar_clientes(conn: Connection, texto: str):
-    # Busca por nombre o email o teléfono usando LIKE
+# Metodo para buscar clientes por nombre, email o teléfono.
+# Usa el índice FTS5 de trigramas: encuentra el texto en cualquier posición (también mientras se escribe),
+# sin distinguir mayúsculas ni acentos, y ordena por relevancia
+def buscar_clientes(conn: Connection, texto: str, limit: int = 50, como_filas: bool = False):
     cursor = conn.cursor()
-    texto_busqueda = f"%{texto}%"
-    cursor.execute("""
-        SELECT * FROM clientes 
-        WHERE nombre LIKE ? OR email LIKE ? OR telefono LIKE ?
-    """, (texto_busqueda, texto_busqueda, texto_busqueda))
+    texto = texto.strip().translate(TABLA_ACENTOS)
+    if not texto:
+        return []
+
+    if len(texto) >= 3:
+        # Frase entre comillas para que FTS5 no interprete operadores del usuario
+        consulta = '"' + texto.replace('"', '""') + '"'
+        cursor.execute("""
+            SELECT c.* FROM clientes_fts
+            JOIN clientes c ON c.id = clientes_fts.rowid
+            WHERE clientes_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (consulta, limit))
+    else:
+        # Los trigramas necesitan al menos 3 caracteres: con menos buscamos por prefijo
+        prefijo = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        cursor.execute("""
+            SELECT c.* FROM clientes_fts
+            JOIN clientes c ON c.id = clientes_fts.rowid
+            WHERE clientes_fts.nombre LIKE ? ESCAPE '\\'
+            OR clientes_fts.email LIKE ? ESCAPE '\\'
+            OR clientes_fts.telefono LIKE ? ESCAPE '\\'
+            LIMIT ?
+        """, (prefijo, prefijo, prefijo, limit))
     filas = cursor.fetchall()
+    if como_filas:
+        return filas
     return [dict(fila) for fila in filas]
 
 # Metodo para crear un nuevo cliente
@@ -32,27 +66,18 @@ def crear_cliente(conn: Connection, cliente_in: ClienteCreate):
     cursor = conn.cursor()
     # Insertar
     try:
-        cursor.execute("""
-            INSERT INTO clientes (nombre, email, telefono, notas)
-            VALUES (?, ?, ?, ?)
-        """, (cliente_in.nombre, cliente_in.email, cliente_in.telefono, cliente_in.notas))
-        conn.commit()
-
-        # Recuperar el ID generado
-        nuevo_id = cursor.lastrowid
-
-        # Devolver el objeto creado, para ser rápidos, lo construimos
-        return {
-            "id": nuevo_id,
-            "nombre": cliente_in.nombre,
-            "email": cliente_in.email,
-            "telefono": cliente_in.telefono,
-            "notas": cliente_in.notas,
-            "fecha_registro": "Recién creado" # SQLite lo maneja internamente
-        }
+        with transaccion(conn):
+            cursor.execute("""
+                INSERT INTO clientes (nombre, email, telefono, notas)
+                VALUES (?, ?, ?, ?)
+            """, (cliente_in.nombre, cliente_in.email, cliente_in.telefono, cliente_in.notas))
     except sqlite3.IntegrityError:
         # Si el email ya existe, SQLite lanzará error
         raise ValueError("El email ya está registrado")
+    cache.invalidar("clientes")
+
+    # Devolvemos la fila creada, con la fecha de registro que pone SQLite
+    return obtener_por_id(conn, cursor.lastrowid)
 
 def actualizar_cliente(conn: Connection, cliente_id: int, cliente_in: ClienteUpdate):
     cursor = conn.cursor()
@@ -75,28 +100,30 @@ def actualizar_cliente(conn: Connection, cliente_id: int, cliente_in: ClienteUpd
     values.append(cliente_id) # Para el WHERE
     query = f"UPDATE clientes SET {', '.join(set_clauses)} WHERE id = ?"
 
-    cursor.execute(query, values)
-    conn.commit()
+    with transaccion(conn):
+        cursor.execute(query, values)
+    cache.invalidar("clientes")
 
     return obtener_por_id(conn, cliente_id)
 
 def eliminar_cliente(conn: Connection, cliente_id: int):
     cursor = conn.cursor()
 
-    # Verificar si existe
-    cursor.execute("SELECT id FROM clientes WHERE id = ?", (cliente_id,))
-    if not cursor.fetchone():
-        return False # No encontrado
+    with transaccion(conn):
+        # Verificar si existe
+        cursor.execute("SELECT id FROM clientes WHERE id = ?", (cliente_id,))
+        if not cursor.fetchone():
+            return False # No encontrado
 
-    # Verificar si tiene reservas activas
-    cursor.execute("""
-        SELECT id FROM reservas 
-        WHERE cliente_id = ? AND estado IN ('pendiente', 'confirmada')
-    """, (cliente_id,))
+        # Verificar si tiene reservas activas
+        cursor.execute("""
+            SELECT id FROM reservas 
+            WHERE cliente_id = ? AND estado IN ('pendiente', 'confirmada')
+        """, (cliente_id,))
 
-    if cursor.fetchone():
-        raise ValueError("No se puede eliminar un cliente con reservas activas")
+        if cursor.fetchone():
+            raise ValueError("No se puede eliminar un cliente con reservas activas")
 
-    cursor.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))
-    conn.commit()
-    return True
\ No newline at end of file
+        cursor.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))
+    cache.invalidar("clientes")
+    return True
@@ -0,0 +1,89 @@
+# Archivo: app/services/disponibilidad_service.py
+# Rejilla de disponibilidad mesas x franjas calculada de una sola pasada con NumPy
+from sqlite3 import Connection
+from datetime import datetime, timedelta
+import numpy as np
+from app.database import a_epoch
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import DURACION_MAXIMA
+
+# Límite del rango para no generar matrices gigantes por error
+MAX_DIAS_GRID = 31
+
+
+# Metodo para calcular la rejilla de ocupación de un rango de fechas
+def calcular_grid(conn: Connection, desde: datetime, hasta: datetime, granularidad: int, comensales: int):
+    if hasta <= desde:
+        raise ValueError("La fecha 'hasta' debe ser posterior a 'desde'")
+    if hasta - desde > timedelta(days=MAX_DIAS_GRID):
+        raise ValueError(f"El rango no puede superar {MAX_DIAS_GRID} días")
+
+    cursor = conn.cursor()
+    # Filas de la rejilla ordenadas por id para poder localizar cada reserva con searchsorted
+    mesas = sorted(catalogo.foto(conn).activas(comensales), key=lambda mesa: mesa.id)
+
+    # Franjas: inicio de cada celda en segundos desde 'desde'
+    paso = granularidad * 60
+    num_franjas = -(-int((hasta - desde).total_seconds()) // paso)
+    inicios_franja = np.datetime64(desde, "s") + np.arange(num_franjas) * np.timedelta64(paso, "s")
+
+    # Horario de apertura de cada franja (12-16 y 20-00)
+    horas = (inicios_franja - inicios_franja.astype("datetime64[D]")).astype("timedelta64[h]").astype(np.int64)
+    abierta = ((horas >= 12) & (horas < 16)) | (horas >= 20)
+
+    ocupada = np.zeros((len(mesas), num_franjas), dtype=bool)
+    if mesas:
+        # Una sola consulta con todas las reservas que tocan el rango; la cota inferior de 'inicio'
+        # limita el recorrido de idx_reservas_inicio al rango en vez de todo el histórico anterior
+        cursor.execute("""
+            SELECT mesa_id, inicio, fin FROM reservas
+            WHERE estado IN ('pendiente', 'confirmada', 'completada')
+            AND inicio >= ?
+            AND inicio < ?
+            AND fin > ?
+        """, (a_epoch(desde) - DURACION_MAXIMA, a_epoch(hasta), a_epoch(desde)))
+        reservas = cursor.fetchall()
+
+        if reservas:
+            ids_mesa = np.array([m.id for m in mesas], dtype=np.int64)
+            mesa_res, inicio_res, fin_res = np.array(reservas, dtype=np.int64).T
+
+            # Solo las reservas de mesas que están en la rejilla
+            fila = np.searchsorted(ids_mesa, mesa_res)
+            fila = np.minimum(fila, len(ids_mesa) - 1)
+            dentro = ids_mesa[fila] == mesa_res
+            fila = fila[dentro]
+
+            # Franja en la que empieza y termina cada reserva (fin exclusivo)
+            base = a_epoch(desde)
+            seg_inicio = inicio_res[dentro] - base
+            seg_fin = fin_res[dentro] - base
+            primera = np.clip(seg_inicio // paso, 0, num_franjas)
+            ultima = np.clip(-(-seg_fin // paso), 0, num_franjas)
+
+            # Barrido con diferencias: +1 donde empieza, -1 donde acaba y suma acumulada por fila
+            diferencias = np.zeros((len(mesas), num_franjas + 1), dtype=np.int32)
+            np.add.at(diferencias, (fila, primera), 1)
+            np.add.at(diferencias, (fila, ultima), -1)
+            ocupada = np.cumsum(diferencias, axis=1)[:, :num_franjas] > 0
+
+    # Cada fila como cadena de '0' (libre) y '1' (ocupada), compacta también para muchas mesas
+    filas_texto = (ocupada.astype(np.uint8) + ord("0")).tobytes()
+
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "granularidad_minutos": granularidad,
+        "franjas": [str(f) for f in inicios_franja],
+        "abierta": (abierta.astype(np.uint8) + ord("0")).tobytes().decode(),
+        "mesas": [
+            {
+                "mesa_id": mesa.id,
+                "numero": mesa.numero,
+                "capacidad": mesa.capacidad,
+                "ubicacion": mesa.ubicacion,
+                "ocupacion": filas_texto[i * num_franjas:(i + 1) * num_franjas].decode(),
+            }
+            for i, mesa in enumerate(mesas)
+        ],
+    }
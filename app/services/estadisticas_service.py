@@ -0,0 +1,124 @@
+# Archivo: app/services/estadisticas_service.py
+# Lecturas de las tablas de resumen que mantienen los triggers (ver _migracion_3_estadisticas).
+# Cada consulta toca unas pocas filas, no recorre el histórico de reservas.
+from sqlite3 import Connection
+from datetime import date, datetime, timedelta
+from app.database import SQL_DIA, SQL_TURNO, RESERVAS_HISTORICO, a_epoch, rellenar_estadisticas, transaccion
+from app.services.cache import cache
+
+
+def _total(conn: Connection, clave: str):
+    fila = conn.execute("SELECT total FROM estadisticas_totales WHERE clave = ?", (clave,)).fetchone()
+    return fila[0] if fila else 0
+
+
+# Metodo para obtener las reservas activas por turno de un rango de días [desde, hasta)
+def _reservas_por_turno(conn: Connection, desde: date, hasta: date):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT turno, SUM(total) FROM estadisticas_turno
+        WHERE dia >= ? AND dia < ?
+        GROUP BY turno
+    """, (a_epoch(datetime.combine(desde, datetime.min.time())), a_epoch(datetime.combine(hasta, datetime.min.time()))))
+    por_turno = {"comida": 0, "cena": 0}
+    por_turno.update({turno: total for turno, total in cursor.fetchall()})
+    return por_turno
+
+
+def ocupacion_diaria(conn: Connection, fecha: date):
+    por_turno = _reservas_por_turno(conn, fecha, fecha + timedelta(days=1))
+    reservas_count = sum(por_turno.values())
+    total_mesas = _total(conn, "mesas")
+
+    porcentaje = (reservas_count / total_mesas) * 100 if total_mesas > 0 else 0
+
+    return {
+        "fecha": fecha,
+        "reservas_totales": reservas_count,
+        "reservas_por_turno": por_turno,
+        "porcentaje_ocupacion": round(porcentaje, 2)
+    }
+
+
+def ocupacion_semanal(conn: Connection, fecha_inicio: date):
+    fecha_fin = fecha_inicio + timedelta(days=7)
+    por_turno = _reservas_por_turno(conn, fecha_inicio, fecha_fin)
+    return {
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+        "total_reservas": sum(por_turno.values()),
+        "reservas_por_turno": por_turno
+    }
+
+
+def resumen(conn: Connection):
+    cursor = conn.cursor()
+    cursor.execute("SELECT estado, total FROM estadisticas_estado WHERE total > 0")
+    desglose_dict = {row[0]: row[1] for row in cursor.fetchall()}
+
+    return {
+        "total_reservas_historico": sum(desglose_dict.values()),
+        "desglose_por_estado": desglose_dict,
+        "total_clientes_registrados": _total(conn, "clientes"),
+        "total_mesas_disponibles": _total(conn, "mesas")
+    }
+
+
+def clientes_frecuentes(conn: Connection, limit: int = 10):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT c.nombre, e.total
+        FROM estadisticas_cliente e
+        JOIN clientes c ON c.id = e.cliente_id
+        WHERE e.total > 0
+        ORDER BY e.total DESC
+        LIMIT ?
+    """, (limit,))
+    return [{"cliente": row[0], "reservas": row[1]} for row in cursor.fetchall()]
+
+
+def mesas_populares(conn: Connection):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT m.numero, e.total
+        FROM estadisticas_mesa e
+        JOIN mesas m ON m.id = e.mesa_id
+        WHERE e.total > 0
+        ORDER BY e.total DESC
+    """)
+    return [{"mesa_numero": row[0], "reservas": row[1]} for row in cursor.fetchall()]
+
+
+# Metodo para recalcular las tablas de resumen desde las tablas reales (con el archivo histórico)
+def reconstruir(conn: Connection):
+    with transaccion(conn):
+        rellenar_estadisticas(conn.cursor(), RESERVAS_HISTORICO)
+        # Las respuestas de /estadisticas se cachean con la versión de 'reservas', y las tablas de resumen
+        # no la suben: se sube aquí para que ningún worker siga sirviendo las de antes
+        conn.execute("UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'reservas'")
+    cache.invalidar("reservas")
+    return resumen(conn)
+
+
+# Metodo para comparar las tablas de resumen con lo que da recalcular desde cero.
+# Devuelve las claves que no cuadran; vacío si todo está al día
+def verificar(conn: Connection):
+    diferencias = {}
+    comprobaciones = {
+        "estado": ("SELECT estado, total FROM estadisticas_estado WHERE total != 0",
+                   f"SELECT estado, COUNT(*) FROM {RESERVAS_HISTORICO} GROUP BY estado"),
+        "cliente": ("SELECT cliente_id, total FROM estadisticas_cliente WHERE total != 0",
+                    f"SELECT cliente_id, COUNT(*) FROM {RESERVAS_HISTORICO} GROUP BY cliente_id"),
+        "mesa": ("SELECT mesa_id, total FROM estadisticas_mesa WHERE total != 0",
+                 f"SELECT mesa_id, COUNT(*) FROM {RESERVAS_HISTORICO} GROUP BY mesa_id"),
+        "turno": ("SELECT dia || ' ' || turno, total FROM estadisticas_turno WHERE total != 0",
+                  f"""SELECT {SQL_DIA.format(r="r")} || ' ' || {SQL_TURNO.format(r="r")}, COUNT(*)
+                  FROM {RESERVAS_HISTORICO} r WHERE r.estado != 'cancelada' GROUP BY 1"""),
+    }
+    for nombre, (resumen_sql, real_sql) in comprobaciones.items():
+        guardado = dict(conn.execute(resumen_sql).fetchall())
+        real = dict(conn.execute(real_sql).fetchall())
+        distintas = sorted(k for k in set(guardado) | set(real) if guardado.get(k) != real.get(k))
+        if distintas:
+            diferencias[nombre] = distintas
+    return {"consistente": not diferencias, "diferencias": diferencias}
@@ -0,0 +1,51 @@
+# Archivo: app/services/exportacion_service.py
+# Exportación de reservas en streaming (NDJSON y CSV), ordenadas por fecha de inicio.
+# Las filas se leen por bloques con paginación por clave (inicio, id) a través del ejecutor de BD:
+# cada bloque saca una conexión del pool y la devuelve al terminar, así que un cliente lento
+# no retiene ninguna conexión mientras descarga y las exportaciones cuentan en el límite del ejecutor.
+# La memoria no depende del número de filas.
+import csv
+import io
+import json
+from datetime import date, datetime
+from app.database import ejecutor
+from app.services import reserva_service
+from app.services.reserva_service import COLUMNAS_EXPORTACION
+
+# Filas por bloque (una consulta y una vuelta al pool por bloque)
+TAMANO_BLOQUE = 1000
+
+
+async def _bloques(fecha: date, cliente_id: int, desde: datetime, hasta: datetime):
+    despues_de = None
+    while True:
+        filas = await ejecutor.ejecutar(
+            reserva_service.bloque_exportacion, fecha, cliente_id, desde, hasta, despues_de, TAMANO_BLOQUE
+        )
+        if filas:
+            # La última columna es 'inicio', que solo sirve para la clave del bloque siguiente
+            yield [fila[:-1] for fila in filas]
+        if len(filas) < TAMANO_BLOQUE:
+            return
+        despues_de = (filas[-1][-1], filas[-1][0])
+
+
+async def exportar_ndjson(fecha: date = None, cliente_id: int = None, desde: datetime = None, hasta: datetime = None):
+    async for filas in _bloques(fecha, cliente_id, desde, hasta):
+        yield "".join(
+            json.dumps(dict(zip(COLUMNAS_EXPORTACION, fila)), ensure_ascii=False, default=str) + "\n"
+            for fila in filas
+        )
+
+
+async def exportar_csv(fecha: date = None, cliente_id: int = None, desde: datetime = None, hasta: datetime = None):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS_EXPORTACION)
+    yield buffer.getvalue()
+
+    async for filas in _bloques(fecha, cliente_id, desde, hasta):
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(filas)
+        yield buffer.getvalue()
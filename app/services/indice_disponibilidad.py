@@ -0,0 +1,223 @@
+# Archivo: app/services/indice_disponibilidad.py
+# Índice en memoria de los intervalos ocupados de cada mesa.
+# Se construye desde la BD y se mantiene al día leyendo la tabla reservas_cambios,
+# que rellenan los triggers de reservas. Así también ve lo que escriben otros workers.
+# Un oyente (el difusor de app/difusor.py) puede recibir los intervalos que se ocupan o se liberan.
+# 'desde' avanza a medianoche al sincronizar y las reservas que ya han terminado salen del índice,
+# así la memoria no crece con el histórico en un worker que lleva días arrancado.
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from sqlite3 import Connection
+from app.database import a_epoch, desde_epoch
+
+# Ninguna reserva dura más de un día (todas duran 2 horas): las que terminan a partir de 'desde'
+# empiezan después de 'desde - DURACION_MAXIMA', y ese rango sobre 'inicio' sí usa idx_reservas_inicio
+DURACION_MAXIMA = 24 * 3600
+
+CONSULTA_RESERVAS = """
+    SELECT id, mesa_id, inicio, fin FROM reservas
+    WHERE estado IN ('pendiente', 'confirmada', 'completada') AND inicio >= ? AND fin >= ?
+"""
+
+
+class IndiceDisponibilidad:
+    """
+    Para cada mesa guarda una lista ordenada de (inicio, fin, reserva_id) con las
+    reservas no canceladas que terminan a partir de 'desde' (la última medianoche).
+    Las consultas de solapamiento son una búsqueda binaria sobre esa lista.
+    Todas las horas son enteros epoch, como las columnas inicio/fin de la BD.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._por_mesa = {}      # mesa_id -> [(inicio, fin, reserva_id), ...] ordenada por inicio
+        self._por_reserva = {}   # reserva_id -> (inicio, fin, mesa_id)
+        self._duracion_max = 0
+        self._seq = None         # último cambio aplicado, None si no está construido
+        self._oyente = None
+        self.desde = None
+        self.reconstrucciones = 0
+        self.cambios_aplicados = 0
+        self.podadas = 0
+
+    # Metodo para cargar el índice completo desde la BD
+    def reconstruir(self, conn: Connection):
+        desde = _medianoche(datetime.now())
+        # Lectura consistente: el seq y las reservas deben ser de la misma foto de la BD
+        abrir = not conn.in_transaction
+        if abrir:
+            conn.execute("BEGIN")
+        try:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM reservas_cambios").fetchone()[0]
+            filas = conn.execute(CONSULTA_RESERVAS, (desde - DURACION_MAXIMA, desde)).fetchall()
+        finally:
+            if abrir:
+                conn.commit()
+
+        with self._lock:
+            self._por_mesa = {}
+            self._por_reserva = {}
+            self._duracion_max = 0
+            for reserva_id, mesa_id, inicio, fin in filas:
+                self._anadir(reserva_id, mesa_id, inicio, fin)
+            self._seq = seq
+            self.desde = desde
+            self.reconstrucciones += 1
+            # Tras reconstruir no se sabe qué ha cambiado: el oyente recibe None
+            if self._oyente is not None:
+                self._oyente(seq, None)
+
+    # Metodo para registrar la función oyente(seq, cambios) a la que se pasan, con el índice bloqueado
+    # y en orden, los cambios de cada sincronización como tuplas (mesa_id, inicio, fin, libre).
+    # Tiene que volver enseguida: se llama desde el hilo que sincroniza
+    def escuchar(self, oyente):
+        with self._lock:
+            self._oyente = oyente
+
+    # Metodo para aplicar los cambios pendientes del registro de cambios
+    def sincronizar(self, conn: Connection):
+        if self._seq is None:
+            self.reconstruir(conn)
+            return
+        self.avanzar()
+        # Dentro de una transacción podríamos ver cambios que luego se deshagan
+        if conn.in_transaction:
+            return
+
+        filas = conn.execute("""
+            SELECT seq, reserva_id, mesa_id, inicio, fin, ocupa
+            FROM reservas_cambios WHERE seq > ? ORDER BY seq
+        """, (self._seq,)).fetchall()
+        if not filas:
+            return
+
+        with self._lock:
+            # Si se han podado cambios que no llegamos a aplicar, hay que reconstruir.
+            # Otro hilo puede haber aplicado ya parte de las filas (o invalidado el índice) mientras leíamos
+            if self._seq is None or filas[0][0] > self._seq + 1:
+                self._seq = None
+        if self._seq is None:
+            self.reconstruir(conn)
+            return
+
+        with self._lock:
+            cambios = []
+            for seq, reserva_id, mesa_id, inicio, fin, ocupa in filas:
+                if seq <= self._seq:
+                    continue
+                antes = self._quitar(reserva_id)
+                despues = None
+                if ocupa and fin >= self.desde:
+                    self._anadir(reserva_id, mesa_id, inicio, fin)
+                    despues = (inicio, fin, mesa_id)
+                # Un cambio de estado entre pendiente, confirmada y completada no cambia la disponibilidad
+                if antes != despues:
+                    if antes is not None:
+                        cambios.append((antes[2], antes[0], antes[1], True))
+                    if despues is not None:
+                        cambios.append((mesa_id, inicio, fin, False))
+                self._seq = seq
+                self.cambios_aplicados += 1
+            if cambios and self._oyente is not None:
+                self._oyente(self._seq, cambios)
+
+    # Metodo para mover 'desde' a la medianoche de 'ahora' y quitar las reservas que terminan antes.
+    # No cambia la disponibilidad de nada que el índice siga cubriendo, así que no se avisa al oyente
+    def avanzar(self, ahora: datetime = None):
+        desde = _medianoche(ahora or datetime.now())
+        if self.desde is None or desde <= self.desde:
+            return
+        with self._lock:
+            if self._seq is None or desde <= self.desde:
+                return
+            for mesa_id, lista in self._por_mesa.items():
+                terminadas = [r for r in lista if r[1] < desde]
+                if not terminadas:
+                    continue
+                for _, _, reserva_id in terminadas:
+                    del self._por_reserva[reserva_id]
+                self._por_mesa[mesa_id] = [r for r in lista if r[1] >= desde]
+                self.podadas += len(terminadas)
+            self.desde = desde
+
+    def invalidar(self):
+        with self._lock:
+            self._seq = None
+
+    def _anadir(self, reserva_id, mesa_id, inicio, fin):
+        insort(self._por_mesa.setdefault(mesa_id, []), (inicio, fin, reserva_id))
+        self._por_reserva[reserva_id] = (inicio, fin, mesa_id)
+        if fin - inicio > self._duracion_max:
+            self._duracion_max = fin - inicio
+
+    # Metodo para quitar una reserva. Devuelve su (inicio, fin, mesa_id) o None si no estaba
+    def _quitar(self, reserva_id):
+        actual = self._por_reserva.pop(reserva_id, None)
+        if actual is None:
+            return None
+        inicio, fin, mesa_id = actual
+        lista = self._por_mesa[mesa_id]
+        del lista[bisect_left(lista, (inicio, fin, reserva_id))]
+        return actual
+
+    def _solapes(self, lista, inicio, fin):
+        # Solo pueden solapar las reservas que empiezan entre (inicio - duración máxima) y fin
+        i = bisect_left(lista, (inicio - self._duracion_max,))
+        j = bisect_left(lista, (fin,))
+        return [r for r in lista[i:j] if r[1] > inicio]
+
+    # Metodo para saber si el índice puede responder para un instante (epoch)
+    def cubre(self, inicio: int):
+        return self._seq is not None and inicio >= self.desde
+
+    def mesa_ocupada(self, mesa_id: int, inicio: int, fin: int, excluir_id: int = None):
+        with self._lock:
+            lista = self._por_mesa.get(mesa_id, [])
+            return any(r[2] != excluir_id for r in self._solapes(lista, inicio, fin))
+
+    def mesas_ocupadas(self, inicio: int, fin: int):
+        with self._lock:
+            return {mesa_id for mesa_id, lista in self._por_mesa.items() if self._solapes(lista, inicio, fin)}
+
+    # Metodo para comparar el índice con la BD y devolver las diferencias
+    def verificar(self, conn: Connection):
+        self.sincronizar(conn)
+        with self._lock:
+            desde = self.desde
+            en_memoria = dict(self._por_reserva)
+        filas = conn.execute(CONSULTA_RESERVAS, (desde - DURACION_MAXIMA, desde)).fetchall()
+        en_bd = {fila[0]: (fila[2], fila[3], fila[1]) for fila in filas}
+
+        faltan = sorted(set(en_bd) - set(en_memoria))
+        sobran = sorted(set(en_memoria) - set(en_bd))
+        distintas = sorted(rid for rid in set(en_bd) & set(en_memoria) if en_bd[rid] != en_memoria[rid])
+        return {
+            "consistente": not (faltan or sobran or distintas),
+            "reservas_en_bd": len(en_bd),
+            "reservas_en_indice": len(en_memoria),
+            "faltan": faltan,
+            "sobran": sobran,
+            "distintas": distintas,
+        }
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "construido": self._seq is not None,
+                "desde": desde_epoch(self.desde) if self.desde is not None else None,
+                "ultimo_cambio": self._seq,
+                "mesas": len(self._por_mesa),
+                "reservas": len(self._por_reserva),
+                "reconstrucciones": self.reconstrucciones,
+                "cambios_aplicados": self.cambios_aplicados,
+                "podadas": self.podadas,
+            }
+
+
+def _medianoche(fecha: datetime):
+    return a_epoch(fecha.replace(hour=0, minute=0, second=0, microsecond=0))
+
+
+# Índice compartido por todo el proceso
+indice = IndiceDisponibilidad()
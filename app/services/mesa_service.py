@@ -1,36 +1,37 @@
 import sqlite3
 from sqlite3 import Connection
 from datetime import datetime, timedelta
+from app.database import a_epoch, transaccion
 from app.models import MesaCreate, MesaUpdate
+from app.services.cache import cache
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import DURACION_MAXIMA, indice
 
-# Metodo para obtener la lista de todas las mesas
+# Metodo para obtener la lista de todas las mesas (desde el catálogo en memoria)
 def obtener_todas(conn: Connection):
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM mesas")
-    filas = cursor.fetchall()
-    return [dict(fila) for fila in filas]
+    return [mesa.a_dict() for mesa in catalogo.foto(conn).todas()]
 
 # Metodo para obtener una lista buscando por ID
 def obtener_por_id(conn: Connection, mesa_id: int):
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM mesas WHERE id = ?", (mesa_id,))
-    fila = cursor.fetchone()
-    return dict(fila) if fila else None
+    mesa = catalogo.foto(conn).obtener(mesa_id)
+    return mesa.a_dict() if mesa else None
 
 # Metodo para crear una nueva mesa
 def crear_mesa(conn: Connection, mesa_in: MesaCreate):
     cursor = conn.cursor()
     
-    # Verificar si el número ya existe
-    cursor.execute("SELECT id FROM mesas WHERE numero = ?", (mesa_in.numero,))
-    if cursor.fetchone():
-        raise ValueError(f"Ya existe una mesa con el número {mesa_in.numero}")
-
-    cursor.execute("""
-        INSERT INTO mesas (numero, capacidad, ubicacion, activa)
-        VALUES (?, ?, ?, ?)
-    """, (mesa_in.numero, mesa_in.capacidad, mesa_in.ubicacion, mesa_in.activa))
-    conn.commit()
+    with transaccion(conn):
+        # Verificar si el número ya existe
+        cursor.execute("SELECT id FROM mesas WHERE numero = ?", (mesa_in.numero,))
+        if cursor.fetchone():
+            raise ValueError(f"Ya existe una mesa con el número {mesa_in.numero}")
+
+        cursor.execute("""
+            INSERT INTO mesas (numero, capacidad, ubicacion, activa)
+            VALUES (?, ?, ?, ?)
+        """, (mesa_in.numero, mesa_in.capacidad, mesa_in.ubicacion, mesa_in.activa))
+    catalogo.cargar(conn)
+    cache.invalidar("mesas")
     
     nuevo_id = cursor.lastrowid
     
@@ -63,8 +64,10 @@ def actualizar_mesa(conn: Connection, mesa_id: int, mesa_in: MesaUpdate):
     values.append(mesa_id)
     query = f"UPDATE mesas SET {', '.join(set_clauses)} WHERE id = ?"
     
-    cursor.execute(query, values)
-    conn.commit()
+    with transaccion(conn):
+        cursor.execute(query, values)
+    catalogo.cargar(conn)
+    cache.invalidar("mesas")
     
     return obtener_por_id(conn, mesa_id)
 
@@ -72,43 +75,54 @@ def actualizar_mesa(conn: Connection, mesa_id: int, mesa_in: MesaUpdate):
 def eliminar_mesa(conn: Connection, mesa_id: int):
     cursor = conn.cursor()
     
-    cursor.execute("SELECT id FROM mesas WHERE id = ?", (mesa_id,))
-    if not cursor.fetchone():
-        return False
+    with transaccion(conn):
+        cursor.execute("SELECT id FROM mesas WHERE id = ?", (mesa_id,))
+        if not cursor.fetchone():
+            return False
 
-    # Verificar si tiene reservas futuras
-    ahora = datetime.now()
-    cursor.execute("""
-        SELECT id FROM reservas 
-        WHERE mesa_id = ? AND fecha_hora_inicio > ?
-    """, (mesa_id, ahora))
+        # Verificar si tiene reservas futuras
+        ahora = a_epoch(datetime.now())
+        cursor.execute("""
+            SELECT id FROM reservas 
+            WHERE mesa_id = ? AND inicio > ?
+        """, (mesa_id, ahora))
 
-    if cursor.fetchone():
-        raise ValueError("No se puede eliminar la mesa porque tiene reservas futuras")
+        if cursor.fetchone():
+            raise ValueError("No se puede eliminar la mesa porque tiene reservas futuras")
 
-    cursor.execute("DELETE FROM mesas WHERE id = ?", (mesa_id,))
-    conn.commit()
+        cursor.execute("DELETE FROM mesas WHERE id = ?", (mesa_id,))
+    catalogo.cargar(conn)
+    cache.invalidar("mesas")
     return True
 
+# Metodo para obtener las mesas libres (registros del catálogo) de menor a mayor capacidad
+def mesas_libres(conn: Connection, fecha_hora: datetime, comensales: int):
+    inicio = a_epoch(fecha_hora)
+    fin = a_epoch(fecha_hora + timedelta(hours=2))
+
+    # Las mesas activas con capacidad suficiente salen del catálogo en memoria
+    candidatas = catalogo.foto(conn).activas(comensales)
+
+    # Si el índice en memoria cubre la fecha, las mesas ocupadas salen de él sin tocar reservas
+    indice.sincronizar(conn)
+    if indice.cubre(inicio):
+        ocupadas = indice.mesas_ocupadas(inicio, fin)
+    else:
+        # Fechas anteriores al índice: las mesas ocupadas en ese horario con SQL.
+        # La cota inferior de 'inicio' evita recorrer todo el histórico anterior
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT mesa_id FROM reservas
+            WHERE estado IN ('pendiente', 'confirmada', 'completada')
+            AND inicio >= ?
+            AND inicio < ?
+            AND fin > ?
+        """, (inicio - DURACION_MAXIMA, fin, inicio))
+        ocupadas = {fila[0] for fila in cursor.fetchall()}
+
+    return [mesa for mesa in candidatas if mesa.id not in ocupadas]
+
 # Metodo para buscar las mesas disponibles
 def buscar_disponibles(conn: Connection, fecha_hora: datetime, comensales: int):
-    cursor = conn.cursor()
-    fecha_fin_busqueda = fecha_hora + timedelta(hours=2)
-
-    # Lógica con SQL puro: Tengan capacidad suficiente, estén activas y no estén en la lista de mesas ocupadas en ese horario
-    
-    query = """
-    SELECT * FROM mesas 
-    WHERE capacidad >= ? 
-    AND activa = 1
-    AND id NOT IN (
-        SELECT mesa_id FROM reservas
-        WHERE estado != 'cancelada'
-        AND fecha_hora_inicio < ?
-        AND fecha_hora_fin > ?
-    )
-    """
-    
-    cursor.execute(query, (comensales, fecha_fin_busqueda, fecha_hora))
-    filas = cursor.fetchall()
-    return [dict(fila) for fila in filas]
\ No newline at end of file
+    libres = sorted(mesas_libres(conn, fecha_hora, comensales), key=lambda mesa: mesa.id)
+    return [mesa.a_dict() for mesa in libres]
\ No newline at end of file
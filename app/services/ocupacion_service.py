@@ -0,0 +1,225 @@
+# Archivo: app/services/ocupacion_service.py
+# Series de ocupación real de un rango de días calculadas con NumPy: qué parte del tiempo están ocupadas
+# las mesas y qué parte de los asientos se usan, por franja, por turno y por ubicación.
+# A diferencia de /estadisticas/ocupacion/diaria (reservas / mesas), aquí cuenta la duración de cada reserva,
+# los comensales frente a la capacidad de la mesa y que una mesa se ocupe varias veces en un mismo turno.
+from sqlite3 import Connection
+from datetime import date, datetime, timedelta
+import numpy as np
+from app.database import a_epoch, RESERVAS_HISTORICO
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import DURACION_MAXIMA
+
+# Límite del rango para no cargar el histórico entero por error
+MAX_DIAS_SERIE = 366
+
+# Ventana de cada turno en horas desde medianoche: las reservas empiezan de 12 a 16 y de 20 a 00
+# y duran 2 horas, así que las mesas pueden estar ocupadas de 12 a 18 y de 20 a 02
+TURNOS = (("comida", 12, 18), ("cena", 20, 26))
+
+
+# Metodo para calcular el tiempo ocupado de cada franja [desde, hasta) para cada juego de pesos
+# (segundos x peso de las reservas en curso). Es un barrido por eventos sin bucles: el acumulado hasta
+# un instante t es lo que suman las reservas empezadas antes de t, peso x (t - inicio), menos lo que
+# restan las ya terminadas, peso x (t - fin); lo ocupado en la franja es acumulado(hasta) - acumulado(desde)
+def _ocupado(inicios: np.ndarray, fines: np.ndarray, pesos: list, desde: np.ndarray, hasta: np.ndarray):
+    bordes = np.concatenate((desde, hasta))
+    totales = [np.zeros(len(bordes), dtype=np.int64) for _ in pesos]
+    for eventos, signo in ((inicios, 1), (fines, -1)):
+        orden = np.argsort(eventos, kind="stable")
+        eventos = eventos[orden]
+        anteriores = np.searchsorted(eventos, bordes, side="right")
+        for total, peso in zip(totales, pesos):
+            peso = peso[orden]
+            peso_acumulado = np.concatenate(([0], np.cumsum(peso)))
+            instantes_acumulados = np.concatenate(([0], np.cumsum(peso * eventos)))
+            total += signo * (bordes * peso_acumulado[anteriores] - instantes_acumulados[anteriores])
+    return [total[len(desde):] - total[:len(desde)] for total in totales]
+
+
+# Metodo para repartir el rango en franjas dentro de las ventanas de los turnos.
+# Devuelve el inicio y el fin de cada franja (epoch) y el día y el turno al que pertenece
+def _franjas(desde: date, dias: int, granularidad: int):
+    paso = granularidad * 60
+    inicios, fines, turnos = [], [], []
+    for t, (_, apertura, cierre) in enumerate(TURNOS):
+        desplazamientos = np.arange(apertura * 3600, cierre * 3600, paso)
+        inicios.append(desplazamientos)
+        fines.append(np.minimum(desplazamientos + paso, cierre * 3600))
+        turnos.append(np.full(len(desplazamientos), t))
+    inicios, fines, turnos = np.concatenate(inicios), np.concatenate(fines), np.concatenate(turnos)
+
+    base = a_epoch(datetime.combine(desde, datetime.min.time())) + np.arange(dias)[:, None] * 86400
+    dia = np.repeat(np.arange(dias), len(inicios))
+    return (base + inicios).ravel(), (base + fines).ravel(), dia, np.tile(turnos, dias)
+
+
+# Metodo para cargar las reservas activas que tocan el rango y calcular los tiempos ocupados de cada franja,
+# en total y por ubicación
+def _calcular(conn: Connection, desde: date, hasta: date, granularidad: int):
+    if hasta <= desde:
+        raise ValueError("La fecha 'hasta' debe ser posterior a 'desde'")
+    dias = (hasta - desde).days
+    if dias > MAX_DIAS_SERIE:
+        raise ValueError(f"El rango no puede superar {MAX_DIAS_SERIE} días")
+
+    inicio_franja, fin_franja, dia, turno = _franjas(desde, dias, granularidad)
+    mesas = sorted(catalogo.foto(conn).activas(), key=lambda mesa: mesa.id)
+    ids_mesa = np.array([m.id for m in mesas], dtype=np.int64)
+    capacidades = np.array([m.capacidad for m in mesas], dtype=np.int64)
+    ubicaciones = sorted({m.ubicacion for m in mesas})
+    ubicacion_mesa = np.array([ubicaciones.index(m.ubicacion) for m in mesas], dtype=np.int64)
+
+    # Una sola consulta para todo el rango, también sobre el archivo histórico;
+    # la cota inferior de 'inicio' deja usar los índices por 'inicio' de las dos tablas
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    rango_inicio, rango_fin = int(inicio_franja[0]), int(fin_franja[-1])
+    cursor.execute(f"""
+        SELECT mesa_id, inicio, fin, num_comensales FROM {RESERVAS_HISTORICO}
+        WHERE estado IN ('pendiente', 'confirmada', 'completada')
+        AND inicio >= ? AND inicio < ? AND fin > ?
+    """, (rango_inicio - DURACION_MAXIMA, rango_fin, rango_inicio))
+    filas = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 4)
+
+    # Solo las reservas de mesas activas, igual que la rejilla de disponibilidad
+    mesa_res, inicio_res, fin_res, comensales = filas.T
+    fila = np.zeros(len(filas), dtype=np.int64)
+    dentro = np.zeros(len(filas), dtype=bool)
+    if len(ids_mesa):
+        fila = np.minimum(np.searchsorted(ids_mesa, mesa_res), len(ids_mesa) - 1)
+        dentro = ids_mesa[fila] == mesa_res
+    fila, inicio_res, fin_res = fila[dentro], inicio_res[dentro], fin_res[dentro]
+    # Los comensales que superen la capacidad (si se ha reducido la mesa) cuentan como mesa llena
+    comensales = np.minimum(comensales[dentro], capacidades[fila])
+    ubicacion_res = ubicacion_mesa[fila]
+
+    # Tiempo de mesa ocupada (peso 1) y de asiento ocupado (peso comensales) de cada franja
+    def tiempos(mascara):
+        pesos = [np.ones(int(mascara.sum()), dtype=np.int64), comensales[mascara]]
+        return _ocupado(inicio_res[mascara], fin_res[mascara], pesos, inicio_franja, fin_franja)
+
+    # Reservas que empiezan en cada (día, turno): la rotación de las mesas. Mismo corte que SQL_TURNO
+    base = a_epoch(datetime.combine(desde, datetime.min.time()))
+    dia_res = (inicio_res - base) // 86400
+    turno_res = (inicio_res % 86400 >= 18 * 3600).astype(np.int64)
+    en_rango = (dia_res >= 0) & (dia_res < dias)
+
+    grupos = {None: (np.ones(len(fila), dtype=bool), len(mesas), int(capacidades.sum()))}
+    for u, nombre in enumerate(ubicaciones):
+        en_ubicacion = ubicacion_mesa == u
+        grupos[nombre] = (ubicacion_res == u, int(en_ubicacion.sum()), int(capacidades[en_ubicacion].sum()))
+
+    resultado = {}
+    for nombre, (mascara, num_mesas, capacidad) in grupos.items():
+        tiempo_mesas, tiempo_asientos = tiempos(mascara)
+        contar = mascara & en_rango
+        reservas = np.bincount(dia_res[contar] * len(TURNOS) + turno_res[contar], minlength=dias * len(TURNOS))
+        resultado[nombre] = {
+            "mesas": num_mesas,
+            "capacidad": capacidad,
+            "tiempo_mesas": tiempo_mesas,
+            "tiempo_asientos": tiempo_asientos,
+            "reservas": reservas,
+        }
+    return {
+        "inicio_franja": inicio_franja,
+        "duracion": fin_franja - inicio_franja,
+        "dia": dia,
+        "turno": turno,
+        "grupos": resultado,
+    }
+
+
+def _porcentaje(ocupado: np.ndarray, disponible: np.ndarray):
+    disponible = np.asarray(disponible)
+    con_datos = disponible > 0
+    porcentaje = np.zeros(len(ocupado))
+    np.divide(ocupado * 100, disponible, out=porcentaje, where=con_datos)
+    return np.round(porcentaje, 2).tolist()
+
+
+# Metodo para obtener la serie por franjas de 'granularidad' minutos dentro de los turnos de [desde, hasta)
+def serie_franjas(conn: Connection, desde: date, hasta: date, granularidad: int = 30):
+    datos = _calcular(conn, desde, hasta, granularidad)
+    duracion = datos["duracion"]
+
+    def series(grupo):
+        return {
+            "ocupacion_mesas": _porcentaje(grupo["tiempo_mesas"], grupo["mesas"] * duracion),
+            "utilizacion_asientos": _porcentaje(grupo["tiempo_asientos"], grupo["capacidad"] * duracion),
+        }
+
+    total = datos["grupos"].pop(None)
+    franjas = np.datetime_as_string(datos["inicio_franja"].astype("datetime64[s]"), unit="s")
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "granularidad_minutos": granularidad,
+        "mesas": total["mesas"],
+        "capacidad": total["capacidad"],
+        "franjas": franjas.tolist(),
+        "turno": [TURNOS[t][0] for t in datos["turno"].tolist()],
+        **series(total),
+        "por_ubicacion": {
+            nombre: {"mesas": grupo["mesas"], "capacidad": grupo["capacidad"], **series(grupo)}
+            for nombre, grupo in datos["grupos"].items()
+        },
+    }
+
+
+# Metodo para obtener la serie por día y turno de [desde, hasta), con la rotación de las mesas
+# (reservas por mesa en el turno) y el total de cada turno en todo el rango
+def serie_turnos(conn: Connection, desde: date, hasta: date):
+    # Una franja por turno que cubre toda su ventana: la franja i es el día i // 2, turno i % 2
+    granularidad = max(cierre - apertura for _, apertura, cierre in TURNOS) * 60
+    datos = _calcular(conn, desde, hasta, granularidad)
+    duracion = datos["duracion"]
+
+    def resumen(grupo, posiciones=slice(None)):
+        reservas = grupo["reservas"][posiciones]
+        disponible = duracion[posiciones]
+        return {
+            "reservas": reservas,
+            "rotacion": np.round(reservas / grupo["mesas"], 2) if grupo["mesas"] else np.zeros(len(reservas)),
+            "ocupacion_mesas": _porcentaje(grupo["tiempo_mesas"][posiciones], grupo["mesas"] * disponible),
+            "utilizacion_asientos": _porcentaje(grupo["tiempo_asientos"][posiciones], grupo["capacidad"] * disponible),
+        }
+
+    def fila(series, i):
+        return {
+            "reservas": int(series["reservas"][i]),
+            "rotacion": float(series["rotacion"][i]),
+            "ocupacion_mesas": series["ocupacion_mesas"][i],
+            "utilizacion_asientos": series["utilizacion_asientos"][i],
+        }
+
+    # Totales del rango: se suman los días de cada turno antes de calcular los porcentajes
+    def totales(grupo):
+        sumado = {}
+        for clave in ("reservas", "tiempo_mesas", "tiempo_asientos"):
+            sumado[clave] = grupo[clave].reshape(-1, len(TURNOS)).sum(axis=0)
+        dias = len(duracion) // len(TURNOS)
+        series = resumen({**grupo, **sumado, "mesas": grupo["mesas"] * dias, "capacidad": grupo["capacidad"] * dias},
+                         slice(0, len(TURNOS)))
+        return {nombre: fila(series, t) for t, (nombre, _, _) in enumerate(TURNOS)}
+
+    total = datos["grupos"].pop(None)
+    series_total = resumen(total)
+    series_ubicacion = {nombre: resumen(grupo) for nombre, grupo in datos["grupos"].items()}
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "mesas": total["mesas"],
+        "capacidad": total["capacidad"],
+        "totales": totales(total),
+        "turnos": [
+            {
+                "fecha": desde + timedelta(days=dia),
+                "turno": TURNOS[t][0],
+                **fila(series_total, i),
+                "por_ubicacion": {nombre: fila(series, i) for nombre, series in series_ubicacion.items()},
+            }
+            for i, (dia, t) in enumerate(zip(datos["dia"].tolist(), datos["turno"].tolist()))
+        ],
+    }
@@ -0,0 +1,28 @@
+# Archivo: app/services/paginacion.py
+# Cursores opacos para la paginación por clave (keyset).
+# El cursor guarda los valores de la última fila devuelta; la página siguiente
+# empieza justo después de ellos usando el índice, sin OFFSET.
+import base64
+import json
+
+
+def codificar_cursor(*valores):
+    texto = json.dumps(list(valores), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+# Metodo para leer un cursor con un valor de cada tipo de 'tipos' (por ejemplo int, int).
+# Un cursor manipulado o con otros tipos es un ValueError, igual que uno mal codificado
+def decodificar_cursor(cursor: str, *tipos: type):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginación inválido")
+    if not isinstance(valores, list) or len(valores) != len(tipos):
+        raise ValueError("Cursor de paginación inválido")
+    # bool es subclase de int en Python, pero true/false no es un id ni un epoch
+    for valor, tipo in zip(valores, tipos):
+        if isinstance(valor, bool) or not isinstance(valor, tipo):
+            raise ValueError("Cursor de paginación inválido")
+    return valores
@@ -1,7 +1,14 @@
+import json
 import sqlite3
+from bisect import bisect_left, insort
 from sqlite3 import Connection
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from app.database import transaccion, al_confirmar, a_epoch, RESERVAS_HISTORICO
 from app.models import ReservaCreate, ReservaUpdate
+from app.services.cache import cache
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import DURACION_MAXIMA, indice
+from app.metricas import RESERVAS_CREADAS, RESERVAS_SOLAPADAS, RESERVAS_CANCELADAS
 # Importamos nuestras excepciones personalizadas
 from app.exceptions import (
     ClienteNoEncontradoError,
@@ -9,99 +16,210 @@ from app.exceptions import (
     ReservaSolapadaError,
     CapacidadExcedidaError,
     FueraDeHorarioError,
-    CancelacionNoPermitidaError
+    CancelacionNoPermitidaError,
+    ReservaArchivadaError
 )
 
-# Metodo para obtener todas las reservas
-def obtener_todas(conn: Connection, fecha: str = None, cliente_id: int = None):
-    cursor = conn.cursor()
-    query = "SELECT * FROM reservas"
+# Metodo para construir el WHERE de los listados de reservas.
+# Todas las condiciones de fecha son rangos sobre la columna entera 'inicio' para que usen los índices
+def _filtros(fecha: date = None, cliente_id: int = None, desde: datetime = None, hasta: datetime = None):
     params = []
     conditions = []
     
     if fecha:
-        # En SQLite, las fechas se guardan como string, uso la función date() de SQLite para comparar solo la parte de la fecha
-        conditions.append("date(fecha_hora_inicio) = date(?)")
-        params.append(fecha)
+        # Un día completo es el rango [00:00, 00:00 del día siguiente)
+        if isinstance(fecha, str):
+            fecha = date.fromisoformat(fecha)
+        dia = datetime.combine(fecha, time())
+        conditions.append("inicio >= ? AND inicio < ?")
+        params.extend((a_epoch(dia), a_epoch(dia + timedelta(days=1))))
         
     if cliente_id:
         conditions.append("cliente_id = ?")
         params.append(cliente_id)
-        
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
+
+    if desde:
+        conditions.append("inicio >= ?")
+        params.append(a_epoch(desde))
+
+    if hasta:
+        conditions.append("inicio < ?")
+        params.append(a_epoch(hasta))
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+# Metodo para obtener todas las reservas, ordenadas por (inicio, id), también las del archivo histórico.
+# 'despues_de' es la clave (inicio, id) de la última reserva de la página anterior.
+# Con 'como_filas' devuelve las sqlite3.Row sin convertir (para app/serializacion.py)
+def obtener_todas(conn: Connection, fecha: date = None, cliente_id: int = None,
+                  limit: int = None, despues_de: tuple = None, como_filas: bool = False):
+    cursor = conn.cursor()
+    where, params = _filtros(fecha, cliente_id)
+    query = f"SELECT * FROM {RESERVAS_HISTORICO}" + where
+
+    if despues_de is not None:
+        query += (" AND " if where else " WHERE ") + "(inicio, id) > (?, ?)"
+        params.extend(despues_de)
+
+    query += " ORDER BY inicio, id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
         
     cursor.execute(query, params)
     filas = cursor.fetchall()
+    if como_filas:
+        return filas
     return [dict(fila) for fila in filas]
 
-# Metodo para obtener una reserva por su ID
+# Columnas que se exportan, en este orden
+COLUMNAS_EXPORTACION = (
+    "id", "cliente_id", "mesa_id", "fecha_hora_inicio", "fecha_hora_fin",
+    "num_comensales", "estado", "notas", "fecha_creacion"
+)
+
+# Metodo para leer un bloque de reservas a exportar (también las archivadas), ordenadas por (inicio, id).
+# 'despues_de' es la clave (inicio, id) de la última fila del bloque anterior: cada bloque es una consulta
+# corta, así que la conexión vuelve al pool entre bloques. Cada fila lleva 'inicio' al final para la clave
+def bloque_exportacion(conn: Connection, fecha: date = None, cliente_id: int = None, desde: datetime = None,
+                       hasta: datetime = None, despues_de: tuple = None, limite: int = 1000):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    where, params = _filtros(fecha, cliente_id, desde, hasta)
+    if despues_de is not None:
+        where += (" AND " if where else " WHERE ") + "(inicio, id) > (?, ?)"
+        params.extend(despues_de)
+    columnas = ", ".join(COLUMNAS_EXPORTACION)
+    cursor.execute(f"SELECT {columnas}, inicio FROM {RESERVAS_HISTORICO}" + where + " ORDER BY inicio, id LIMIT ?",
+                   (*params, limite))
+    return cursor.fetchall()
+
+# Metodo para obtener una reserva por su ID, esté en 'reservas' o en el archivo histórico
 def obtener_por_id(conn: Connection, reserva_id: int):
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM reservas WHERE id = ?", (reserva_id,))
+    cursor.execute(f"SELECT * FROM {RESERVAS_HISTORICO} WHERE id = ?", (reserva_id,))
     fila = cursor.fetchone()
     return dict(fila) if fila else None
 
-# Metodo para crear una reserva por su ID
-def crear_reserva(conn: Connection, reserva_in: ReservaCreate):
+# Metodo para obtener una reserva que se va a modificar. Las del archivo histórico son de solo lectura
+def _obtener_modificable(conn: Connection, reserva_id: int):
     cursor = conn.cursor()
+    cursor.execute("SELECT * FROM reservas WHERE id = ?", (reserva_id,))
+    fila = cursor.fetchone()
+    if fila is None:
+        cursor.execute("SELECT 1 FROM archivo.reservas WHERE id = ?", (reserva_id,))
+        if cursor.fetchone():
+            raise ReservaArchivadaError(f"La reserva {reserva_id} está archivada y no se puede modificar")
+        return None
+    return dict(fila)
 
-    # Horario de operación
-    hora = reserva_in.fecha_hora_inicio.hour
+# Mensaje que lanza el trigger de no solapamiento de la base de datos
+ERROR_SOLAPE_BD = "reserva_solapada"
+
+# Metodo para crear el error de solapamiento. Las peticiones rechazadas por él se cuentan en el
+# manejador del 409 (app/main.py), así los reintentos internos de la asignación automática no cuentan
+def _error_solape():
+    return ReservaSolapadaError("La mesa ya está ocupada en ese horario")
+
+def _es_error_solape(error: sqlite3.IntegrityError):
+    return ERROR_SOLAPE_BD in str(error)
+
+# Una sola consulta con todo lo necesario para validar la reserva: si existe el cliente
+# y la versión de la tabla mesas, para comprobar que el catálogo en memoria está al día
+CONSULTA_VALIDACION = """
+    SELECT
+        EXISTS (SELECT 1 FROM clientes WHERE id = :cliente_id) AS cliente_existe,
+        (SELECT version FROM versiones_tablas WHERE tabla = 'mesas') AS version_mesas
+"""
+
+# Comprobación de solapamiento en SQL, solo para fechas que no cubre el índice en memoria (el pasado).
+# Parámetros: mesa_id, inicio - DURACION_MAXIMA, fin, inicio; la cota inferior evita recorrer todo el histórico de la mesa
+CONSULTA_SOLAPE = """
+    SELECT 1 FROM reservas
+    WHERE mesa_id = ?
+    AND estado IN ('pendiente', 'confirmada', 'completada')
+    AND inicio >= ?
+    AND inicio < ?
+    AND fin > ?
+"""
+
+# Metodo para comprobar el horario de operación
+def validar_horario(fecha_hora_inicio: datetime):
+    hora = fecha_hora_inicio.hour
     if not ((12 <= hora < 16) or (20 <= hora <= 23)):
         raise FueraDeHorarioError("El restaurante abre de 12:00-16:00 y 20:00-00:00")
 
-    # Cliente existente
-    cursor.execute("SELECT id FROM clientes WHERE id = ?", (reserva_in.cliente_id,))
-    if not cursor.fetchone():
-        raise ClienteNoEncontradoError(f"No existe el cliente con ID {reserva_in.cliente_id}")
+# Metodo para crear una reserva por su ID
+def crear_reserva(conn: Connection, reserva_in: ReservaCreate):
+    # Horario de operación
+    validar_horario(reserva_in.fecha_hora_inicio)
+
+    # Ponemos al día el índice en memoria antes de abrir la transacción
+    indice.sincronizar(conn)
+
+    inicio = a_epoch(reserva_in.fecha_hora_inicio)
+    fin = a_epoch(reserva_in.fecha_hora_fin)
+
+    # Validación e inserción dentro de la misma transacción inmediata:
+    # nadie puede escribir entre la comprobación de solapamiento y el INSERT
+    with transaccion(conn):
+        cursor = conn.cursor()
+        cursor.execute(CONSULTA_VALIDACION, {"cliente_id": reserva_in.cliente_id})
+        validacion = cursor.fetchone()
+
+        # Cliente existente
+        if not validacion["cliente_existe"]:
+            raise ClienteNoEncontradoError(f"No existe el cliente con ID {reserva_in.cliente_id}")
+
+        # Validar Mesa contra el catálogo en memoria (se recarga solo si la tabla ha cambiado)
+        mesa = catalogo.foto(conn, validacion["version_mesas"]).obtener(reserva_in.mesa_id)
+        if mesa is None:
+            raise MesaNoDisponibleError(f"No existe la mesa con ID {reserva_in.mesa_id}")
+
+        # Mesa activa
+        if not mesa.activa:
+            raise MesaNoDisponibleError("La mesa no está activa/habilitada")
+
+        # Capacidad
+        if reserva_in.num_comensales > mesa.capacidad:
+            raise CapacidadExcedidaError(f"La mesa solo acepta {mesa.capacidad} personas")
+
+        # Solapamiento: se responde desde el índice en memoria. Si otro proceso ha escrito justo
+        # después de sincronizar, el trigger de la BD lo detecta igualmente al insertar
+        if indice.cubre(inicio):
+            solapada = indice.mesa_ocupada(reserva_in.mesa_id, inicio, fin)
+        else:
+            cursor.execute(CONSULTA_SOLAPE, (reserva_in.mesa_id, inicio - DURACION_MAXIMA, fin, inicio))
+            solapada = cursor.fetchone() is not None
+        if solapada:
+            raise _error_solape()
+
+        # Crear Reserva. El trigger de la BD vuelve a comprobar el solapamiento por si escribe otro proceso
+        try:
+            cursor.execute("""
+                INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado, notas)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                reserva_in.cliente_id,
+                reserva_in.mesa_id,
+                reserva_in.fecha_hora_inicio,
+                reserva_in.fecha_hora_fin,
+                reserva_in.num_comensales,
+                reserva_in.estado,
+                reserva_in.notas
+            ))
+        except sqlite3.IntegrityError as e:
+            if _es_error_solape(e):
+                raise _error_solape()
+            raise
+
+        nuevo_id = cursor.lastrowid
+
+    al_confirmar(conn, RESERVAS_CREADAS.inc)
+    indice.sincronizar(conn)
+    cache.invalidar("reservas")
 
-    # Validar Mesa
-    cursor.execute("SELECT * FROM mesas WHERE id = ?", (reserva_in.mesa_id,))
-    mesa = cursor.fetchone()
-    if not mesa:
-        raise MesaNoDisponibleError(f"No existe la mesa con ID {reserva_in.mesa_id}")
-    
-    # Convertimos mesa a dict para acceder fácil
-    mesa = dict(mesa)
-
-    # Mesa activa
-    if not mesa["activa"]:
-        raise MesaNoDisponibleError("La mesa no está activa/habilitada")
-
-    # Capacidad
-    if reserva_in.num_comensales > mesa["capacidad"]:
-        raise CapacidadExcedidaError(f"La mesa solo acepta {mesa['capacidad']} personas")
-
-    # Solapamiento
-    cursor.execute("""
-        SELECT id FROM reservas
-        WHERE mesa_id = ?
-        AND estado != 'cancelada'
-        AND fecha_hora_inicio < ?
-        AND fecha_hora_fin > ?
-    """, (reserva_in.mesa_id, reserva_in.fecha_hora_fin, reserva_in.fecha_hora_inicio))
-
-    if cursor.fetchone():
-        raise ReservaSolapadaError("La mesa ya está ocupada en ese horario")
-
-    # Crear Reserva
-    cursor.execute("""
-        INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado, notas)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        reserva_in.cliente_id, 
-        reserva_in.mesa_id, 
-        reserva_in.fecha_hora_inicio, 
-        reserva_in.fecha_hora_fin, 
-        reserva_in.num_comensales, 
-        reserva_in.estado, 
-        reserva_in.notas
-    ))
-    conn.commit()
-    
-    nuevo_id = cursor.lastrowid
-    
     # Devolver dict
     return {
         "id": nuevo_id,
@@ -109,9 +227,114 @@ def crear_reserva(conn: Connection, reserva_in: ReservaCreate):
         "fecha_creacion": datetime.now()
     }
 
+# Metodo para crear muchas reservas de una vez con las mismas reglas que crear_reserva.
+# Devuelve una lista con el resultado de cada reserva en el mismo orden de entrada
+def crear_reservas_bulk(conn: Connection, reservas_in: list):
+    resultados = [None] * len(reservas_in)
+
+    def rechazar(i, error):
+        if isinstance(error, ReservaSolapadaError):
+            al_confirmar(conn, RESERVAS_SOLAPADAS.inc)
+        resultados[i] = {"indice": i, "error": type(error).__name__, "mensaje": str(error)}
+
+    with transaccion(conn):
+        cursor = conn.cursor()
+
+        # Clientes implicados en una sola consulta; las mesas salen del catálogo en memoria
+        ids_clientes = json.dumps(sorted({r.cliente_id for r in reservas_in}))
+        ids_mesas = json.dumps(sorted({r.mesa_id for r in reservas_in}))
+        cursor.execute("SELECT id FROM clientes WHERE id IN (SELECT value FROM json_each(?))", (ids_clientes,))
+        clientes = {fila[0] for fila in cursor.fetchall()}
+        mesas = catalogo.foto(conn)
+
+        # Reservas existentes de esas mesas en todo el rango del lote; la cota inferior de 'inicio'
+        # evita leer todas las reservas pasadas de esas mesas
+        primer_inicio = a_epoch(min(r.fecha_hora_inicio for r in reservas_in))
+        cursor.execute("""
+            SELECT mesa_id, inicio, fin FROM reservas
+            WHERE mesa_id IN (SELECT value FROM json_each(?))
+            AND estado IN ('pendiente', 'confirmada', 'completada')
+            AND inicio >= ?
+            AND inicio < ?
+            AND fin > ?
+        """, (
+            ids_mesas,
+            primer_inicio - DURACION_MAXIMA,
+            a_epoch(max(r.fecha_hora_fin for r in reservas_in)),
+            primer_inicio
+        ))
+        # mesa_id -> [(inicio, fin, es_del_lote)] ordenada por inicio, en epoch
+        ocupacion = {}
+        duracion_max = 2 * 3600
+        for mesa_id, inicio, fin in cursor.fetchall():
+            insort(ocupacion.setdefault(mesa_id, []), (inicio, fin, False))
+            duracion_max = max(duracion_max, fin - inicio)
+
+        # Validación en una sola pasada, en orden de llegada: la primera reserva del lote gana
+        filas = []
+        aceptadas = []
+        for i, r in enumerate(reservas_in):
+            mesa = mesas.obtener(r.mesa_id)
+            try:
+                validar_horario(r.fecha_hora_inicio)
+                if r.cliente_id not in clientes:
+                    raise ClienteNoEncontradoError(f"No existe el cliente con ID {r.cliente_id}")
+                if mesa is None:
+                    raise MesaNoDisponibleError(f"No existe la mesa con ID {r.mesa_id}")
+                if not mesa.activa:
+                    raise MesaNoDisponibleError("La mesa no está activa/habilitada")
+                if r.num_comensales > mesa.capacidad:
+                    raise CapacidadExcedidaError(f"La mesa solo acepta {mesa.capacidad} personas")
+
+                inicio, fin = a_epoch(r.fecha_hora_inicio), a_epoch(r.fecha_hora_fin)
+                lista = ocupacion.setdefault(r.mesa_id, [])
+                desde = bisect_left(lista, (inicio - duracion_max,))
+                hasta = bisect_left(lista, (fin,))
+                choques = [o for o in lista[desde:hasta] if o[1] > inicio]
+                if choques:
+                    if all(o[2] for o in choques):
+                        raise ReservaSolapadaError("La mesa ya está ocupada en ese horario por otra reserva del lote")
+                    raise _error_solape()
+            except (ClienteNoEncontradoError, MesaNoDisponibleError, CapacidadExcedidaError,
+                    FueraDeHorarioError, ReservaSolapadaError) as e:
+                rechazar(i, e)
+                continue
+
+            if r.estado != "cancelada":
+                insort(lista, (inicio, fin, True))
+            aceptadas.append(i)
+            filas.append((
+                r.cliente_id, r.mesa_id, r.fecha_hora_inicio, r.fecha_hora_fin,
+                r.num_comensales, r.estado, r.notas
+            ))
+
+        if filas:
+            # Cada id sale del propio INSERT: la sentencia preparada se reutiliza en todas las filas
+            ahora = datetime.now()
+            try:
+                for i, fila in zip(aceptadas, filas):
+                    reserva_id = cursor.execute("""
+                        INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado, notas)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        RETURNING id
+                    """, fila).fetchone()[0]
+                    resultados[i] = {
+                        "indice": i,
+                        "reserva": {"id": reserva_id, **reservas_in[i].model_dump(), "fecha_creacion": ahora},
+                    }
+            except sqlite3.IntegrityError as e:
+                if _es_error_solape(e):
+                    raise _error_solape()
+                raise
+
+    al_confirmar(conn, RESERVAS_CREADAS.inc, cantidad=len(aceptadas))
+    indice.sincronizar(conn)
+    cache.invalidar("reservas")
+    return resultados
+
 # Metodo para actualizar una reserva ya existente
 def actualizar_reserva(conn: Connection, reserva_id: int, reserva_in: ReservaUpdate):
-    reserva_actual = obtener_por_id(conn, reserva_id)
+    reserva_actual = _obtener_modificable(conn, reserva_id)
     if not reserva_actual:
         return None
 
@@ -134,8 +357,16 @@ def actualizar_reserva(conn: Connection, reserva_id: int, reserva_in: ReservaUpd
     values.append(reserva_id)
     query = f"UPDATE reservas SET {', '.join(set_clauses)} WHERE id = ?"
     
-    cursor.execute(query, values)
-    conn.commit()
+    try:
+        with transaccion(conn):
+            cursor.execute(query, values)
+    except sqlite3.IntegrityError as e:
+        if _es_error_solape(e):
+            raise _error_solape()
+        raise
+
+    indice.sincronizar(conn)
+    cache.invalidar("reservas")
     
     return obtener_por_id(conn, reserva_id)
 
@@ -143,15 +374,103 @@ def actualizar_reserva(conn: Connection, reserva_id: int, reserva_in: ReservaUpd
 def cambiar_estado(conn: Connection, reserva_id: int, nuevo_estado: str):
     cursor = conn.cursor()
     
-    cursor.execute("SELECT id FROM reservas WHERE id = ?", (reserva_id,))
-    if not cursor.fetchone():
+    if not _obtener_modificable(conn, reserva_id):
         return None
 
-    cursor.execute("UPDATE reservas SET estado = ? WHERE id = ?", (nuevo_estado, reserva_id))
-    conn.commit()
+    try:
+        with transaccion(conn):
+            cursor.execute("UPDATE reservas SET estado = ? WHERE id = ?", (nuevo_estado, reserva_id))
+    except sqlite3.IntegrityError as e:
+        # Reactivar una reserva cancelada puede chocar con otra posterior
+        if _es_error_solape(e):
+            raise _error_solape()
+        raise
+
+    indice.sincronizar(conn)
+    cache.invalidar("reservas")
     
     return obtener_por_id(conn, reserva_id)
 
+# Estados desde los que cada estado destino se aplica con el UPDATE del lote. Cancelar sigue la regla
+# de eliminar_reserva; reactivar una cancelada puede solaparse con otra y se hace reserva a reserva
+ORIGENES_ESTADO = {
+    "confirmada": ("pendiente", "completada"),
+    "completada": ("pendiente", "confirmada"),
+    "cancelada": ("pendiente", "confirmada"),
+}
+
+# Metodo para cambiar de estado muchas reservas en una sola transacción: un UPDATE ... RETURNING para
+# todas las que pueden cambiar y una consulta para explicar el resto.
+# Devuelve el resultado de cada id (sin repetidos) en el orden de entrada
+def cambiar_estados(conn: Connection, reserva_ids: list, nuevo_estado: str):
+    ids = list(dict.fromkeys(reserva_ids))
+    resultados = {}
+    cursor = conn.cursor()
+    cursor.row_factory = None
+
+    def rechazar(reserva_id, error):
+        if isinstance(error, ReservaSolapadaError):
+            al_confirmar(conn, RESERVAS_SOLAPADAS.inc)
+        resultados[reserva_id] = {"id": reserva_id, "error": type(error).__name__, "mensaje": str(error)}
+
+    with transaccion(conn):
+        origenes = ORIGENES_ESTADO[nuevo_estado]
+        cursor.execute(f"""
+            UPDATE reservas SET estado = ?
+            WHERE id IN (SELECT value FROM json_each(?)) AND estado IN ({", ".join("?" * len(origenes))})
+            RETURNING id
+        """, (nuevo_estado, json.dumps(ids), *origenes))
+        cambiadas = [fila[0] for fila in cursor.fetchall()]
+        for reserva_id in cambiadas:
+            resultados[reserva_id] = {"id": reserva_id, "estado": nuevo_estado}
+
+        resto = [reserva_id for reserva_id in ids if reserva_id not in resultados]
+        cursor.execute(
+            "SELECT id, estado FROM reservas WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(resto),)
+        )
+        sin_cambios = 0
+        for reserva_id, estado in cursor.fetchall():
+            if estado == nuevo_estado:
+                resultados[reserva_id] = {"id": reserva_id, "estado": estado}
+                sin_cambios += 1
+            elif nuevo_estado == "cancelada":
+                rechazar(reserva_id, CancelacionNoPermitidaError(f"No se puede cancelar una reserva en estado '{estado}'"))
+            else:
+                # Solo queda reactivar una cancelada: el trigger comprueba que no se solape con otra
+                try:
+                    with transaccion(conn):
+                        cursor.execute("UPDATE reservas SET estado = ? WHERE id = ?", (nuevo_estado, reserva_id))
+                except sqlite3.IntegrityError as e:
+                    if not _es_error_solape(e):
+                        raise
+                    rechazar(reserva_id, _error_solape())
+                    continue
+                cambiadas.append(reserva_id)
+                resultados[reserva_id] = {"id": reserva_id, "estado": nuevo_estado}
+
+        # Las que no están en 'reservas' pueden estar en el archivo histórico, que es de solo lectura
+        faltan = [reserva_id for reserva_id in resto if reserva_id not in resultados]
+        cursor.execute(
+            "SELECT id FROM archivo.reservas WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(faltan),)
+        )
+        for (reserva_id,) in cursor.fetchall():
+            rechazar(reserva_id, ReservaArchivadaError(f"La reserva {reserva_id} está archivada y no se puede modificar"))
+        for reserva_id in faltan:
+            if reserva_id not in resultados:
+                resultados[reserva_id] = {"id": reserva_id, "error": "NoEncontrada", "mensaje": "Reserva no encontrada"}
+
+    if nuevo_estado == "cancelada":
+        al_confirmar(conn, RESERVAS_CANCELADAS.inc, cantidad=len(cambiadas))
+    if cambiadas:
+        indice.sincronizar(conn)
+        cache.invalidar("reservas")
+    return {
+        "cambiadas": len(cambiadas),
+        "sin_cambios": sin_cambios,
+        "rechazadas": len(ids) - len(cambiadas) - sin_cambios,
+        "resultados": [resultados[reserva_id] for reserva_id in ids],
+    }
+
 # Metodo para eliminar una reserva
 def eliminar_reserva(conn: Connection, reserva_id: int):
     # REGLA 7: Cancelación controlada (Soft Delete)
@@ -163,4 +482,5 @@ def eliminar_reserva(conn: Connection, reserva_id: int):
         raise CancelacionNoPermitidaError(f"No se puede cancelar una reserva en estado '{reserva['estado']}'")
 
     cambiar_estado(conn, reserva_id, "cancelada")
+    al_confirmar(conn, RESERVAS_CANCELADAS.inc)
     return True
\ No newline at end of file
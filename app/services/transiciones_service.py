@@ -0,0 +1,66 @@
+# Archivo: app/services/transiciones_service.py
+# Cambios de estado automáticos de las reservas, que lanza cada minuto el planificador (app/planificador.py).
+# Cada tarea es un solo UPDATE sobre todas las reservas afectadas, no una petición por reserva:
+#   - completar: las confirmadas cuya hora de fin ya ha pasado pasan a 'completada'
+#   - caducar: las pendientes que siguen así cuando ya ha terminado su hora se cancelan
+# Ninguna tarea libera una mesa mientras dura su reserva: 'pendiente' solo quiere decir que nadie ha
+# confirmado la reserva, no que el cliente no haya llegado (el esquema no registra la llegada), así que
+# cancelarla a mitad de la comida dejaría reservar otra vez una mesa ocupada. Caducar es el único camino
+# automático para las pendientes, y las cancela con una marca en las notas.
+# Los triggers mantienen las estadísticas y el registro de cambios con el que se sincroniza el índice.
+from sqlite3 import Connection
+from datetime import datetime
+from app.database import a_epoch
+from app.services.cache import cache
+
+# Marca de los no presentados en las notas (la pone el generador de datos en el histórico)
+MARCA_NO_PRESENTADA = "[no presentado]"
+MARCA_CADUCADA = "[caducada]"
+
+# Las condiciones 'estado = ...' se escriben literales: son las de los índices parciales de la migración 5
+COMPLETAR = """
+    UPDATE reservas SET estado = 'completada'
+    WHERE estado = 'confirmada' AND fin <= ?
+"""
+
+# 'inicio <= ?' acota el recorrido del índice a las pendientes que ya han empezado
+CADUCAR = """
+    UPDATE reservas SET estado = 'cancelada', notas = trim(COALESCE(notas, '') || ' ' || ?)
+    WHERE estado = 'pendiente' AND inicio <= ? AND fin <= ?
+"""
+
+
+def _aplicar(conn: Connection, sql: str, params: tuple):
+    filas = conn.execute(sql, params).rowcount
+    if filas:
+        cache.invalidar("reservas")
+    return filas
+
+
+# Metodo para completar las reservas confirmadas que ya han terminado. Devuelve cuántas
+def completar_terminadas(conn: Connection, ahora: datetime = None):
+    return _aplicar(conn, COMPLETAR, (a_epoch(ahora or datetime.now()),))
+
+
+# Metodo para cancelar las reservas que siguen pendientes cuando ya han terminado. Devuelve cuántas
+def caducar_pendientes(conn: Connection, ahora: datetime = None):
+    ahora = a_epoch(ahora or datetime.now())
+    return _aplicar(conn, CADUCAR, (MARCA_CADUCADA, ahora, ahora))
+
+
+# Tareas en el orden en que se ejecutan: nombre -> funcion(conn, ahora)
+TAREAS = {
+    "completar": completar_terminadas,
+    "caducar": caducar_pendientes,
+}
+
+
+# Metodo para aplicar todas las tareas de una vez con una sola conexión (scripts, benchmarks).
+# Devuelve las reservas cambiadas por cada tarea
+def aplicar_todas(conn: Connection, ahora: datetime = None):
+    ahora = ahora or datetime.now()
+    resultado = {}
+    for nombre, funcion in TAREAS.items():
+        resultado[nombre] = funcion(conn, ahora)
+        conn.commit()
+    return resultado
@@ -0,0 +1,85 @@
+# Archivo: benchmarks/bulk_reservas.py
+# Mide el rendimiento en reservas por segundo de crear_reserva fila a fila frente a crear_reservas_bulk.
+#
+# Uso: python -m benchmarks.bulk_reservas --reservas 2000 --lote 500
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from app.database import init_db
+from app.models import ReservaCreate
+from app.pool import PoolConexiones
+from app.services import reserva_service
+from app.services.catalogo_mesas import catalogo
+from app.services.indice_disponibilidad import indice
+
+NUM_MESAS = 50
+
+
+def preparar_bd(ruta: str):
+    init_db(ruta)
+    conn = sqlite3.connect(ruta)
+    conn.execute("INSERT INTO clientes (nombre, email, telefono) VALUES ('Bulk', 'bulk@example.com', '600000000')")
+    for numero in range(1, NUM_MESAS + 1):
+        conn.execute("INSERT INTO mesas (numero, capacidad, ubicacion) VALUES (?, 4, 'interior')", (numero,))
+    conn.commit()
+    conn.close()
+
+
+# Reservas sin solapes: cada mesa recibe comida y cena en días sucesivos
+def generar_reservas(total: int):
+    base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    reservas = []
+    for n in range(total):
+        mesa = n % NUM_MESAS + 1
+        turno = (n // NUM_MESAS) % 2
+        dia = n // (NUM_MESAS * 2)
+        inicio = base + timedelta(days=dia, hours=13 if turno == 0 else 21)
+        reservas.append(ReservaCreate(cliente_id=1, mesa_id=mesa, fecha_hora_inicio=inicio, num_comensales=2))
+    return reservas
+
+
+def medir(nombre, funcion, reservas):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "bulk.db")
+        preparar_bd(ruta)
+        pool = PoolConexiones(ruta, tamano=1)
+        # Cada medición usa una BD nueva, el índice y el catálogo en memoria tienen que recargarse
+        indice.invalidar()
+        catalogo.invalidar()
+        with pool.conexion() as conn:
+            inicio = perf_counter()
+            funcion(conn, reservas)
+            duracion = perf_counter() - inicio
+            creadas = conn.execute("SELECT COUNT(*) FROM reservas").fetchone()[0]
+        pool.cerrar()
+    print(f"{nombre:<12} {creadas:>6} reservas en {duracion:7.3f} s -> {creadas / duracion:10.0f} reservas/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reservas por segundo: fila a fila frente a bulk")
+    parser.add_argument("--reservas", type=int, default=2000)
+    parser.add_argument("--lote", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    reservas = generar_reservas(args.reservas)
+
+    def fila_a_fila(conn, lista):
+        for r in lista:
+            reserva_service.crear_reserva(conn, r)
+
+    def por_lotes(conn, lista):
+        for i in range(0, len(lista), args.lote):
+            reserva_service.crear_reservas_bulk(conn, lista[i:i + args.lote])
+
+    medir("fila a fila", fila_a_fila, reservas)
+    medir("bulk", por_lotes, reservas)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
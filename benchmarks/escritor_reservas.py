@@ -0,0 +1,118 @@
+# Archivo: benchmarks/escritor_reservas.py
+# Mide reservas por segundo en un pico de reservas que sí se crean (sin solapes), con varios procesos
+# (como varios workers de uvicorn) y varios hilos cada uno:
+#   - "transacción": cada hilo abre su transacción y hace su commit, como antes del escritor
+#   - "escritor": cada proceso pasa las reservas por su escritor con commit agrupado (app/escritor.py)
+#
+# Uso: python -m benchmarks.escritor_reservas --procesos 2 --hilos 16 --reservas 100 --lote 64 --espera-ms 1
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from app.database import init_db
+from app.escritor import EscritorBD
+from app.models import ReservaCreate
+from app.pool import PoolConexiones
+from app.services import reserva_service
+
+NUM_MESAS = 40
+
+
+def preparar_bd(ruta: str):
+    init_db(ruta)
+    conn = sqlite3.connect(ruta)
+    conn.execute("INSERT INTO clientes (nombre, email, telefono) VALUES ('Pico', 'pico@example.com', '600000000')")
+    for numero in range(1, NUM_MESAS + 1):
+        conn.execute("INSERT INTO mesas (numero, capacidad, ubicacion) VALUES (?, 4, 'interior')", (numero,))
+    conn.commit()
+    conn.close()
+
+
+# Cada reserva tiene su propio hueco (mesa, día, turno), así que ninguna choca con otra
+def _reserva(n: int):
+    base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    mesa = n % NUM_MESAS + 1
+    turno = (n // NUM_MESAS) % 2
+    dia = n // (NUM_MESAS * 2)
+    inicio = base + timedelta(days=dia, hours=13 if turno == 0 else 21)
+    return ReservaCreate(cliente_id=1, mesa_id=mesa, fecha_hora_inicio=inicio, num_comensales=2)
+
+
+def _worker(ruta: str, proceso: int, hilos: int, reservas: int, modo: str, lote: int, espera_ms: float):
+    pool = PoolConexiones(ruta, tamano=hilos)
+    escritor = EscritorBD(pool, max_lote=lote, espera_ms=espera_ms) if modo == "escritor" else None
+    errores = []
+
+    def hilo(h):
+        primera = (proceso * hilos + h) * reservas
+        for n in range(primera, primera + reservas):
+            try:
+                if escritor:
+                    escritor.ejecutar(reserva_service.crear_reserva, _reserva(n))
+                else:
+                    with pool.conexion() as conn:
+                        reserva_service.crear_reserva(conn, _reserva(n))
+            except Exception as e:
+                errores.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=hilo, args=(h,)) for h in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    estadisticas = escritor.estadisticas() if escritor else None
+    if escritor:
+        escritor.cerrar()
+    pool.cerrar()
+    return errores, estadisticas
+
+
+def medir(modo: str, args):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "escritor.db")
+        preparar_bd(ruta)
+
+        inicio = perf_counter()
+        with ProcessPoolExecutor(max_workers=args.procesos) as ejecutor:
+            futuros = [
+                ejecutor.submit(_worker, ruta, p, args.hilos, args.reservas, modo, args.lote, args.espera_ms)
+                for p in range(args.procesos)
+            ]
+            parciales = [f.result() for f in futuros]
+        duracion = perf_counter() - inicio
+
+        conn = sqlite3.connect(ruta)
+        creadas = conn.execute("SELECT COUNT(*) FROM reservas").fetchone()[0]
+        conn.close()
+
+    errores = [e for p in parciales for e in p[0]]
+    lotes = [p[1] for p in parciales if p[1]]
+    print(f"{modo:<12} {creadas:>6} reservas en {duracion:7.3f} s -> {creadas / duracion:8.0f} reservas/s  errores: {dict(Counter(errores))}")
+    if lotes:
+        medio = sum(e["operaciones"] for e in lotes) / sum(e["lotes"] for e in lotes)
+        print(f"{'':<12} {sum(e['lotes'] for e in lotes)} commits, {medio:.1f} reservas por commit de media")
+    return errores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reservas por segundo: commit por petición frente a commit agrupado")
+    parser.add_argument("--procesos", type=int, default=2)
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--reservas", type=int, default=100, help="Reservas por hilo")
+    parser.add_argument("--lote", type=int, default=64)
+    parser.add_argument("--espera-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    errores = medir("transacción", args) + medir("escritor", args)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
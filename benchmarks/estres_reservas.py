@@ -0,0 +1,131 @@
+# Archivo: benchmarks/estres_reservas.py
+# Prueba de estrés de concurrencia para crear_reserva.
+# Lanza varios procesos (como varios workers de uvicorn) con varios hilos cada uno,
+# todos intentando reservar las mismas mesas en los mismos horarios, y comprueba
+# al final que no existe ni una sola reserva solapada.
+#
+# Con --escritor las reservas de cada proceso pasan por el escritor con commit agrupado (app/escritor.py),
+# como en la API, en vez de abrir cada hilo su propia transacción.
+#
+# Uso: python -m benchmarks.estres_reservas --procesos 4 --hilos 8 --intentos 200 [--escritor]
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from app.database import init_db
+from app.escritor import EscritorBD
+from app.exceptions import ReservaSolapadaError
+from app.models import ReservaCreate
+from app.pool import PoolConexiones
+from app.services import reserva_service
+
+NUM_MESAS = 3
+NUM_DIAS = 20
+
+# Horarios candidatos: cada noche cuatro inicios solapados entre sí para provocar conflictos
+def _horarios():
+    base = datetime.now().replace(hour=20, minute=0, second=0, microsecond=0) + timedelta(days=30)
+    return [base + timedelta(days=d, minutes=30 * i) for d in range(NUM_DIAS) for i in range(4)]
+
+
+def preparar_bd(ruta: str):
+    init_db(ruta)
+    conn = sqlite3.connect(ruta)
+    conn.execute("INSERT INTO clientes (nombre, email, telefono) VALUES ('Estres', 'estres@example.com', '600000000')")
+    for numero in range(1, NUM_MESAS + 1):
+        conn.execute("INSERT INTO mesas (numero, capacidad, ubicacion) VALUES (?, 4, 'interior')", (numero,))
+    conn.commit()
+    conn.close()
+
+
+def _worker(ruta: str, hilos: int, intentos: int, semilla: int, con_escritor: bool):
+    pool = PoolConexiones(ruta, tamano=hilos)
+    escritor = EscritorBD(pool) if con_escritor else None
+    horarios = _horarios()
+    resultados = {"creadas": 0, "solapadas": 0, "errores": 0}
+    lock = threading.Lock()
+
+    def hilo(n):
+        rnd = random.Random(semilla * 1000 + n)
+        for _ in range(intentos):
+            reserva = ReservaCreate(
+                cliente_id=1,
+                mesa_id=rnd.randint(1, NUM_MESAS),
+                fecha_hora_inicio=rnd.choice(horarios),
+                num_comensales=2,
+            )
+            clave = "creadas"
+            try:
+                if escritor:
+                    escritor.ejecutar(reserva_service.crear_reserva, reserva)
+                else:
+                    with pool.conexion() as conn:
+                        reserva_service.crear_reserva(conn, reserva)
+            except ReservaSolapadaError:
+                clave = "solapadas"
+            except sqlite3.Error:
+                clave = "errores"
+            with lock:
+                resultados[clave] += 1
+
+    threads = [threading.Thread(target=hilo, args=(n,)) for n in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if escritor:
+        escritor.cerrar()
+    pool.cerrar()
+    return resultados
+
+
+def contar_dobles_reservas(ruta: str):
+    conn = sqlite3.connect(ruta)
+    total = conn.execute("""
+        SELECT COUNT(*) FROM reservas a
+        JOIN reservas b ON a.mesa_id = b.mesa_id AND a.id < b.id
+        WHERE a.estado != 'cancelada' AND b.estado != 'cancelada'
+        AND a.fecha_hora_inicio < b.fecha_hora_fin
+        AND a.fecha_hora_fin > b.fecha_hora_inicio
+    """).fetchone()[0]
+    conn.close()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de estrés de reservas concurrentes")
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--intentos", type=int, default=200)
+    parser.add_argument("--escritor", action="store_true", help="Escribe a través del escritor con commit agrupado")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "estres.db")
+        preparar_bd(ruta)
+
+        inicio = perf_counter()
+        with ProcessPoolExecutor(max_workers=args.procesos) as ejecutor:
+            futuros = [ejecutor.submit(_worker, ruta, args.hilos, args.intentos, p, args.escritor) for p in range(args.procesos)]
+            parciales = [f.result() for f in futuros]
+        duracion = perf_counter() - inicio
+
+        totales = {clave: sum(p[clave] for p in parciales) for clave in ("creadas", "solapadas", "errores")}
+        peticiones = sum(totales.values())
+        dobles = contar_dobles_reservas(ruta)
+
+    print(f"Peticiones: {peticiones} en {duracion:.2f} s ({peticiones / duracion:.0f} req/s)")
+    print(f"Creadas: {totales['creadas']}  Rechazadas por solape: {totales['solapadas']}  Errores SQLite: {totales['errores']}")
+    print(f"Dobles reservas detectadas: {dobles}")
+    return 1 if dobles or totales["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
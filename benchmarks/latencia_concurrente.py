@@ -0,0 +1,194 @@
+# Archivo: benchmarks/latencia_concurrente.py
+# Latencia con muchas conexiones simultáneas: endpoints async con el ejecutor acotado (la app actual)
+# frente a endpoints síncronos con Depends(get_db) sobre los mismos servicios (como estaban antes).
+# Arranca cada versión en un proceso uvicorn sobre una BD temporal, abre N conexiones concurrentes
+# con httpx.AsyncClient y mide p50/p95/p99 de una mezcla de lecturas y reservas.
+#
+# Uso: python -m benchmarks.latencia_concurrente --conexiones 1000 --peticiones 5000
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, status
+from sqlite3 import Connection
+
+from app.database import get_db
+from app.models import ReservaCreate
+from app.services import mesa_service, reserva_service
+from app.services.cache import cache
+
+APPS = {
+    "antes": "benchmarks.latencia_concurrente:app_sincrona",
+    "despues": "app.main:app",
+}
+
+# Reparto de la mezcla de peticiones
+PESO_DISPONIBLES = 0.6
+PESO_OBTENER = 0.25
+
+
+# Versión de comparación: los mismos servicios detrás de endpoints síncronos,
+# que FastAPI ejecuta en su grupo de hilos general y que sacan la conexión con Depends(get_db)
+def _crear_app_sincrona():
+    from app.main import app as app_actual
+
+    app_sincrona = FastAPI(title="La Mesa Dorada API (endpoints síncronos)")
+    app_sincrona.router.on_startup.extend(app_actual.router.on_startup)
+    app_sincrona.router.on_shutdown.extend(app_actual.router.on_shutdown)
+    app_sincrona.exception_handlers.update(app_actual.exception_handlers)
+
+    @app_sincrona.get("/mesas/disponibles/")
+    def buscar_mesas_disponibles(fecha: datetime, comensales: int, db: Connection = Depends(get_db)):
+        return mesa_service.buscar_disponibles(db, fecha, comensales)
+
+    @app_sincrona.post("/reservas/", status_code=status.HTTP_201_CREATED)
+    def crear_reserva(reserva: ReservaCreate, db: Connection = Depends(get_db)):
+        return reserva_service.crear_reserva(db, reserva)
+
+    @app_sincrona.get("/reservas/{id}")
+    def obtener_reserva(id: int, db: Connection = Depends(get_db)):
+        reserva = cache.obtener(db, ("reservas.obtener", id), ("reservas",), reserva_service.obtener_por_id, id)
+        if not reserva:
+            raise HTTPException(status_code=404, detail="Reserva no encontrada")
+        return reserva
+
+    return app_sincrona
+
+
+# Solo se construye cuando uvicorn importa este módulo para la versión "antes"
+def __getattr__(nombre):
+    if nombre == "app_sincrona":
+        app_sincrona = _crear_app_sincrona()
+        globals()["app_sincrona"] = app_sincrona
+        return app_sincrona
+    raise AttributeError(nombre)
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _arrancar(nombre: str, carpeta: str, puerto: int, pool_timeout: float):
+    entorno = dict(os.environ, DB_NAME=os.path.join(carpeta, f"{nombre}.db"), DB_POOL_TIMEOUT=str(pool_timeout))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", APPS[nombre], "--port", str(puerto),
+         "--log-level", "warning", "--backlog", "4096", "--no-access-log"],
+        env=entorno,
+    )
+
+
+async def _esperar_servidor(url: str, proceso, segundos: float = 30):
+    limite = perf_counter() + segundos
+    async with httpx.AsyncClient(base_url=url) as cliente:
+        while perf_counter() < limite:
+            if proceso.poll() is not None:
+                raise RuntimeError("El servidor terminó al arrancar")
+            try:
+                await cliente.get("/mesas/disponibles/", params={"fecha": "2030-01-01T13:00:00", "comensales": 2})
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def _peticion(rnd: random.Random, horarios: list, max_id: int):
+    tirada = rnd.random()
+    if tirada < PESO_DISPONIBLES:
+        return "GET", "/mesas/disponibles/", {"params": {"fecha": rnd.choice(horarios).isoformat(), "comensales": rnd.randint(1, 6)}}
+    if tirada < PESO_DISPONIBLES + PESO_OBTENER:
+        return "GET", f"/reservas/{rnd.randint(1, max_id)}", {}
+    return "POST", "/reservas/", {"json": {
+        "cliente_id": rnd.randint(1, 10),
+        "mesa_id": rnd.randint(1, 15),
+        "fecha_hora_inicio": rnd.choice(horarios).isoformat(),
+        "num_comensales": 2,
+    }}
+
+
+async def _carga(url: str, conexiones: int, peticiones: int, semilla: int):
+    base = datetime.now().replace(hour=13, minute=0, second=0, microsecond=0) + timedelta(days=7)
+    horarios = [base + timedelta(days=d, hours=h) for d in range(30) for h in (0, 1, 2, 7, 8, 9)]
+    latencias = []
+    estados = Counter()
+    pendientes = iter(range(peticiones))
+
+    limites = httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        async def conexion(n):
+            rnd = random.Random(semilla * 100000 + n)
+            for _ in pendientes:
+                metodo, ruta, extra = _peticion(rnd, horarios, max(1, peticiones // 10))
+                inicio = perf_counter()
+                try:
+                    respuesta = await cliente.request(metodo, ruta, **extra)
+                    estados[respuesta.status_code] += 1
+                except httpx.TransportError:
+                    estados["error"] += 1
+                latencias.append(perf_counter() - inicio)
+
+        inicio = perf_counter()
+        await asyncio.gather(*(conexion(n) for n in range(conexiones)))
+        duracion = perf_counter() - inicio
+    return latencias, estados, duracion
+
+
+def _percentil(ordenadas: list, p: float):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))] * 1000
+
+
+def medir(nombre: str, conexiones: int, peticiones: int, semilla: int, pool_timeout: float):
+    with tempfile.TemporaryDirectory() as carpeta:
+        puerto = _puerto_libre()
+        url = f"http://127.0.0.1:{puerto}"
+        proceso = _arrancar(nombre, carpeta, puerto, pool_timeout)
+        try:
+            asyncio.run(_esperar_servidor(url, proceso))
+            latencias, estados, duracion = asyncio.run(_carga(url, conexiones, peticiones, semilla))
+        finally:
+            proceso.terminate()
+            try:
+                proceso.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                # La versión síncrona puede quedar con hilos atascados esperando el pool
+                proceso.kill()
+                proceso.wait()
+
+    ordenadas = sorted(latencias)
+    print(f"[{nombre}] {len(latencias)} peticiones en {duracion:.2f} s ({len(latencias) / duracion:.0f} req/s)")
+    print(f"[{nombre}] p50 {_percentil(ordenadas, 0.50):.1f} ms  p95 {_percentil(ordenadas, 0.95):.1f} ms  "
+          f"p99 {_percentil(ordenadas, 0.99):.1f} ms  max {ordenadas[-1] * 1000:.1f} ms")
+    print(f"[{nombre}] Respuestas: {dict(sorted(estados.items(), key=str))}")
+    return estados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latencia con muchas conexiones concurrentes, antes y después")
+    parser.add_argument("--conexiones", type=int, default=1000)
+    parser.add_argument("--peticiones", type=int, default=5000)
+    parser.add_argument("--semilla", type=int, default=1)
+    # Con endpoints síncronos los hilos de FastAPI se quedan esperando conexión del pool y no queda
+    # ninguno para devolverlas: cada atasco dura lo que DB_POOL_TIMEOUT, así que se acorta para medir
+    parser.add_argument("--pool-timeout", type=float, default=5.0)
+    parser.add_argument("--solo", choices=sorted(APPS), help="Mide solo una de las dos versiones")
+    args = parser.parse_args(argv)
+
+    errores = 0
+    for nombre in [args.solo] if args.solo else ["antes", "despues"]:
+        estados = medir(nombre, args.conexiones, args.peticiones, args.semilla, args.pool_timeout)
+        errores += estados["error"] + sum(n for codigo, n in estados.items() if codigo != "error" and codigo >= 500 and codigo != 503)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# Archivo: benchmarks/serializacion.py
+# Coste por fila de convertir un listado grande de reservas a JSON:
+#   - "response_model": dict(fila) en el servicio + validación y volcado con Pydantic, como hace FastAPI
+#   - "rápida (json)" y "rápida (orjson)": filas de SQLite directas al serializador de app/serializacion.py
+#
+# Uso: python -m benchmarks.serializacion --filas 1000 10000 --repeticiones 5
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from time import perf_counter
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app import serializacion
+from app.models import ReservaResponse
+from app.serializacion import Serializador
+from app.services import reserva_service
+from benchmarks.bulk_reservas import generar_reservas, preparar_bd
+
+
+def _mejor_tiempo(funcion, repeticiones: int):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = perf_counter()
+        funcion()
+        duracion = perf_counter() - inicio
+        if mejor is None or duracion < mejor:
+            mejor = duracion
+    return mejor
+
+
+def medir(conn: sqlite3.Connection, filas: int, repeticiones: int):
+    datos = reserva_service.obtener_todas(conn, limit=filas, como_filas=True)
+    adaptador = TypeAdapter(List[ReservaResponse])
+    serializador = Serializador(ReservaResponse)
+
+    def response_model():
+        dicts = [dict(fila) for fila in datos]
+        return adaptador.dump_json(adaptador.validate_python(dicts))
+
+    def rapida_json():
+        orjson, serializacion.orjson = serializacion.orjson, None
+        try:
+            return serializador.lista(datos)
+        finally:
+            serializacion.orjson = orjson
+
+    def rapida_orjson():
+        return serializador.lista(datos)
+
+    # Las tres variantes tienen que producir exactamente el mismo JSON
+    esperado = response_model()
+    variantes = [("response_model", response_model), ("rápida (json)", rapida_json)]
+    if serializacion.orjson is not None:
+        variantes.append(("rápida (orjson)", rapida_orjson))
+    for nombre, funcion in variantes:
+        if funcion() != esperado:
+            raise AssertionError(f"{nombre} no produce el mismo JSON que response_model")
+
+    base = None
+    for nombre, funcion in variantes:
+        duracion = _mejor_tiempo(funcion, repeticiones)
+        base = base or duracion
+        print(f"{len(datos):>7} filas  {nombre:<16} {duracion * 1e6 / len(datos):7.2f} µs/fila  "
+              f"({duracion * 1000:8.2f} ms, x{base / duracion:.1f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coste por fila de serializar listados de reservas")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "serializacion.db")
+        preparar_bd(ruta)
+        conn = sqlite3.connect(ruta)
+        conn.row_factory = sqlite3.Row
+        reserva_service.crear_reservas_bulk(conn, generar_reservas(max(args.filas)))
+        for filas in args.filas:
+            medir(conn, filas, args.repeticiones)
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+# Archivo: benchmarks/suite.py
+# Batería de carga reproducible contra la app ASGI en el mismo proceso (httpx.AsyncClient + ASGITransport,
+# sin red), sobre una BD temporal con datos sintéticos. Escenarios:
+#   - "reservas": pico de reservas (POST /reservas/, con choques entre peticiones -> 201 o 409)
+#   - "disponibilidad": tablets y widget consultando /mesas/disponibles/
+#   - "busqueda": búsqueda de clientes en recepción (/clientes/buscar/)
+#   - "panel": el panel de gestión leyendo todas las rutas de /estadisticas
+# Para cada uno informa de peticiones por segundo y latencia p50/p95/p99, y la compara con una línea base
+# guardada en JSON: termina con código 1 si algún escenario empeora más de la tolerancia.
+#
+# Uso: python -m benchmarks.suite [--escenarios reservas panel] [--peticiones 2000] [--concurrencia 50]
+#      python -m benchmarks.suite --guardar          (reescribe la línea base con esta ejecución)
+#
+# Cada escenario empieza con unas peticiones de calentamiento que no se miden y se repite varias veces
+# quedándose con el mejor valor de cada métrica, para que el ruido de la máquina no parezca una regresión.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+from datetime import date, datetime, timedelta
+from time import perf_counter
+
+import httpx
+
+LINEA_BASE = os.path.join(os.path.dirname(__file__), "linea_base.json")
+
+# Métricas que se comparan con la línea base y en qué sentido es peor
+COMPARADAS = {"peticiones_s": "menor", "p50_ms": "mayor", "p95_ms": "mayor", "p99_ms": "mayor"}
+
+
+# Cada escenario es una función (rnd, datos) -> (metodo, ruta, argumentos de httpx)
+# y los códigos de respuesta que se consideran correctos
+def _reserva(rnd: random.Random, datos: dict):
+    # Cada ronda reserva en una semana distinta, para que todas tengan la misma proporción de choques
+    dia = datos["dia_libre"] + timedelta(days=7 * datos["ronda"] + rnd.randrange(7))
+    hora = rnd.choice((12, 13, 14, 20, 21, 22))
+    return "POST", "/reservas/", {"json": {
+        "cliente_id": rnd.randint(1, datos["clientes"]),
+        "mesa_id": rnd.randint(1, datos["mesas"]),
+        "fecha_hora_inicio": datetime.combine(dia, datetime.min.time()).replace(hour=hora).isoformat(),
+        "num_comensales": 2,
+    }}
+
+
+def _disponibilidad(rnd: random.Random, datos: dict):
+    dia = date.today() + timedelta(days=rnd.randint(1, 30))
+    hora = rnd.choice((12, 13, 14, 20, 21, 22))
+    fecha = datetime.combine(dia, datetime.min.time()).replace(hour=hora, minute=rnd.choice((0, 30)))
+    return "GET", "/mesas/disponibles/", {"params": {"fecha": fecha.isoformat(), "comensales": rnd.randint(1, 8)}}
+
+
+def _busqueda(rnd: random.Random, datos: dict):
+    numero = rnd.randint(1, datos["clientes"])
+    texto = rnd.choice((rnd.choice(datos["apellidos"]), f"cliente{numero}@", str(rnd.randint(600, 799))))
+    return "GET", "/clientes/buscar/", {"params": {"q": texto, "limit": 20}}
+
+
+def _panel(rnd: random.Random, datos: dict):
+    dia = (date.today() + timedelta(days=rnd.randint(-30, 30))).isoformat()
+    return rnd.choice((
+        ("GET", "/estadisticas/ocupacion/diaria", {"params": {"fecha": dia}}),
+        ("GET", "/estadisticas/ocupacion/semanal", {"params": {"fecha_inicio": dia}}),
+        ("GET", "/estadisticas/resumen", {}),
+        ("GET", "/estadisticas/clientes-frecuentes", {}),
+        ("GET", "/estadisticas/mesas-populares", {}),
+    ))
+
+
+ESCENARIOS = {
+    "reservas": (_reserva, {201, 409}),
+    "disponibilidad": (_disponibilidad, {200}),
+    "busqueda": (_busqueda, {200}),
+    "panel": (_panel, {200}),
+}
+
+
+def _percentil(ordenadas: list, p: float):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))] * 1000
+
+
+async def _ronda(cliente: httpx.AsyncClient, nombre: str, datos: dict, peticiones: int, args):
+    generar, correctos = ESCENARIOS[nombre]
+    latencias = []
+    estados = Counter()
+    pendientes = iter(range(peticiones))
+
+    async def trabajador(n):
+        rnd = random.Random(f"{args.semilla}-{nombre}-{datos['ronda']}-{n}")
+        for _ in pendientes:
+            metodo, ruta, extra = generar(rnd, datos)
+            inicio = perf_counter()
+            respuesta = await cliente.request(metodo, ruta, **extra)
+            latencias.append(perf_counter() - inicio)
+            estados[respuesta.status_code] += 1
+
+    inicio = perf_counter()
+    await asyncio.gather(*(trabajador(n) for n in range(args.concurrencia)))
+    duracion = perf_counter() - inicio
+
+    ordenadas = sorted(latencias)
+    return {
+        "peticiones": len(latencias),
+        "peticiones_s": round(len(latencias) / duracion, 1),
+        "p50_ms": round(_percentil(ordenadas, 0.50), 2),
+        "p95_ms": round(_percentil(ordenadas, 0.95), 2),
+        "p99_ms": round(_percentil(ordenadas, 0.99), 2),
+        "estados": {str(codigo): n for codigo, n in sorted(estados.items())},
+        "errores": sum(n for codigo, n in estados.items() if codigo not in correctos),
+    }
+
+
+# Metodo para medir un escenario: calentamiento y después varias rondas,
+# quedándose con el mejor valor de cada métrica (las respuestas y errores se suman)
+async def _ejecutar_escenario(cliente: httpx.AsyncClient, nombre: str, datos: dict, args):
+    datos["ronda"] = 0
+    await _ronda(cliente, nombre, datos, args.concurrencia * 2, args)
+    rondas = []
+    for ronda in range(1, args.repeticiones + 1):
+        datos["ronda"] = ronda
+        rondas.append(await _ronda(cliente, nombre, datos, args.peticiones, args))
+
+    mejor = {"peticiones": args.peticiones}
+    for metrica, peor in COMPARADAS.items():
+        valores = [r[metrica] for r in rondas]
+        mejor[metrica] = max(valores) if peor == "menor" else min(valores)
+    estados = Counter()
+    for r in rondas:
+        estados.update(r["estados"])
+    mejor["estados"] = dict(sorted(estados.items()))
+    mejor["errores"] = sum(r["errores"] for r in rondas)
+    return mejor
+
+
+# Metodo para crear la BD sintética y cargar la app sobre ella.
+# DB_NAME se lee al importar app.database, así que la app se importa después de fijarlo
+def _preparar(carpeta: str, args):
+    os.environ["DB_NAME"] = os.path.join(carpeta, "suite.db")
+    import sqlite3
+    from app.database import ARCHIVO_DIAS, DB_NAME, adjuntar_archivo, init_db
+    from app.generador_datos import APELLIDOS, DIAS_FUTURO, cargar
+    from app.revision_consultas import NUM_MESAS
+    from app.services import archivo_service, transiciones_service
+
+    init_db(DB_NAME)
+    conn = adjuntar_archivo(sqlite3.connect(DB_NAME))
+    cargar(conn, clientes=args.clientes, reservas=args.reservas, mesas=NUM_MESAS, semilla=args.semilla)
+    # Las reservas antiguas se archivan antes de medir, como en una BD que lleva tiempo en marcha;
+    # así la pasada del archivador al arrancar la app no se mezcla con las peticiones
+    if ARCHIVO_DIAS > 0:
+        archivo_service.archivar(conn, ARCHIVO_DIAS)
+    # Lo mismo con los cambios de estado que el planificador haría al arrancar sobre las reservas de hoy
+    transiciones_service.aplicar_todas(conn)
+    conn.close()
+
+    from app.main import app
+    datos = {
+        "clientes": args.clientes,
+        "mesas": NUM_MESAS,
+        "apellidos": APELLIDOS,
+        # Las reservas sintéticas llegan hasta DIAS_FUTURO días desde hoy;
+        # el pico de reservas va a semanas posteriores, con huecos libres que se disputan entre sí
+        "dia_libre": date.today() + timedelta(days=DIAS_FUTURO + 2),
+    }
+    return app, datos
+
+
+async def _ejecutar(app, datos: dict, args):
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://suite", timeout=60) as cliente:
+            for nombre in args.escenarios:
+                resultados[nombre] = await _ejecutar_escenario(cliente, nombre, datos, args)
+                r = resultados[nombre]
+                print(f"{nombre:<15} {r['peticiones']:>6} peticiones x{args.repeticiones}  {r['peticiones_s']:>8.1f} req/s  "
+                      f"p50 {r['p50_ms']:7.2f} ms  p95 {r['p95_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms  "
+                      f"respuestas {r['estados']}")
+    return resultados
+
+
+# Metodo para comparar con la línea base; devuelve la lista de empeoramientos
+def comparar(resultados: dict, base: dict, tolerancia: float):
+    regresiones = []
+    for nombre, resultado in resultados.items():
+        anterior = base.get("escenarios", {}).get(nombre)
+        if anterior is None:
+            continue
+        for metrica, peor in COMPARADAS.items():
+            actual, referencia = resultado[metrica], anterior[metrica]
+            if peor == "menor":
+                empeora = actual < referencia * (1 - tolerancia)
+            else:
+                empeora = actual > referencia * (1 + tolerancia)
+            if empeora:
+                regresiones.append(f"{nombre}: {metrica} {actual} frente a {referencia} en la línea base")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batería de carga en proceso con comparación contra una línea base")
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument("--peticiones", type=int, default=2000, help="Peticiones por escenario")
+    parser.add_argument("--concurrencia", type=int, default=50, help="Peticiones simultáneas")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Rondas por escenario, se queda con la mejor")
+    parser.add_argument("--reservas", type=int, default=50000, help="Reservas de la BD sintética")
+    parser.add_argument("--clientes", type=int, default=5000, help="Clientes de la BD sintética")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--linea-base", default=LINEA_BASE, help="Fichero JSON de la línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="Empeoramiento permitido (0.5 = 50%%)")
+    parser.add_argument("--guardar", action="store_true", help="Guarda esta ejecución como línea base")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        app, datos = _preparar(carpeta, args)
+        resultados = asyncio.run(_ejecutar(app, datos, args))
+
+    errores = {nombre: r["errores"] for nombre, r in resultados.items() if r["errores"]}
+    if errores:
+        print(f"Respuestas inesperadas: {errores}")
+
+    configuracion = {clave: getattr(args, clave) for clave in ("peticiones", "concurrencia", "repeticiones", "reservas", "clientes", "semilla")}
+    if args.guardar:
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump({"configuracion": configuracion, "escenarios": resultados}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Línea base guardada en {args.linea_base}")
+        return 1 if errores else 0
+
+    if not os.path.exists(args.linea_base):
+        print(f"No hay línea base en {args.linea_base} (créala con --guardar)")
+        return 1 if errores else 0
+    with open(args.linea_base, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("configuracion") != configuracion:
+        print(f"Aviso: la línea base se midió con {base.get('configuracion')}")
+    regresiones = comparar(resultados, base, args.tolerancia)
+    for regresion in regresiones:
+        print(f"REGRESIÓN {regresion}")
+    if not regresiones:
+        print(f"Sin regresiones respecto a {args.linea_base} (tolerancia {args.tolerancia:.0%})")
+    return 1 if errores or regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
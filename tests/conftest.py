@@ -0,0 +1,35 @@
+# Archivo: tests/conftest.py
+# La configuración se lee de las variables de entorno al importar app.database, así que se fija
+# antes de importar la app: una BD temporal para toda la sesión y sin tareas en segundo plano
+import os
+import tempfile
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="restaurante_tests_")
+os.environ["DB_NAME"] = os.path.join(_DIRECTORIO, "restaurante.db")
+os.environ["PLANIFICADOR_ACTIVO"] = "0"
+os.environ["ARCHIVO_INTERVALO_S"] = "86400"
+os.environ["SQL_LENTA_MS"] = "0"
+
+import itertools
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+# Cada test reserva en su propio día para no chocar con las reservas de los demás
+_dias = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    """Cliente HTTP sobre la app con los datos de prueba de data/restaurante.py ya cargados"""
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def dia():
+    """Un día futuro que no usa ningún otro test"""
+    return date.today() + timedelta(days=365 + next(_dias))
@@ -0,0 +1,48 @@
+# Archivo: tests/test_archivo.py
+import sqlite3
+from datetime import date, timedelta
+
+from app.database import DB_NAME, pool
+from app.services import archivo_service
+
+ESTADISTICAS = ("estadisticas_estado", "estadisticas_turno", "estadisticas_cliente", "estadisticas_mesa")
+
+
+def _estadisticas(conn):
+    return {tabla: sorted(map(tuple, conn.execute(f"SELECT * FROM {tabla}"))) for tabla in ESTADISTICAS}
+
+
+def test_archivar_mueve_las_reservas_cerradas_sin_cambiar_las_estadisticas(cliente):
+    dia = date.today() - timedelta(days=400)
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        with conn:
+            ids = {}
+            for mesa_id, estado in ((6, "completada"), (7, "cancelada"), (9, "pendiente")):
+                ids[estado] = conn.execute(
+                    "INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado) "
+                    "VALUES (1, ?, ?, ?, 2, ?) RETURNING id",
+                    (mesa_id, f"{dia} 20:00:00", f"{dia} 22:00:00", estado),
+                ).fetchone()[0]
+        antes = _estadisticas(conn)
+    finally:
+        conn.close()
+
+    with pool.conexion() as conexion:
+        assert archivo_service.estado(conexion, 300)["pendientes_de_archivar"] >= 2
+        assert archivo_service.archivar(conexion, 300) >= 2
+        assert archivo_service.estado(conexion, 300)["pendientes_de_archivar"] == 0
+        # Los triggers restan las borradas de 'reservas' y la compensación las vuelve a sumar
+        assert _estadisticas(conexion) == antes
+        activas = {fila[0] for fila in conexion.execute("SELECT id FROM main.reservas WHERE id IN (?, ?, ?)",
+                                                       tuple(ids.values()))}
+        archivadas = {fila[0] for fila in conexion.execute("SELECT id FROM archivo.reservas WHERE id IN (?, ?, ?)",
+                                                          tuple(ids.values()))}
+
+    # Solo se archivan las que ya no pueden cambiar de estado
+    assert activas == {ids["pendiente"]}
+    assert archivadas == {ids["completada"], ids["cancelada"]}
+    # Las archivadas se siguen leyendo, pero ya no se pueden modificar
+    assert cliente.get(f"/reservas/{ids['completada']}").json()["estado"] == "completada"
+    respuesta = cliente.patch("/reservas/estado", json={"ids": [ids["cancelada"]], "estado": "confirmada"})
+    assert respuesta.json()["resultados"][0]["error"] == "ReservaArchivadaError"
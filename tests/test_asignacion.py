@@ -0,0 +1,19 @@
+# Archivo: tests/test_asignacion.py
+from datetime import datetime, time
+
+
+def _solicitud(dia, hora):
+    return {"cliente_id": 1, "num_comensales": 2, "fecha_hora_inicio": datetime.combine(dia, time(hora)).isoformat()}
+
+
+def test_lote_no_asigna_mesa_ocupada_por_reserva_anterior(cliente, dia):
+    # La mejor mesa para 2 queda ocupada de 20:00 a 22:00
+    primera = cliente.post("/reservas/auto", json=_solicitud(dia, 20))
+    assert primera.status_code == 201
+    ocupada = primera.json()["mesa_id"]
+
+    respuesta = cliente.post("/reservas/auto/lote", json={"solicitudes": [_solicitud(dia, 21)]})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["asignadas"] == 1
+    assert cuerpo["resultados"][0]["reserva"]["mesa_id"] != ocupada
@@ -0,0 +1,69 @@
+# Archivo: tests/test_cache.py
+import sqlite3
+
+import pytest
+
+from app.services.cache import CacheRespuestas
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE versiones_tablas (tabla TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    conn.executemany("INSERT INTO versiones_tablas (tabla) VALUES (?)", [("mesas",), ("reservas",)])
+    yield conn
+    conn.close()
+
+
+def _contador():
+    llamadas = []
+
+    def calcular(conn, valor):
+        llamadas.append(valor)
+        return valor
+
+    return calcular, llamadas
+
+
+def test_sirve_de_la_cache_hasta_que_cambia_la_version(conn):
+    cache = CacheRespuestas()
+    calcular, llamadas = _contador()
+
+    assert cache.obtener(conn, ("clave",), ("reservas",), calcular, 1) == 1
+    assert cache.obtener(conn, ("clave",), ("reservas",), calcular, 2) == 1
+    assert llamadas == [1]
+
+    # Una escritura de otro worker solo se ve en la versión de la tabla
+    conn.execute("UPDATE versiones_tablas SET version = version + 1 WHERE tabla = 'reservas'")
+    assert cache.obtener(conn, ("clave",), ("reservas",), calcular, 3) == 3
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["obsoletas"]) == (1, 2, 1)
+
+
+def test_invalidar_solo_descarta_lo_que_depende_de_la_tabla(conn):
+    cache = CacheRespuestas()
+    calcular, llamadas = _contador()
+    cache.obtener(conn, ("mesas",), ("mesas",), calcular, "m")
+    cache.obtener(conn, ("reservas",), ("reservas", "mesas"), calcular, "r")
+
+    cache.invalidar("reservas")
+    cache.obtener(conn, ("mesas",), ("mesas",), calcular, "m")
+    cache.obtener(conn, ("reservas",), ("reservas", "mesas"), calcular, "r")
+    assert llamadas == ["m", "r", "r"]
+
+
+def test_desaloja_la_menos_usada_y_caduca_por_ttl(conn):
+    cache = CacheRespuestas(tamano=2)
+    calcular, llamadas = _contador()
+    for clave in ("a", "b", "a", "c"):
+        cache.obtener(conn, (clave,), ("mesas",), calcular, clave)
+    # 'a' se ha vuelto a usar, así que la que sale al entrar 'c' es 'b'
+    cache.obtener(conn, ("a",), ("mesas",), calcular, "a")
+    cache.obtener(conn, ("b",), ("mesas",), calcular, "b")
+    assert llamadas == ["a", "b", "c", "b"]
+    assert cache.estadisticas()["desalojos"] == 2
+
+    caducada = CacheRespuestas(ttl=0)
+    caducada.obtener(conn, ("a",), ("mesas",), calcular, "a")
+    caducada.obtener(conn, ("a",), ("mesas",), calcular, "a")
+    assert caducada.estadisticas()["caducadas"] == 1
@@ -0,0 +1,32 @@
+# Archivo: tests/test_consultas.py
+import sqlite3
+
+import pytest
+
+from app.consultas_lentas import escaneos, plan_consulta, rangos_abiertos
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE reservas (id INTEGER PRIMARY KEY, mesa_id INTEGER, inicio INTEGER, fin INTEGER)")
+    conn.execute("CREATE INDEX idx_reservas_inicio ON reservas (inicio)")
+    conn.execute("CREATE INDEX idx_reservas_mesa_inicio ON reservas (mesa_id, inicio)")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("sql, abiertos", [
+    ("SELECT * FROM reservas WHERE inicio < 10 AND fin > 5", ["reservas"]),
+    ("SELECT * FROM reservas r WHERE r.mesa_id = 1 AND r.inicio < 10", ["reservas"]),
+    ("SELECT * FROM reservas WHERE inicio >= 0 AND inicio < 10 AND fin > 5", []),
+    ("SELECT * FROM reservas WHERE inicio > 10", []),
+    ("SELECT * FROM reservas WHERE id = 3", []),
+])
+def test_rangos_sin_cota_inferior(conn, sql, abiertos):
+    assert rangos_abiertos(sql, plan_consulta(conn, sql)) == abiertos
+
+
+def test_recorrido_completo(conn):
+    sql = "SELECT * FROM reservas WHERE fin > 5"
+    assert escaneos(sql, plan_consulta(conn, sql)) == ["reservas"]
@@ -0,0 +1,68 @@
+# Archivo: tests/test_difusor.py
+import asyncio
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from app.database import a_epoch, ejecutor
+from app.difusor import DifusorDisponibilidad
+from app.exceptions import ServicioSobrecargadoError
+from app.services.indice_disponibilidad import indice
+
+
+def test_suscriptor_sin_leer_no_queda_registrado(cliente):
+    async def comprobar():
+        difusor = DifusorDisponibilidad(ejecutor, indice, tamano_cola=4, max_clientes=1)
+
+        # Una respuesta que nunca se llega a enviar no ocupa plaza
+        difusor.suscribir()
+        assert difusor.estadisticas()["clientes"] == 0
+
+        flujo = difusor.eventos(difusor.suscribir())
+        assert (await flujo.__anext__()).startswith("retry:")
+        assert difusor.estadisticas()["clientes"] == 1
+        with pytest.raises(ServicioSobrecargadoError):
+            difusor.suscribir()
+
+        await flujo.aclose()
+        assert difusor.estadisticas()["clientes"] == 0
+
+    asyncio.run(comprobar())
+
+
+
+def test_reparte_cada_cambio_a_los_clientes_de_su_dia(cliente, dia):
+    inicio = a_epoch(datetime.combine(dia, time(20)))
+
+    async def comprobar():
+        difusor = DifusorDisponibilidad(ejecutor, indice, tamano_cola=1, max_clientes=10)
+        # Sin arrancar(), que engancharía este difusor a los cambios del índice de la app
+        difusor._bucle = asyncio.get_running_loop()
+        suscriptores = {"del_dia": difusor.suscribir(dia), "todos": difusor.suscribir(),
+                        "otro_dia": difusor.suscribir(dia + timedelta(days=1))}
+        flujos = {nombre: difusor.eventos(suscriptor) for nombre, suscriptor in suscriptores.items()}
+        for flujo in flujos.values():
+            await flujo.__anext__()
+
+        difusor.publicar(1, [(6, inicio, inicio + 7200, False)])
+        await asyncio.sleep(0)
+        recibidos = {nombre: await flujos[nombre].__anext__() for nombre in ("del_dia", "todos")}
+        otro_dia_vacio = suscriptores["otro_dia"].cola.empty()
+
+        # Un cliente que no lee a tiempo pierde lo pendiente y recibe un reinicio
+        difusor.publicar(2, [(6, inicio, inicio + 7200, True)])
+        difusor.publicar(3, [(6, inicio, inicio + 7200, False)])
+        await asyncio.sleep(0)
+        reinicio = await flujos["todos"].__anext__()
+
+        for flujo in flujos.values():
+            await flujo.aclose()
+        return recibidos, otro_dia_vacio, reinicio, difusor.estadisticas()
+
+    recibidos, otro_dia_vacio, reinicio, estadisticas = asyncio.run(comprobar())
+    assert recibidos["del_dia"].startswith("id: 1\nevent: disponibilidad")
+    assert '"mesa":6' in recibidos["todos"]
+    assert otro_dia_vacio
+    assert reinicio.startswith("event: reinicio")
+    assert estadisticas["desbordes"] >= 1
+    assert estadisticas["clientes"] == 0
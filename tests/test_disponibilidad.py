@@ -0,0 +1,44 @@
+# Archivo: tests/test_disponibilidad.py
+import sqlite3
+from datetime import date, datetime, time, timedelta
+
+from app.database import DB_NAME
+
+
+def test_grid_incluye_reserva_que_empieza_antes_del_rango(cliente, dia):
+    reserva = {"cliente_id": 1, "mesa_id": 6, "num_comensales": 2,
+               "fecha_hora_inicio": datetime.combine(dia, time(21)).isoformat()}
+    assert cliente.post("/reservas/", json=reserva).status_code == 201
+
+    # De 22:00 a 23:30 en franjas de media hora: la reserva (21:00-23:00) ocupa las dos primeras
+    respuesta = cliente.get("/mesas/disponibilidad/grid", params={
+        "desde": datetime.combine(dia, time(22)).isoformat(),
+        "hasta": datetime.combine(dia, time(23, 30)).isoformat(),
+        "granularidad": 30,
+    })
+    assert respuesta.status_code == 200
+    ocupacion = {mesa["mesa_id"]: mesa["ocupacion"] for mesa in respuesta.json()["mesas"]}
+    assert ocupacion[6] == "110"
+    assert ocupacion[7] == "000"
+
+
+def test_mesas_libres_en_el_pasado_ven_la_reserva_empezada(cliente):
+    # Las fechas anteriores a hoy no están en el índice en memoria: se consultan con SQL
+    dia = date.today() - timedelta(days=10)
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales, estado) "
+                "VALUES (1, 6, ?, ?, 2, 'completada')",
+                (f"{dia} 20:00:00", f"{dia} 22:00:00"),
+            )
+    finally:
+        conn.close()
+
+    libres = cliente.get("/mesas/disponibles/", params={
+        "fecha": datetime.combine(dia, time(21)).isoformat(), "comensales": 2,
+    }).json()
+    ids = {mesa["id"] for mesa in libres}
+    assert 6 not in ids
+    assert 7 in ids
@@ -0,0 +1,79 @@
+# Archivo: tests/test_escritor.py
+import asyncio
+import threading
+
+import pytest
+
+from app.database import pool
+from app.escritor import EscritorBD
+from app.exceptions import ServicioSobrecargadoError
+
+
+@pytest.fixture
+def tabla(cliente):
+    with pool.conexion() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS prueba_escritor (valor TEXT)")
+        conn.execute("DELETE FROM prueba_escritor")
+        conn.commit()
+    return "prueba_escritor"
+
+
+def _insertar(conn, valor, fallar=False):
+    conn.execute("INSERT INTO prueba_escritor (valor) VALUES (?)", (valor,))
+    if fallar:
+        raise ValueError(valor)
+    return valor
+
+
+def _valores():
+    with pool.conexion() as conn:
+        return sorted(fila[0] for fila in conn.execute("SELECT valor FROM prueba_escritor"))
+
+
+def test_un_lote_un_commit_y_el_error_de_una_operacion_no_afecta_a_las_demas(tabla):
+    escritor = EscritorBD(pool, espera_ms=200)
+
+    async def escribir():
+        return await asyncio.gather(
+            escritor.escribir(_insertar, "a"),
+            escritor.escribir(_insertar, "b", fallar=True),
+            escritor.escribir(_insertar, "c"),
+            return_exceptions=True,
+        )
+
+    try:
+        a, b, c = asyncio.run(escribir())
+        estadisticas = escritor.estadisticas()
+    finally:
+        escritor.cerrar()
+
+    assert (a, c) == ("a", "c")
+    assert isinstance(b, ValueError)
+    # La operación fallida se deshace en su SAVEPOINT; las otras se confirman con el mismo COMMIT
+    assert _valores() == ["a", "c"]
+    assert (estadisticas["lotes"], estadisticas["operaciones"]) == (1, 3)
+
+
+def test_cola_llena_rechaza_en_vez_de_esperar(tabla):
+    escritor = EscritorBD(pool, espera_ms=0, max_pendientes=1)
+    empezada, seguir = threading.Event(), threading.Event()
+
+    def bloquear(conn):
+        empezada.set()
+        seguir.wait(5)
+
+    try:
+        primera = escritor._encolar(bloquear, (), {})
+        assert empezada.wait(5)
+        segunda = escritor._encolar(_insertar, ("en cola",), {})
+        with pytest.raises(ServicioSobrecargadoError):
+            escritor.ejecutar(_insertar, "rechazada")
+        seguir.set()
+        primera.result(5)
+        assert segunda.result(5) == "en cola"
+        assert escritor.estadisticas()["rechazadas"] == 1
+    finally:
+        seguir.set()
+        escritor.cerrar()
+
+    assert _valores() == ["en cola"]
@@ -0,0 +1,31 @@
+# Archivo: tests/test_estadisticas.py
+import sqlite3
+
+from app.database import DB_NAME
+from app.services.cache import cache
+
+
+def _version_reservas(conn):
+    return conn.execute("SELECT version FROM versiones_tablas WHERE tabla = 'reservas'").fetchone()[0]
+
+
+def test_reconstruir_no_deja_en_la_cache_las_estadisticas_descuadradas(cliente):
+    cache.vaciar()
+    correcto = cliente.get("/estadisticas/resumen").json()
+
+    # Descuadre de las tablas de resumen, que no suben la versión de 'reservas'
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        with conn:
+            conn.execute("UPDATE estadisticas_estado SET total = total + 1000 WHERE estado = 'pendiente'")
+        cache.vaciar()
+        assert cliente.get("/estadisticas/resumen").json() != correcto
+        version = _version_reservas(conn)
+
+        assert cliente.post("/sistema/estadisticas/reconstruir").json() == correcto
+        # La versión sube para que los demás workers descarten también sus copias
+        assert _version_reservas(conn) == version + 1
+    finally:
+        conn.close()
+
+    assert cliente.get("/estadisticas/resumen").json() == correcto
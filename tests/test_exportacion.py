@@ -0,0 +1,46 @@
+# Archivo: tests/test_exportacion.py
+import asyncio
+import json
+from datetime import datetime, time
+
+from app.database import pool
+from app.services import exportacion_service
+
+
+def _crear(cliente, dia, mesas, hora=20):
+    for mesa_id in mesas:
+        reserva = {"cliente_id": 1, "mesa_id": mesa_id, "num_comensales": 2,
+                   "fecha_hora_inicio": datetime.combine(dia, time(hora)).isoformat()}
+        assert cliente.post("/reservas/", json=reserva).status_code == 201
+
+
+def test_exportacion_por_bloques_no_pierde_ni_repite_filas(cliente, dia, monkeypatch):
+    # Varias reservas a la misma hora: la clave (inicio, id) tiene que partir bien los empates
+    monkeypatch.setattr(exportacion_service, "TAMANO_BLOQUE", 2)
+    _crear(cliente, dia, (6, 7, 9, 10, 11))
+
+    respuesta = cliente.get("/reservas/exportar", params={"fecha": dia.isoformat()})
+    assert respuesta.status_code == 200
+    filas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert [fila["mesa_id"] for fila in filas] == [6, 7, 9, 10, 11]
+    assert len({fila["id"] for fila in filas}) == 5
+
+    csv = cliente.get("/reservas/exportar", params={"fecha": dia.isoformat(), "formato": "csv"}).text
+    assert len(csv.splitlines()) == 1 + 5
+
+
+def test_exportacion_no_retiene_conexiones_entre_bloques(cliente, dia, monkeypatch):
+    monkeypatch.setattr(exportacion_service, "TAMANO_BLOQUE", 2)
+    _crear(cliente, dia, (6, 7, 9))
+
+    # Un cliente lento que ha leído el primer bloque no tiene ninguna conexión del pool
+    async def primer_bloque():
+        contenido = exportacion_service.exportar_ndjson(fecha=dia)
+        bloque = await contenido.__anext__()
+        en_uso = pool.estadisticas()["conexiones_en_uso"]
+        await contenido.aclose()
+        return bloque, en_uso
+
+    bloque, en_uso = asyncio.run(primer_bloque())
+    assert len(bloque.splitlines()) == 2
+    assert en_uso == 0
@@ -0,0 +1,29 @@
+# Archivo: tests/test_indice.py
+from datetime import datetime, time, timedelta
+
+from app.database import pool
+from app.services.indice_disponibilidad import IndiceDisponibilidad
+
+
+def test_avanzar_quita_las_reservas_terminadas(cliente, dia):
+    reserva = cliente.post("/reservas/", json={
+        "cliente_id": 1, "mesa_id": 6, "num_comensales": 2,
+        "fecha_hora_inicio": datetime.combine(dia, time(20)).isoformat(),
+    }).json()
+
+    indice = IndiceDisponibilidad()
+    with pool.conexion() as conn:
+        indice.reconstruir(conn)
+    assert reserva["id"] in indice._por_reserva
+
+    # El día siguiente a la reserva: ha terminado (acaba a las 22:00) y sale del índice
+    indice.avanzar(datetime.combine(dia + timedelta(days=1), time(9)))
+    assert reserva["id"] not in indice._por_reserva
+    assert all(fin >= indice.desde for lista in indice._por_mesa.values() for _, fin, _ in lista)
+    assert not indice.cubre(indice.desde - 1)
+    assert indice.estadisticas()["podadas"] >= 1
+
+    # 'desde' no retrocede
+    desde = indice.desde
+    indice.avanzar(datetime.now())
+    assert indice.desde == desde
@@ -0,0 +1,88 @@
+# Archivo: tests/test_metricas.py
+import sqlite3
+from datetime import datetime, time
+
+import pytest
+
+from app.database import al_confirmar, pool, transaccion
+from app.models import ReservaCreate
+from app.services import reserva_service
+from app.services.indice_disponibilidad import indice
+
+
+def _reserva(dia, hora, mesa_id=6):
+    return {"cliente_id": 1, "mesa_id": mesa_id, "num_comensales": 2,
+            "fecha_hora_inicio": datetime.combine(dia, time(hora)).isoformat()}
+
+
+def _valor(cliente, nombre):
+    for linea in cliente.get("/metrics").text.splitlines():
+        if linea.startswith(nombre + " "):
+            return float(linea.split()[1])
+    raise AssertionError(f"{nombre} no está en /metrics")
+
+
+def test_bulk_cuenta_una_vez_cada_solape_con_la_bd(cliente, dia):
+    assert cliente.post("/reservas/", json=_reserva(dia, 20)).status_code == 201
+    solapadas = _valor(cliente, "restaurante_reservas_solapadas_total")
+
+    lote = [_reserva(dia, 21), _reserva(dia, 20, mesa_id=7)]
+    cuerpo = cliente.post("/reservas/bulk", json={"reservas": lote}).json()
+
+    assert (cuerpo["creadas"], cuerpo["rechazadas"]) == (1, 1)
+    assert _valor(cliente, "restaurante_reservas_solapadas_total") == solapadas + 1
+
+
+def test_peticion_rechazada_por_solape_cuenta_una_vez(cliente, dia):
+    assert cliente.post("/reservas/", json=_reserva(dia, 20)).status_code == 201
+    solapadas = _valor(cliente, "restaurante_reservas_solapadas_total")
+
+    assert cliente.post("/reservas/", json=_reserva(dia, 21)).status_code == 409
+    assert _valor(cliente, "restaurante_reservas_solapadas_total") == solapadas + 1
+
+
+def test_las_reservas_deshechas_no_cuentan_como_creadas(cliente, dia):
+    creadas = _valor(cliente, "restaurante_reservas_creadas_total")
+
+    # Como un lote del escritor cuyo COMMIT falla: la reserva se inserta pero la transacción se deshace
+    with pool.conexion() as conn:
+        with pytest.raises(RuntimeError):
+            with transaccion(conn):
+                reserva_service.crear_reserva(conn, ReservaCreate(**_reserva(dia, 20)))
+                raise RuntimeError("COMMIT fallido")
+    indice.invalidar()
+
+    assert _valor(cliente, "restaurante_reservas_creadas_total") == creadas
+    assert cliente.post("/reservas/", json=_reserva(dia, 20)).status_code == 201
+    assert _valor(cliente, "restaurante_reservas_creadas_total") == creadas + 1
+
+
+def test_al_confirmar_espera_al_commit_y_descarta_lo_deshecho():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    hechas = []
+    with transaccion(conn):
+        al_confirmar(conn, hechas.append, "fuera")
+        with pytest.raises(RuntimeError):
+            with transaccion(conn):
+                al_confirmar(conn, hechas.append, "deshecha")
+                raise RuntimeError
+        with transaccion(conn):
+            al_confirmar(conn, hechas.append, "dentro")
+        assert hechas == []
+    assert hechas == ["fuera", "dentro"]
+
+    al_confirmar(conn, hechas.append, "sin transacción")
+    assert hechas[-1] == "sin transacción"
+
+
+def test_contadores_de_reservas_creadas_y_canceladas(cliente, dia):
+    creadas = _valor(cliente, "restaurante_reservas_creadas_total")
+    canceladas = _valor(cliente, "restaurante_reservas_canceladas_total")
+
+    ids = [cliente.post("/reservas/", json=_reserva(dia, 20, mesa_id=mesa_id)).json()["id"] for mesa_id in (6, 7)]
+    assert cliente.delete(f"/reservas/{ids[0]}").status_code == 200
+    cliente.patch("/reservas/estado", json={"ids": ids, "estado": "cancelada"})
+
+    assert _valor(cliente, "restaurante_reservas_creadas_total") == creadas + 2
+    # La segunda vez la primera ya estaba cancelada: no vuelve a contar
+    assert _valor(cliente, "restaurante_reservas_canceladas_total") == canceladas + 2
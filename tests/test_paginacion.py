@@ -0,0 +1,49 @@
+# Archivo: tests/test_paginacion.py
+import pytest
+
+from app.services.paginacion import codificar_cursor
+
+CURSORES_INVALIDOS = [
+    "no-es-base64!",
+    codificar_cursor([1], 2),
+    codificar_cursor("x", "y"),
+    codificar_cursor(None, 1),
+    codificar_cursor(1.5, 2),
+    codificar_cursor(True, 2),
+    codificar_cursor(1, 2, 3),
+    codificar_cursor(1),
+]
+
+
+@pytest.mark.parametrize("cursor", CURSORES_INVALIDOS)
+def test_cursor_invalido_en_reservas_devuelve_400(cliente, cursor):
+    respuesta = cliente.get("/reservas/", params={"cursor": cursor})
+    assert respuesta.status_code == 400
+    assert respuesta.json()["detail"] == "Cursor de paginación inválido"
+
+
+@pytest.mark.parametrize("cursor", [codificar_cursor("x"), codificar_cursor(None), codificar_cursor([1]),
+                                    codificar_cursor(1, 2)])
+def test_cursor_invalido_en_clientes_devuelve_400(cliente, cursor):
+    respuesta = cliente.get("/clientes/", params={"cursor": cursor})
+    assert respuesta.status_code == 400
+    assert respuesta.json()["detail"] == "Cursor de paginación inválido"
+
+
+def test_cursor_recorre_todas_las_reservas(cliente, dia):
+    for mesa_id in range(1, 6):
+        cliente.post("/reservas/", json={"cliente_id": 2, "mesa_id": mesa_id, "num_comensales": 2,
+                                         "fecha_hora_inicio": f"{dia}T13:00:00"})
+
+    vistas, cursor = [], None
+    while True:
+        params = {"cliente_id": 2, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        respuesta = cliente.get("/reservas/", params=params)
+        assert respuesta.status_code == 200
+        vistas += [r["id"] for r in respuesta.json()]
+        cursor = respuesta.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    todas = [r["id"] for r in cliente.get("/reservas/", params={"cliente_id": 2, "limit": 1000}).json()]
+    assert vistas == todas and len(vistas) >= 5
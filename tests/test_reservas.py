@@ -0,0 +1,111 @@
+# Archivo: tests/test_reservas.py
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+
+import pytest
+
+from app.database import DB_NAME
+
+
+def _reserva(dia, hora, mesa_id=6, **extra):
+    return {"cliente_id": 1, "mesa_id": mesa_id, "num_comensales": 2,
+            "fecha_hora_inicio": datetime.combine(dia, time(hora)).isoformat(), **extra}
+
+
+def test_reserva_solapada_devuelve_409(cliente, dia):
+    respuesta = cliente.post("/reservas/", json=_reserva(dia, 20))
+    assert respuesta.status_code == 201
+
+    respuesta = cliente.post("/reservas/", json=_reserva(dia, 21))
+    assert respuesta.status_code == 409
+
+    # Otra mesa a la misma hora sí se puede reservar
+    assert cliente.post("/reservas/", json=_reserva(dia, 21, mesa_id=7)).status_code == 201
+
+
+def test_reserva_cancelada_libera_la_mesa(cliente, dia):
+    reserva = cliente.post("/reservas/", json=_reserva(dia, 20)).json()
+    assert cliente.delete(f"/reservas/{reserva['id']}").status_code == 200
+
+    assert cliente.post("/reservas/", json=_reserva(dia, 21)).status_code == 201
+
+
+def test_reservas_concurrentes_solo_una_se_crea(cliente, dia):
+    with ThreadPoolExecutor(max_workers=8) as hilos:
+        codigos = list(hilos.map(lambda _: cliente.post("/reservas/", json=_reserva(dia, 20)).status_code, range(16)))
+
+    assert sorted(codigos) == [201] + [409] * 15
+
+
+def test_trigger_rechaza_solape_de_otro_escritor(cliente, dia):
+    # Un escritor que se salta el servicio (otro proceso, un script) también choca con el trigger
+    assert cliente.post("/reservas/", json=_reserva(dia, 20)).status_code == 201
+
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        with pytest.raises(sqlite3.IntegrityError, match="reserva_solapada"):
+            conn.execute(
+                "INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales) "
+                "VALUES (1, 6, ?, ?, 2)",
+                (f"{dia} 21:00:00", f"{dia} 23:00:00"),
+            )
+    finally:
+        conn.close()
+
+
+def test_bulk_devuelve_los_ids_de_las_reservas_creadas(cliente, dia):
+    # Un trigger que inserta otra reserva por cada una del lote rompe la secuencia de ids
+    conn = sqlite3.connect(DB_NAME)
+    conn.execute("""
+        CREATE TRIGGER test_duplicar_reserva AFTER INSERT ON reservas WHEN NEW.notas = 'duplicar'
+        BEGIN
+            INSERT INTO reservas (cliente_id, mesa_id, fecha_hora_inicio, fecha_hora_fin, num_comensales)
+            VALUES (NEW.cliente_id, NEW.mesa_id + 1, NEW.fecha_hora_inicio, NEW.fecha_hora_fin, NEW.num_comensales);
+        END
+    """)
+    try:
+        lote = [_reserva(dia, 20, mesa_id=6, notas="duplicar"), _reserva(dia, 21, mesa_id=6),
+                _reserva(dia, 20, mesa_id=9), _reserva(dia, 20, mesa_id=10, notas="ventana")]
+        respuesta = cliente.post("/reservas/bulk", json={"reservas": lote})
+    finally:
+        conn.execute("DROP TRIGGER test_duplicar_reserva")
+        conn.close()
+
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert (cuerpo["creadas"], cuerpo["rechazadas"]) == (3, 1)
+    assert cuerpo["resultados"][1]["error"] == "ReservaSolapadaError"
+
+    for resultado in cuerpo["resultados"]:
+        if resultado.get("reserva") is None:
+            continue
+        enviada = lote[resultado["indice"]]
+        guardada = cliente.get(f"/reservas/{resultado['reserva']['id']}").json()
+        assert (guardada["mesa_id"], guardada["fecha_hora_inicio"], guardada["notas"]) == \
+            (enviada["mesa_id"], enviada["fecha_hora_inicio"], enviada.get("notas"))
+
+
+def test_cambio_de_estado_en_lote_explica_cada_id(cliente, dia):
+    pendiente = cliente.post("/reservas/", json=_reserva(dia, 20)).json()["id"]
+    completada = cliente.post("/reservas/", json=_reserva(dia, 20, mesa_id=7)).json()["id"]
+    assert cliente.patch(f"/reservas/{completada}/completar").status_code == 200
+
+    respuesta = cliente.patch("/reservas/estado", json={"ids": [pendiente, pendiente, completada, 999999999],
+                                                        "estado": "cancelada"})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert (cuerpo["cambiadas"], cuerpo["sin_cambios"], cuerpo["rechazadas"]) == (1, 0, 2)
+    # Un resultado por id, sin repetidos y en el orden de entrada
+    resultados = cuerpo["resultados"]
+    assert [r["id"] for r in resultados] == [pendiente, completada, 999999999]
+    assert resultados[0]["estado"] == "cancelada"
+    assert resultados[1]["error"] == "CancelacionNoPermitidaError"
+    assert resultados[2]["error"] == "NoEncontrada"
+
+    # Con la mesa ya reservada por otro, reactivar la cancelada choca con el trigger de solapes
+    assert cliente.post("/reservas/", json=_reserva(dia, 21)).status_code == 201
+    cuerpo = cliente.patch("/reservas/estado", json={"ids": [pendiente], "estado": "confirmada"}).json()
+    assert cuerpo["rechazadas"] == 1
+    assert cuerpo["resultados"][0]["error"] == "ReservaSolapadaError"
+    assert cliente.get(f"/reservas/{pendiente}").json()["estado"] == "cancelada"
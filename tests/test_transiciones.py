@@ -0,0 +1,55 @@
+# Archivo: tests/test_transiciones.py
+from datetime import datetime, time
+
+from app.escritor import escritor
+from app.services import transiciones_service
+
+
+def _crear(cliente, dia, mesa_id, confirmar=False):
+    reserva = {"cliente_id": 1, "mesa_id": mesa_id, "num_comensales": 2,
+               "fecha_hora_inicio": datetime.combine(dia, time(20)).isoformat()}
+    respuesta = cliente.post("/reservas/", json=reserva)
+    assert respuesta.status_code == 201
+    id = respuesta.json()["id"]
+    if confirmar:
+        assert cliente.patch(f"/reservas/{id}/confirmar").status_code == 200
+    return id
+
+
+def _estado(cliente, id):
+    return cliente.get(f"/reservas/{id}").json()
+
+
+def test_ninguna_tarea_libera_una_mesa_durante_su_reserva(cliente, dia):
+    pendiente = _crear(cliente, dia, 6)
+    confirmada = _crear(cliente, dia, 7, confirmar=True)
+
+    # A las 21:00 las dos reservas (20:00-22:00) siguen en curso: una pendiente puede tener al cliente sentado
+    ahora = datetime.combine(dia, time(21))
+    for funcion in transiciones_service.TAREAS.values():
+        escritor.ejecutar(funcion, ahora)
+
+    assert _estado(cliente, pendiente)["estado"] == "pendiente"
+    assert _estado(cliente, confirmada)["estado"] == "confirmada"
+    reserva = {"cliente_id": 2, "mesa_id": 6, "num_comensales": 2,
+               "fecha_hora_inicio": datetime.combine(dia, time(21)).isoformat()}
+    assert cliente.post("/reservas/", json=reserva).status_code == 409
+
+
+def test_al_terminar_se_completan_las_confirmadas_y_caducan_las_pendientes(cliente, dia):
+    pendiente = _crear(cliente, dia, 6)
+    confirmada = _crear(cliente, dia, 7, confirmar=True)
+
+    ahora = datetime.combine(dia, time(22))
+    assert escritor.ejecutar(transiciones_service.completar_terminadas, ahora) >= 1
+    assert escritor.ejecutar(transiciones_service.caducar_pendientes, ahora) >= 1
+
+    assert _estado(cliente, confirmada)["estado"] == "completada"
+    caducada = _estado(cliente, pendiente)
+    assert caducada["estado"] == "cancelada"
+    assert caducada["notas"].endswith(transiciones_service.MARCA_CADUCADA)
+
+
+def test_solo_se_pueden_ejecutar_las_tareas_registradas(cliente):
+    assert cliente.post("/sistema/planificador/caducar/ejecutar").status_code == 200
+    assert cliente.post("/sistema/planificador/no_presentadas/ejecutar").status_code == 404